@@ -279,3 +279,16 @@ if DEBUG:
     }
 
 TIMESIDE_DEFAULT_DECODER = 'aubio_decoder'
+
+# Decode the PCM WAV and AIFF items with the memory-mapped wav_mmap_decoder
+TIMESIDE_WAV_MMAP_DECODER = True
+
+# Cost models fitted by the timeside-calibrate-processors command and the
+# limits of the experiences admitted on a worker (None for no limit)
+TIMESIDE_COST_MODELS = os.path.join(MEDIA_ROOT, 'cost_models.json')
+TIMESIDE_MAX_CPU_SECONDS = None
+TIMESIDE_MAX_PEAK_BYTES = None
+
+# Cache of the media discovery results, see
+# timeside.core.tools.media_info_cache
+TIMESIDE_MEDIA_INFO_CACHE_DIR = os.path.join(MEDIA_ROOT, 'cache', 'media_info')
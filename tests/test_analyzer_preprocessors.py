@@ -17,7 +17,8 @@ class FakeAnalyzer(object):
         self.input_stepsize = stepsize
 
     def process(self, frames, eod):
-        self.frames.append(frames)
+        # Adapted frames are only valid during the call
+        self.frames.append(frames.copy())
         return frames, eod
 
     @staticmethod
@@ -25,6 +26,12 @@ class FakeAnalyzer(object):
         return 'fake_analyzer'
 
 
+class FakeBatchAnalyzer(FakeAnalyzer):
+
+    def process_batch(self, frames_matrix, eod):
+        self.frames.extend(frames_matrix.copy())
+
+
 def get_frames(signal, blocksize=2048, stepsize=None, zeropad=False):
     if stepsize is None:
         stepsize = blocksize
@@ -53,12 +60,12 @@ def assertEqualListOfArrays(list1, list2):
 
 class TestAnalyzerPreProcessors(unittest.TestCase):
 
-
+    analyzer_class = FakeAnalyzer
 
     def tearDown(self):
 
-        analyzer = FakeAnalyzer(blocksize=self.blocksize,
-                                stepsize=self.stepsize)
+        analyzer = self.analyzer_class(blocksize=self.blocksize,
+                                       stepsize=self.stepsize)
 
         input_frames_eod = [(frames, eod) for frames, eod
                             in get_frames(signal=self.input_signal)]
@@ -155,5 +162,94 @@ class TestFramesAdapter(TestAnalyzerPreProcessors, unittest.TestCase):
         self.process_frames, process_eod = zip(*process_frames_eod)
 
 
+def reference_frames(blocks, blocksize, stepsize):
+    "Frames built by concatenating each block with the previous remainder"
+    frames = []
+    buffer = None
+    for block, eod in blocks:
+        if buffer is not None:
+            stack = np.concatenate([buffer, block])
+        else:
+            stack = block.copy()
+        nb_frames = max((len(stack) - blocksize + stepsize) // stepsize, 0)
+        last_block_size = len(stack) - (nb_frames * stepsize +
+                                        blocksize - stepsize)
+        if eod:
+            pad_shape = ((blocksize - last_block_size,) + block.shape[1:])
+            stack = np.concatenate([stack, np.zeros(pad_shape,
+                                                    dtype=block.dtype)])
+            nb_frames += 1
+        buffer = stack[nb_frames * stepsize:]
+        for index in range(nb_frames):
+            frames.append((stack[index * stepsize:
+                                 index * stepsize + blocksize],
+                           eod and index == nb_frames - 1))
+    return frames
+
+
+class TestFramesAdapterIrregularBlocks(unittest.TestCase):
+    "Frames adapted from blocks of varying sizes, compared byte to byte"
+
+    def check(self, signal, sizes, blocksize, stepsize,
+              analyzer_class=FakeAnalyzer):
+        bounds = np.cumsum([0] + sizes)
+        blocks = [(signal[start:end], end >= len(signal))
+                  for start, end in zip(bounds[:-1], bounds[1:])]
+        analyzer = analyzer_class(blocksize=blocksize, stepsize=stepsize)
+        eods = []
+
+        def process(analyzer, frames, eod):
+            analyzer.frames.append(frames.copy())
+            eods.append(eod)
+
+        decorated_process = frames_adapter(process)
+        for block, eod in blocks:
+            decorated_process(analyzer, block, eod)
+
+        ref = reference_frames(blocks, blocksize, stepsize)
+        self.assertEqual(len(analyzer.frames), len(ref))
+        for frames, (ref_frames, _) in zip(analyzer.frames, ref):
+            self.assertEqual(frames.dtype, ref_frames.dtype)
+            self.assertEqual(frames.tobytes(), ref_frames.tobytes())
+        if analyzer_class is FakeAnalyzer:
+            self.assertEqual(eods, [eod for _, eod in ref])
+
+    def test_irregular_mono(self):
+        np.random.seed(0)
+        sizes = list(np.random.randint(1, 3000, 20))
+        signal = np.random.randn(sum(sizes)).astype('float32')
+        self.check(signal, sizes, 1024, 256)
+
+    def test_irregular_stereo(self):
+        np.random.seed(1)
+        sizes = list(np.random.randint(1, 700, 30))
+        signal = np.random.randn(sum(sizes), 2)
+        self.check(signal, sizes, 512, 512)
+
+    def test_empty_last_block(self):
+        signal = np.random.randn(4096, 2).astype('float32')
+        self.check(signal, [1024] * 4 + [0], 1024, 512)
+
+    def test_short_signal(self):
+        signal = np.random.randn(100).astype('float32')
+        self.check(signal, [100], 1024, 256)
+
+    def test_batch(self):
+        np.random.seed(2)
+        sizes = list(np.random.randint(1, 3000, 20))
+        signal = np.random.randn(sum(sizes)).astype('float32')
+        self.check(signal, sizes, 2048, 1024, FakeBatchAnalyzer)
+
+
+class TestFramesAdapterBatch(TestFramesAdapter):
+
+    analyzer_class = FakeBatchAnalyzer
+
+    def setUp(self):
+        super(TestFramesAdapterBatch, self).setUp()
+        FakeBatchAnalyzer.decorated_process = self.decorator(
+            FakeBatchAnalyzer.process)
+
+
 if __name__ == '__main__':
     unittest.main(testRunner=TestRunner())
@@ -0,0 +1,57 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.core.tools.buffering import BlockAssembler
+
+
+class TestBlockAssembler(unittest.TestCase):
+    "Test the assembly of decoded buffers into fixed-size blocks"
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = np.random.randn(10000, 2).astype('float32')
+
+    def assemble(self, blocksize, sizes):
+        blocks = BlockAssembler(blocksize, 2)
+        output = []
+        offset = 0
+        for size in sizes:
+            output.extend(blocks.write(self.samples[offset:offset + size]))
+            offset += size
+        return blocks, output
+
+    def test_small_buffers(self):
+        "Buffers smaller than a block, as decoded from mp3"
+        sizes = [1152] * 8 + [10000 - 8 * 1152]
+        blocks, output = self.assemble(4096, sizes)
+        self.assertEqual([len(block) for block in output], [4096, 4096])
+        last = blocks.flush()
+        assert_array_equal(np.concatenate(output + [last]), self.samples)
+        self.assertEqual(last.dtype, np.float32)
+        self.assertEqual(len(blocks.flush()), 0)
+
+    def test_large_buffers(self):
+        "A buffer larger than a block completes several of them"
+        blocks, output = self.assemble(1000, [3500, 6500])
+        self.assertEqual(len(output), 10)
+        assert_array_equal(np.concatenate(output), self.samples)
+        # The blocks kept by the consumer are never overwritten
+        self.assertFalse(any(np.shares_memory(output[0], block)
+                             for block in output[1:]))
+
+    def test_stats(self):
+        blocks, output = self.assemble(4096, [1000] * 10)
+        stats = blocks.stats()
+        self.assertEqual(stats['samples'], 10000)
+        self.assertEqual(stats['buffers'], 10)
+        self.assertEqual(stats['blocks'], 2)
+        self.assertGreaterEqual(stats['samples_per_second'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -5,6 +5,7 @@ from __future__ import division
 from timeside.plugins.decoder.file import FileDecoder
 from timeside.plugins.analyzer.level import Level
 from timeside.core.processor import ProcessPipe
+from timeside.core.tools.buffering import FramesStack
 import unittest
 from unit_timeside import TestRunner
 from timeside.core.tools.test_samples import samples
@@ -61,7 +62,7 @@ class TestDecodingFromStack(unittest.TestCase):
 
         pipe.run()
 
-        self.assertIsInstance(pipe.frames_stack, list)
+        self.assertIsInstance(pipe.frames_stack, FramesStack)
 
         results_on_file = level.results['level.rms'].data.copy()
 
@@ -0,0 +1,63 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.core import get_processor
+from timeside.core.analyzer import FrameAccumulator
+
+
+class TestFrameAccumulator(unittest.TestCase):
+    """Test the preallocated frames storage of the analyzers"""
+
+    def test_grow(self):
+        "The storage grows geometrically beyond the expected size"
+        frames = FrameAccumulator(4, shape=(3,))
+        expected = []
+        for index in range(50):
+            block = np.full((index % 5, 3), index, dtype='float32')
+            frames.extend(block)
+            frames.append(block.sum(axis=0))
+            expected.extend(block)
+            expected.append(block.sum(axis=0))
+        assert_array_equal(frames.data, np.array(expected))
+        self.assertEqual(len(frames), len(expected))
+        # float32 frames inferred from the first ones
+        self.assertEqual(frames.data.dtype, np.float32)
+        self.assertLess(len(frames._storage), 2 * len(expected))
+
+    def test_empty(self):
+        frames = FrameAccumulator(shape=(5,))
+        self.assertEqual(frames.data.shape, (0, 5))
+        frames.extend(np.ones((3, 5)))
+        frames.clear()
+        self.assertEqual(len(frames), 0)
+        self.assertEqual(frames.data.shape, (0, 5))
+
+    def test_for_analyzer(self):
+        "Sized from the source totalframes and the analyzer stepsize"
+        samples = np.random.randn(44100, 2)
+        decoder = get_processor('array_decoder')(samples)
+        spectrogram = get_processor('spectrogram_analyzer')(
+            input_blocksize=2048, input_stepsize=512)
+        waveform = get_processor('waveform_analyzer')()
+        (decoder | spectrogram | waveform).run()
+
+        frames = FrameAccumulator.for_analyzer(spectrogram)
+        self.assertEqual(frames.capacity, 44100 // 512 + 2)
+        self.assertGreaterEqual(frames.capacity,
+                                len(spectrogram.values))
+        # Results are views on the preallocated storage
+        self.assertTrue(np.shares_memory(
+            spectrogram.results['spectrogram_analyzer'].data,
+            spectrogram.values._storage))
+        self.assertEqual(len(waveform.values._storage), 44101)
+        assert_array_equal(waveform.results['waveform_analyzer'].data,
+                           samples.astype('float32'))
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
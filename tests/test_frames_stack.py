@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.core.tools.buffering import FramesStack
+
+
+class TestFramesStack(unittest.TestCase):
+    "Test the file backed stack of decoded frames"
+
+    def setUp(self):
+        np.random.seed(0)
+        self.blocks = [(np.random.randn(1024, 2).astype('float32'), False)
+                       for _ in range(5)]
+        self.blocks.append((np.random.randn(100, 2).astype('float32'), True))
+        self.stack = FramesStack()
+        for block in self.blocks:
+            self.stack.append(block)
+
+    def tearDown(self):
+        self.stack.close()
+
+    def test_replay(self):
+        "Replay yields the stacked blocks in order"
+        self.assertEqual(len(self.stack), len(self.blocks))
+        for (frames, eod), (ref_frames, ref_eod) in zip(self.stack,
+                                                        self.blocks):
+            assert_array_equal(frames, ref_frames)
+            self.assertEqual(frames.dtype, ref_frames.dtype)
+            self.assertEqual(eod, ref_eod)
+
+    def test_views(self):
+        "Stacked blocks are read-only views on a memory map"
+        frames, _ = self.stack[2]
+        self.assertIsInstance(frames.base, np.memmap)
+        self.assertFalse(frames.flags.writeable)
+
+    def test_append_after_replay(self):
+        list(self.stack)
+        block = (np.zeros((10, 2), dtype='float32'), True)
+        self.stack.append(block)
+        assert_array_equal(self.stack[-1][0], block[0])
+        assert_array_equal(self.stack[0][0], self.blocks[0][0])
+
+    def test_memmap_blocks(self):
+        "Blocks already memory mapped are not copied"
+        tmp = tempfile.NamedTemporaryFile(delete=False)
+        tmp.close()
+        try:
+            mapped = np.memmap(tmp.name, dtype='float32', mode='w+',
+                               shape=(64, 2))
+            stack = FramesStack()
+            frames = mapped[:32]
+            stack.append((frames, False))
+            self.assertIs(stack[0][0], frames)
+            stack.close()
+            del mapped, frames
+        finally:
+            os.remove(tmp.name)
+
+    def test_empty_block(self):
+        self.stack.append((np.zeros((0, 2), dtype='float32'), True))
+        self.assertEqual(self.stack[-1][0].shape, (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
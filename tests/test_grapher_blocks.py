@@ -0,0 +1,111 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.plugins.grapher.spectrogram_log import SpectrogramLog
+from timeside.plugins.grapher.waveform_centroid import WaveformCentroid
+from timeside.plugins.grapher.waveform_contour import WaveformContourBlack
+from timeside.plugins.grapher.waveform_simple import Waveform
+from timeside.plugins.grapher.utils import peaks
+
+
+def spectrogram_log_process(grapher, frames, eod):
+    "Render a block of frames one pixel at a time"
+    chunk = frames[:, 0].copy()
+    chunk.shape = (len(chunk), 1)
+    for samples, end in grapher.pixels_adapter.process(chunk, eod):
+        if grapher.pixel_cursor < grapher.image_width:
+            (spectral_centroid, db_spectrum) = grapher.spectrum.process(
+                samples, True)
+            grapher.draw_spectrum(grapher.pixel_cursor, db_spectrum)
+            grapher.pixel_cursor += 1
+
+
+def waveform_centroid_process(grapher, frames, eod):
+    "Render a block of frames one pixel at a time"
+    buffer = frames[:, 0].copy()
+    buffer.shape = (len(buffer), 1)
+    for samples, end in grapher.pixels_adapter.process(buffer, eod):
+        if grapher.pixel_cursor < grapher.image_width:
+            (spectral_centroid, db_spectrum) = grapher.spectrum.process(
+                samples, True)
+            line_color = grapher.color_lookup[int(spectral_centroid * 255.0)]
+            grapher.draw_peaks(grapher.pixel_cursor, peaks(samples),
+                               line_color)
+            grapher.pixel_cursor += 1
+
+
+def waveform_process(grapher, frames, eod):
+    "Render a block of frames one pixel at a time"
+    buffer = frames[:, 0]
+    buffer.shape = (len(buffer), 1)
+    for samples, end in grapher.pixels_adapter.process(buffer, eod):
+        if grapher.pixel_cursor < grapher.image_width - 1:
+            grapher.draw_peaks(grapher.pixel_cursor, peaks(samples),
+                               grapher.line_color)
+            grapher.pixel_cursor += 1
+    if grapher.pixel_cursor == grapher.image_width - 1:
+        grapher.draw_peaks(grapher.pixel_cursor, peaks(samples),
+                           grapher.line_color)
+        grapher.pixel_cursor += 1
+
+
+def waveform_contour_process(grapher, frames, eod):
+    "Render a block of frames one pixel at a time"
+    buffer = frames[:, 0].copy()
+    buffer.shape = (len(buffer), 1)
+    for samples, end in grapher.pixels_adapter.process(buffer, eod):
+        if grapher.pixel_cursor < grapher.image_width:
+            grapher.contour[grapher.pixel_cursor] = np.max(peaks(samples))
+            grapher.pixel_cursor += 1
+    if eod:
+        grapher.draw_peaks_contour()
+
+
+class TestGrapherBlocks(unittest.TestCase):
+    "Test the graphers rendering all the pixels of a block at once"
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = (0.3 * np.random.randn(3 * 44100, 1)).astype('float32')
+
+    def render(self, grapher, blocksize, process=None):
+        grapher.setup(channels=1, samplerate=44100, blocksize=blocksize,
+                      totalframes=len(self.samples))
+        process = process or type(grapher).process
+        for start in range(0, len(self.samples), blocksize):
+            frames = self.samples[start:start + blocksize]
+            process(grapher, frames, start + blocksize >= len(self.samples))
+        grapher.post_process()
+        return np.asarray(grapher.image)
+
+    def assertRenderedAsPixels(self, grapher_class, process):
+        # Pixel columns straddling the input blocks
+        for blocksize in (333, 1000):
+            image = self.render(grapher_class(width=2048, height=512),
+                                blocksize)
+            reference = self.render(grapher_class(width=2048, height=512),
+                                    blocksize, process)
+            assert_array_equal(image, reference)
+
+    def test_spectrogram_log(self):
+        self.assertRenderedAsPixels(SpectrogramLog, spectrogram_log_process)
+
+    def test_waveform(self):
+        self.assertRenderedAsPixels(Waveform, waveform_process)
+
+    def test_waveform_contour(self):
+        self.assertRenderedAsPixels(WaveformContourBlack,
+                                    waveform_contour_process)
+
+    def test_waveform_centroid(self):
+        self.assertRenderedAsPixels(WaveformCentroid,
+                                    waveform_centroid_process)
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
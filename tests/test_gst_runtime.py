@@ -0,0 +1,43 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unit_timeside import TestRunner
+
+from timeside.core import get_processor
+from timeside.core.tools.gstutils import gst_runtime
+from timeside.core.tools.test_samples import samples
+
+
+class TestGstRuntime(unittest.TestCase):
+    "Test the main loop shared by the Gst pipelines of the process"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_shared_loop(self):
+        "Decoders and encoders do not start a loop thread each"
+        runtime = gst_runtime()
+        for _ in range(3):
+            decoder = get_processor('file_decoder')(samples['sweep.wav'])
+            encoders = [get_processor('wav_encoder')(
+                os.path.join(self.tmpdir, '%d.wav' % index), overwrite=True)
+                for index in range(3)]
+            pipe = decoder | encoders
+            pipe.run()
+            self.assertEqual(len(runtime), 0)
+        loops = [thread for thread in threading.enumerate()
+                 if thread.name == 'gst_mainloop']
+        self.assertEqual(loops, [runtime.thread])
+        self.assertIs(gst_runtime(), runtime)
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -67,6 +67,40 @@ class TestFixedSizeInputAdapter(unittest.TestCase):
             True)
 
 
+class TestFixedSizeInputAdapterBlocks(TestFixedSizeInputAdapter):
+    "Test the fixed-sized input adapter returning block matrices"
+
+    def assertIOEquals(self, adapter, input, input_eod, output, output_eod=None):
+        blocks, last = adapter.process_blocks(input, input_eod)
+        self.assertEqual(blocks.ndim, 3)
+        buffers = list(blocks)
+        if last is not None:
+            buffers.append(last)
+        _eod = input_eod if buffers else None
+
+        self.assertEqual(len(buffers), len(output))
+        for buffer, a in zip(buffers, output):
+            if not numpy.array_equiv(buffer, a):
+                self.fail("\n-- Actual --\n%s\n -- Expected -- \n%s\n" % (str(buffer), str(a)))
+
+        if _eod != output_eod:
+            self.fail("eod do not match: %s != %s", (str(_eod), str(output_eod)))
+
+    def testView(self):
+        "Test that aligned blocks are a view on the input"
+        adapter = FixedSizeInputAdapter(4, 2)
+        blocks, last = adapter.process_blocks(self.data[0:10], False)
+        self.assertEqual(blocks.shape, (2, 4, 2))
+        self.assertTrue(numpy.shares_memory(blocks, self.data))
+        self.assertIsNone(last)
+
+        blocks, last = adapter.process_blocks(self.data[10:22], True)
+        self.assertEqual(blocks.shape, (3, 4, 2))
+        self.assertTrue(numpy.array_equal(blocks.reshape(-1, 2),
+                                          self.data[8:20]))
+        self.assertTrue(numpy.array_equal(last, self.data[20:22]))
+
+
 if __name__ == '__main__':
     unittest.main(testRunner=TestRunner())
 
@@ -0,0 +1,60 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+from unit_timeside import TestRunner
+
+from timeside.core.tools.media_info_cache import (MediaInfoCache,
+                                                  set_media_info_cache)
+from timeside.plugins.decoder.utils import get_media_uri_info, discover_many
+
+INFO = {'duration': 8.0,
+        'streams': [{'bitrate': 1411200, 'channels': 2, 'depth': 16,
+                     'max_bitrate': 0, 'samplerate': 44100}]}
+
+
+class TestMediaInfoCache(unittest.TestCase):
+    "Test the on-disk cache of the media discovery results"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = MediaInfoCache(os.path.join(self.tmpdir, 'cache'))
+        set_media_info_cache(self.cache)
+        self.path = os.path.join(self.tmpdir, 'sweep.wav')
+        with open(self.path, 'wb') as f:
+            f.write(b'RIFF' + b'\0' * 100)
+        self.uri = 'file://' + self.path
+
+    def tearDown(self):
+        set_media_info_cache(None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_key(self):
+        "Local files are keyed by path, size and mtime"
+        key = self.cache.key(self.uri)
+        self.assertEqual(self.cache.key(self.path), key)
+        self.assertEqual(self.cache.key(self.uri, sha1='abc'), key)
+        with open(self.path, 'ab') as f:
+            f.write(b'\0')
+        self.assertNotEqual(self.cache.key(self.uri), key)
+        self.assertIsNone(self.cache.key('http://host/sweep.wav'))
+        self.assertIsNotNone(self.cache.key('http://host/sweep.wav', 'abc'))
+        self.assertIsNone(self.cache.key(self.uri + '.missing'))
+
+    def test_hit(self):
+        "Cached media are not probed"
+        self.cache.set(self.cache.key(self.uri), INFO)
+        self.assertEqual(get_media_uri_info(self.uri), INFO)
+        self.assertEqual(discover_many([self.uri]), {self.uri: INFO})
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['entries'], 1)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(self.cache.key(self.uri)))
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -0,0 +1,242 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.core import Processor, implements, interfacedoc, get_processor
+from timeside.core.api import IProcessor
+from timeside.core.tools.pcm_cache import PCMCache, set_pcm_cache
+from timeside.plugins.decoder.array import ArrayDecoder
+from timeside.plugins.decoder.utils import (pcm_cache_setup,
+                                            pcm_cache_process,
+                                            pcm_cache_stop)
+
+
+class FakeDecoder(object):
+    """Decode blocks from an array and count the decoding calls"""
+
+    output_blocksize = 1000
+
+    def __init__(self, samples, sha1='0123456789abcdef'):
+        self.samples = samples
+        self.sha1 = sha1
+        self._segment = (0., None)
+        self.decoded_blocks = 0
+
+    @staticmethod
+    def id():
+        return "fake_decoder"
+
+    @pcm_cache_setup
+    def setup(self, channels=None, samplerate=None, blocksize=None):
+        if blocksize:
+            self.output_blocksize = blocksize
+        self.input_samplerate = self.output_samplerate = 44100
+        self.input_channels = self.output_channels = self.samples.shape[1]
+        self.input_totalframes = len(self.samples)
+        self.mimetype = 'audio/x-wav'
+        self.position = 0
+
+    @pcm_cache_process
+    def process(self):
+        self.decoded_blocks += 1
+        frames = self.samples[self.position:
+                              self.position + self.output_blocksize]
+        self.position += len(frames)
+        return frames, len(frames) < self.output_blocksize
+
+
+class OtherDecoder(FakeDecoder):
+    """Decoder of the same media by another decoder"""
+
+    @staticmethod
+    def id():
+        return "other_fake_decoder"
+
+
+class UnhashedDecoder(FakeDecoder):
+    """Decoder of a local file whose sha1 must not be computed"""
+
+    @property
+    def sha1(self):
+        raise AssertionError('The sha1 of a local file was computed')
+
+    @sha1.setter
+    def sha1(self, value):
+        pass
+
+
+class CachedArrayDecoder(ArrayDecoder):
+    """Array decoder going through the PCM cache, whose stop requires its
+    decoding pipeline like the FileDecoder"""
+
+    pipeline = None
+
+    @pcm_cache_setup
+    def setup(self, channels=None, samplerate=None, blocksize=None):
+        super(CachedArrayDecoder, self).setup(channels, samplerate, blocksize)
+        self.pipeline = True
+
+    @pcm_cache_process
+    def process(self):
+        return super(CachedArrayDecoder, self).process()
+
+    @pcm_cache_stop
+    def stop(self):
+        self.pipeline.stopped = True
+
+
+class StopPipe(Processor):
+    """Stop the pipe at its first block"""
+    implements(IProcessor)
+
+    @staticmethod
+    @interfacedoc
+    def id():
+        return "test_stop_pipe"
+
+    @interfacedoc
+    def process(self, frames, eod=False):
+        self.process_pipe.stop()
+        return frames, eod
+
+
+def decode(decoder, **kwargs):
+    decoder.setup(**kwargs)
+    blocks = []
+    eod = False
+    while not eod:
+        frames, eod = decoder.process()
+        blocks.append((np.array(frames), eod))
+    return blocks
+
+
+class TestPCMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = PCMCache(self.path)
+        set_pcm_cache(self.cache)
+        np.random.seed(0)
+        self.samples = np.random.randn(10500, 2).astype('float32')
+
+    def tearDown(self):
+        set_pcm_cache(None)
+        shutil.rmtree(self.path)
+
+    def assertSameBlocks(self, blocks, ref):
+        self.assertEqual(len(blocks), len(ref))
+        for (frames, eod), (ref_frames, ref_eod) in zip(blocks, ref):
+            assert_array_equal(frames, ref_frames)
+            self.assertEqual(eod, ref_eod)
+
+    def test_hit(self):
+        "A second decoding is read from the cache"
+        ref = decode(FakeDecoder(self.samples))
+        decoder = FakeDecoder(self.samples)
+        blocks = decode(decoder)
+        self.assertEqual(decoder.decoded_blocks, 0)
+        self.assertSameBlocks(blocks, ref)
+        self.assertEqual(decoder.output_channels, 2)
+        self.assertEqual(decoder.input_totalframes, len(self.samples))
+        self.assertEqual(decoder.mimetype, 'audio/x-wav')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+        self.assertEqual(stats['bytes'], self.samples.nbytes)
+
+    def test_blocksize(self):
+        "Cached streams are read with the requested blocksize"
+        decode(FakeDecoder(self.samples))
+        ref = decode(FakeDecoder(self.samples), blocksize=500)
+        self.assertSameBlocks(ref, [(self.samples[i:i + 500], i == 10500)
+                                    for i in range(0, 10501, 500)])
+
+    def test_key(self):
+        "Decoder, output format and segment are part of the key"
+        decode(FakeDecoder(self.samples))
+        decoder = FakeDecoder(self.samples)
+        decode(decoder, samplerate=22050)
+        self.assertGreater(decoder.decoded_blocks, 0)
+        decoder = FakeDecoder(self.samples)
+        decoder._segment = (1., 2.)
+        decode(decoder)
+        self.assertGreater(decoder.decoded_blocks, 0)
+        decoder = OtherDecoder(self.samples)
+        decode(decoder)
+        self.assertGreater(decoder.decoded_blocks, 0)
+        self.assertEqual(self.cache.stats()['entries'], 4)
+
+    def test_eviction(self):
+        "Least recently used streams are evicted above max_bytes"
+        self.cache.max_bytes = int(2.5 * self.samples.nbytes)
+        for sha1 in ('a', 'b', 'c'):
+            decode(FakeDecoder(self.samples, sha1=sha1))
+        decode(FakeDecoder(self.samples, sha1='a'))
+        decode(FakeDecoder(self.samples, sha1='d'))
+        self.assertEqual(self.cache.stats()['entries'], 2)
+        decoder = FakeDecoder(self.samples, sha1='a')
+        decode(decoder)
+        self.assertEqual(decoder.decoded_blocks, 0)
+        decoder = FakeDecoder(self.samples, sha1='b')
+        decode(decoder)
+        self.assertGreater(decoder.decoded_blocks, 0)
+
+    def test_incomplete(self):
+        "A stream is only cached once fully decoded"
+        decoder = FakeDecoder(self.samples)
+        decoder.setup()
+        decoder.process()
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        decode(decoder)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+
+    def test_stop_hit(self):
+        "A pipe whose source is read from the cache is stopped"
+        decode(CachedArrayDecoder(self.samples, sha1='0123'))
+        decoder = CachedArrayDecoder(self.samples, sha1='0123')
+        level = get_processor('level')()
+        (decoder | StopPipe() | level).run(blocksize=1000)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertIs(decoder.pipeline, None)
+        self.assertEqual(len(level.results['level.max'].data), 1)
+
+    def test_file_key(self):
+        "Local files are looked up without computing their sha1"
+        path = os.path.join(self.path, 'sweep.wav')
+        with open(path, 'wb') as f:
+            f.write(b'RIFF')
+        decode(FakeDecoder(self.samples))
+        decoder = FakeDecoder(self.samples)
+        decoder.uri = 'file://' + path
+        decode(decoder)
+        decoder = UnhashedDecoder(self.samples)
+        decoder.uri = 'file://' + path
+        blocks = decode(decoder)
+        self.assertEqual(decoder.decoded_blocks, 0)
+        self.assertEqual(len(np.concatenate([b for b, _ in blocks])),
+                         len(self.samples))
+        # A modified file is decoded again
+        with open(path, 'ab') as f:
+            f.write(b'WAVE')
+        decoder = UnhashedDecoder(self.samples)
+        decoder.uri = 'file://' + path
+        decode(decoder)
+        self.assertGreater(decoder.decoded_blocks, 0)
+
+    def test_disabled(self):
+        set_pcm_cache(None)
+        decode(FakeDecoder(self.samples))
+        decoder = FakeDecoder(self.samples)
+        decode(decoder)
+        self.assertGreater(decoder.decoded_blocks, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -0,0 +1,184 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import queue
+import time
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.core import get_processor
+from timeside.core.processor import Processor
+from timeside.core.api import IProcessor
+from timeside.core.component import implements, interfacedoc
+
+BLOCKSIZE = 1024
+
+
+class QueueStreamer(Processor):
+    "Stream the input blocks through a bounded queue, like a GstEncoder"
+    implements(IProcessor)
+
+    streaming = True
+
+    @staticmethod
+    @interfacedoc
+    def id():
+        return 'test_queue_streamer'
+
+    @staticmethod
+    @interfacedoc
+    def version():
+        return '1.0'
+
+    @interfacedoc
+    def setup(self, channels=None, samplerate=None, blocksize=None,
+              totalframes=None):
+        super(QueueStreamer, self).setup(channels, samplerate, blocksize,
+                                         totalframes)
+        self.chunks = queue.Queue(2)
+        self.eod = False
+
+    @interfacedoc
+    def process(self, frames, eod=False):
+        self.chunks.put(frames.copy())
+        if eod:
+            self.eod = True
+            self.chunks.put(None)
+        return frames, eod
+
+    def get_stream_chunk(self):
+        return self.chunks.get()
+
+
+class SlowProcessor(Processor):
+    "Spend some time on each block"
+    implements(IProcessor)
+
+    @staticmethod
+    @interfacedoc
+    def id():
+        return 'test_slow_processor'
+
+    @staticmethod
+    @interfacedoc
+    def version():
+        return '1.0'
+
+    @interfacedoc
+    def setup(self, channels=None, samplerate=None, blocksize=None,
+              totalframes=None):
+        super(SlowProcessor, self).setup(channels, samplerate, blocksize,
+                                         totalframes)
+        self.blocks = 0
+        self.eod = False
+        self.released = False
+
+    @interfacedoc
+    def process(self, frames, eod=False):
+        time.sleep(0.005)
+        self.blocks += 1
+        self.eod = eod
+        return frames, eod
+
+    @interfacedoc
+    def release(self):
+        self.released = True
+
+
+class TestPipeAsync(unittest.TestCase):
+    """Test the asyncio entry points of the pipe"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = np.random.randn(200 * BLOCKSIZE, 2).astype('float32')
+
+    def decoder(self):
+        return get_processor('array_decoder')(self.samples)
+
+    def test_arun(self):
+        "Same results as run"
+        reference = get_processor('level')()
+        (self.decoder() | reference).run()
+        level = get_processor('level')()
+        pipe = self.decoder() | level
+        results = asyncio.run(pipe.arun())
+        self.assertIs(results, pipe.results)
+        assert_array_equal(level.results['level.rms'].data,
+                           reference.results['level.rms'].data)
+
+    def test_arun_concurrent(self):
+        "Several pipes run concurrently on the same loop"
+        async def main(pipes):
+            return await asyncio.gather(*[pipe.arun(blocksize=BLOCKSIZE)
+                                          for pipe in pipes])
+        processors = [SlowProcessor() for _ in range(3)]
+        pipes = [self.decoder() | processor for processor in processors]
+        asyncio.run(main(pipes))
+        for processor in processors:
+            self.assertEqual(processor.blocks, 200)
+            self.assertTrue(processor.eod)
+
+    def test_arun_cancel(self):
+        "Cancelling stops the pipe and releases its processors"
+        processor = SlowProcessor()
+        pipe = self.decoder() | processor
+
+        async def main():
+            task = asyncio.ensure_future(pipe.arun(blocksize=BLOCKSIZE))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            await task
+
+        self.assertRaises(asyncio.CancelledError, asyncio.run, main())
+        self.assertLess(processor.blocks, 200)
+        self.assertTrue(processor.eod)
+        self.assertTrue(processor.released)
+        self.assertFalse(pipe._is_running)
+
+        # The pipe can be run again
+        pipe.run(blocksize=BLOCKSIZE)
+        self.assertEqual(processor.blocks, 200)
+
+    def test_astream(self):
+        "The chunks of the streaming processor are yielded"
+        pipe = self.decoder() | QueueStreamer()
+
+        async def main():
+            return [chunk async for chunk in pipe.astream(blocksize=BLOCKSIZE)]
+
+        chunks = asyncio.run(main())
+        self.assertEqual(len(chunks), 200)
+        assert_array_equal(np.concatenate(chunks), self.samples)
+
+    def test_astream_close(self):
+        "Leaving the iteration early stops the pipe"
+        streamer = QueueStreamer()
+        slow = SlowProcessor()
+        pipe = self.decoder() | streamer | slow
+
+        async def main():
+            chunks = pipe.astream(blocksize=BLOCKSIZE)
+            chunk = await chunks.__anext__()
+            await chunks.aclose()
+            return chunk
+
+        chunk = asyncio.run(main())
+        assert_array_equal(chunk, self.samples[:BLOCKSIZE])
+        self.assertTrue(streamer.eod)
+        self.assertLess(slow.blocks, 200)
+        self.assertFalse(pipe._is_running)
+
+    def test_astream_no_streamer(self):
+        pipe = self.decoder() | get_processor('level')()
+
+        async def main():
+            return [chunk async for chunk in pipe.astream()]
+
+        self.assertRaises(TypeError, asyncio.run, main())
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
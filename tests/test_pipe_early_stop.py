@@ -0,0 +1,87 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+
+from timeside.core import get_processor
+from timeside.core.processor import Processor
+from timeside.core.api import IProcessor
+from timeside.core.component import implements, interfacedoc
+
+BLOCKSIZE = 1024
+
+
+class FirstFrames(Processor):
+    "Only need the first frames of the source"
+    implements(IProcessor)
+
+    @staticmethod
+    @interfacedoc
+    def id():
+        return 'test_first_frames'
+
+    @staticmethod
+    @interfacedoc
+    def version():
+        return '1.0'
+
+    def __init__(self, frames):
+        super(FirstFrames, self).__init__()
+        self.frames = frames
+
+    @interfacedoc
+    def setup(self, channels=None, samplerate=None, blocksize=None,
+              totalframes=None):
+        super(FirstFrames, self).setup(channels, samplerate, blocksize,
+                                       totalframes)
+        self.received = 0
+        self.eods = []
+
+    @interfacedoc
+    def process(self, frames, eod=False):
+        self.received += len(frames)
+        self.eods.append(eod)
+        return frames, eod
+
+    @interfacedoc
+    def needs_more_audio(self):
+        return self.received < self.frames
+
+
+class TestPipeEarlyStop(unittest.TestCase):
+    """Test the end of a run once no processor needs more audio"""
+
+    def setUp(self):
+        self.samples = np.random.randn(100 * BLOCKSIZE, 2)
+        self.decoder = get_processor('array_decoder')(self.samples)
+
+    def test_early_stop(self):
+        "The block following the satisfaction is the last one"
+        first = FirstFrames(10 * BLOCKSIZE + 1)
+        waveform = get_processor('waveform_analyzer')()
+        waveform.needs_more_audio = lambda: False
+        pipe = self.decoder | first | waveform
+        pipe.run(blocksize=BLOCKSIZE)
+        self.assertEqual(first.received, 12 * BLOCKSIZE)
+        self.assertEqual(first.eods, [False] * 11 + [True])
+        self.assertEqual(len(waveform.results['waveform_analyzer'].data),
+                         12 * BLOCKSIZE)
+
+        # The next run decodes from the start
+        list(pipe.run_many([self.decoder], blocksize=BLOCKSIZE))
+        self.assertEqual(first.received, 12 * BLOCKSIZE)
+
+    def test_needs_more_audio(self):
+        "Decoding goes on while a processor needs audio"
+        first = FirstFrames(BLOCKSIZE)
+        level = get_processor('level')()
+        pipe = self.decoder | first | level
+        pipe.run(blocksize=BLOCKSIZE)
+        self.assertEqual(first.received, len(self.samples))
+        self.assertEqual(first.eods, [False] * 99 + [True])
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -0,0 +1,100 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+
+from timeside.core import get_processor
+from timeside.core.exceptions import CostError
+from timeside.core.tools import cost
+from timeside.core.tools.cost import Cost, CostModel
+
+
+class TestPipeEstimate(unittest.TestCase):
+    """Test the cost estimate of a pipe"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = np.random.randn(4 * 44100, 2)
+        self.models = dict(cost.COST_MODELS)
+
+    def tearDown(self):
+        cost.COST_MODELS.clear()
+        cost.COST_MODELS.update(self.models)
+
+    def pipe(self):
+        decoder = get_processor('array_decoder')(self.samples)
+        analyzers = [get_processor('spectrogram_analyzer')(),
+                     get_processor('waveform_analyzer')()]
+        return decoder | analyzers, analyzers
+
+    def test_fit(self):
+        "A linear model is recovered from its costs"
+        model = CostModel((1., 2.), (10., 3.), (0., 4.))
+        samples = [100, 200, 400]
+        fitted = CostModel.fit(samples, [model(size) for size in samples])
+        for size in (50, 1000):
+            np.testing.assert_allclose(fitted(size), model(size))
+        self.assertEqual(CostModel.from_dict(model.as_dict()).coefficients,
+                         model.coefficients)
+
+    def test_result_bytes(self):
+        "Framewise result sizes are known from the parameters"
+        pipe, analyzers = self.pipe()
+        estimate = pipe.estimate(4.)
+        pipe.run()
+        for analyzer in analyzers:
+            result = list(analyzer.results.values())[0]
+            self.assertAlmostEqual(
+                estimate[analyzer.uuid()].result_bytes,
+                result.data_object.value.nbytes, delta=0.01 *
+                result.data_object.value.nbytes)
+        total = estimate.total
+        self.assertEqual(total.result_bytes, sum(
+            value.result_bytes for value in estimate.values()))
+        self.assertIn('total', str(estimate))
+
+    def test_calibrate(self):
+        "Calibrated models are used by the estimates and can be saved"
+        models = cost.calibrate(['level'], durations=(1., 2., 4.))
+        self.assertIs(cost.COST_MODELS['level'], models['level'])
+        level = get_processor('level')()
+        estimate = level.estimate(60., 44100, 2)
+        self.assertGreater(estimate.cpu_seconds, 0)
+        self.assertGreater(estimate.peak_bytes, 0)
+
+        tmp = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        tmp.close()
+        try:
+            cost.save_models(tmp.name)
+            cost.COST_MODELS.clear()
+            cost.load_models(tmp.name)
+        finally:
+            os.remove(tmp.name)
+        self.assertEqual(level.estimate(60., 44100, 2), estimate)
+
+    def test_admit(self):
+        pipe, analyzers = self.pipe()
+        for analyzer in analyzers:
+            cost.COST_MODELS[analyzer.id()] = CostModel()
+        estimate = pipe.estimate(3 * 3600.)
+        total = cost.admit(estimate, max_peak_bytes=10 * 2 ** 30)
+        self.assertIsInstance(total, Cost)
+        # 3 hours of spectrogram are too large for a 1GB worker
+        self.assertRaises(CostError, cost.admit, estimate,
+                          max_peak_bytes=2 ** 30)
+
+    def test_uncalibrated(self):
+        "Pipes with processors without a cost model are not checked"
+        pipe, analyzers = self.pipe()
+        cost.COST_MODELS[analyzers[0].id()] = CostModel()
+        estimate = pipe.estimate(3 * 3600.)
+        self.assertEqual(estimate.uncalibrated, [analyzers[1].id()])
+        self.assertIsNone(cost.admit(estimate, max_peak_bytes=2 ** 30))
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+
+from timeside.core import get_processor
+from timeside.plugins.decoder.array import ArrayDecoder
+
+ANALYZERS = ['spectrogram_analyzer', 'waveform_analyzer']
+
+
+class EmptyLastBlockDecoder(ArrayDecoder):
+    """Array decoder ending with an empty block, as the FileDecoder when the
+    stream ends on a full block"""
+
+    def get_frames(self):
+        for index in range(0, len(self.samples), self.output_blocksize):
+            yield self.samples[index:index + self.output_blocksize], False
+        yield self.samples[:0], True
+
+
+class TestPipePartialResults(unittest.TestCase):
+    """Test the result chunks emitted while a pipe runs"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = np.random.randn(5 * 44100 + 123, 2)
+
+    def pipe(self):
+        decoder = get_processor('array_decoder')(self.samples)
+        analyzers = [get_processor(analyzer_id)()
+                     for analyzer_id in ANALYZERS]
+        return decoder | analyzers, analyzers
+
+    def assertChunks(self, chunks, analyzers):
+        for analyzer, result_id in zip(analyzers, ANALYZERS):
+            result = analyzer.results[result_id]
+            parts = [chunk for chunk in chunks
+                     if chunk.proc_uuid == analyzer.uuid()]
+            self.assertGreater(len(parts), 1)
+            index = 0
+            for chunk in parts:
+                self.assertEqual(chunk.result_id, result_id)
+                self.assertEqual(chunk.index, index)
+                self.assertAlmostEqual(chunk.start, result.time[index])
+                last = index + len(chunk.data) - 1
+                self.assertAlmostEqual(
+                    chunk.end, result.time[last] + result.duration[last])
+                index += len(chunk.data)
+            assert_allclose(np.concatenate([chunk.data for chunk in parts]),
+                            result.data)
+
+    def test_subscribe(self):
+        pipe, analyzers = self.pipe()
+        chunks = []
+        pipe.subscribe(chunks.append)
+        pipe.run()
+        self.assertChunks(chunks, analyzers)
+
+    def test_empty_last_block(self):
+        "An empty last block does not emit the frames again"
+        self.samples = self.samples[:4 * 1024]
+        decoder = EmptyLastBlockDecoder(self.samples)
+        analyzers = [get_processor(analyzer_id)()
+                     for analyzer_id in ANALYZERS]
+        pipe = decoder | analyzers
+        chunks = []
+        pipe.subscribe(chunks.append)
+        pipe.run(blocksize=1024)
+        waveform = [(chunk.index, len(chunk.data)) for chunk in chunks
+                    if chunk.proc_uuid == analyzers[1].uuid()]
+        self.assertEqual(waveform, [(index, 1024)
+                                    for index in range(0, 4096, 1024)])
+        self.assertChunks(chunks, analyzers)
+
+    def test_unsubscribe(self):
+        pipe, analyzers = self.pipe()
+        chunks = []
+        pipe.subscribe(chunks.append)
+        pipe.unsubscribe(chunks.append)
+        pipe.run()
+        self.assertEqual(chunks, [])
+
+    def test_subscribe_workers(self):
+        pipe, analyzers = self.pipe()
+        chunks = []
+        pipe.subscribe(chunks.append)
+        pipe.run(workers=2)
+        self.assertChunks(chunks, analyzers)
+
+    def test_partial_results(self):
+        pipe, analyzers = self.pipe()
+        chunks = list(pipe.partial_results(maxsize=2))
+        self.assertChunks(chunks, analyzers)
+        self.assertEqual(pipe._subscribers, [])
+
+    def test_partial_results_close(self):
+        "Leaving the iteration early stops the pipe"
+        pipe, analyzers = self.pipe()
+        chunks = pipe.partial_results(maxsize=1, blocksize=1024)
+        chunk = next(chunks)
+        chunks.close()
+        self.assertEqual(chunk.index, 0)
+        self.assertFalse(pipe._is_running)
+        waveform = analyzers[1].results['waveform_analyzer']
+        self.assertLess(len(waveform.data), len(self.samples))
+        assert_array_equal(waveform.data[:1024],
+                           self.samples[:1024].astype('float32'))
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
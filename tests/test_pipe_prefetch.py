@@ -0,0 +1,71 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.core import get_processor
+from timeside.core.tools.prefetch import Prefetcher
+
+
+class TestPipePrefetch(unittest.TestCase):
+    """Test the decoder read-ahead of ProcessPipe.run"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = np.random.randn(5 * 44100, 2)
+
+    def run_pipe(self, **kwargs):
+        decoder = get_processor('array_decoder')(self.samples)
+        spectrogram = get_processor('spectrogram_analyzer')()
+        pipe = decoder | spectrogram
+        pipe.run(**kwargs)
+        return pipe, spectrogram.results['spectrogram_analyzer'].data
+
+    def test_no_prefetch(self):
+        pipe, _ = self.run_pipe()
+        self.assertIsNone(pipe.prefetch_stats)
+
+    def test_prefetch_blocks(self):
+        "Same results with a read-ahead in blocks"
+        _, ref = self.run_pipe()
+        pipe, data = self.run_pipe(prefetch=4)
+        assert_array_equal(ref, data)
+        stats = pipe.prefetch_stats
+        self.assertEqual(stats['depth'], 4)
+        self.assertEqual(stats['blocks'], sum(stats['occupancy_histogram']))
+        self.assertLessEqual(stats['max_occupancy'], 4)
+
+    def test_prefetch_seconds(self):
+        "Read-ahead depth given in seconds"
+        _, ref = self.run_pipe()
+        pipe, data = self.run_pipe(prefetch=1.)
+        assert_array_equal(ref, data)
+        decoder = pipe.processors[0]
+        self.assertEqual(pipe.prefetch_stats['depth'],
+                         int(np.ceil(decoder.samplerate() /
+                                     float(decoder.blocksize()))))
+
+    def test_error(self):
+        "Errors of the reader are raised in the consumer"
+        def read():
+            raise IOError('decoding error')
+        prefetcher = Prefetcher(read, 2)
+        prefetcher.start()
+        with self.assertRaises(IOError):
+            prefetcher.get()
+        prefetcher.stop()
+
+    def test_stop(self):
+        "A producer waiting on a full queue can be stopped"
+        prefetcher = Prefetcher(lambda: (np.zeros(10), False), 2)
+        prefetcher.start()
+        prefetcher.get()
+        prefetcher.stop()
+        self.assertFalse(prefetcher.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
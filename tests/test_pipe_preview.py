@@ -0,0 +1,97 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+
+from timeside.core import Processor, implements, interfacedoc, get_processor
+from timeside.core.api import IProcessor
+
+SAMPLERATE = 44100
+
+
+class BlockCounter(Processor):
+    """Count the frames of each block"""
+    implements(IProcessor)
+    previewable = True
+
+    @staticmethod
+    @interfacedoc
+    def id():
+        return "test_block_counter"
+
+    @interfacedoc
+    def setup(self, channels=None, samplerate=None, blocksize=None,
+              totalframes=None):
+        super(BlockCounter, self).setup(channels, samplerate, blocksize,
+                                        totalframes)
+        self.blocks = []
+
+    @interfacedoc
+    def process(self, frames, eod=False):
+        self.blocks.append(len(frames))
+        return frames, eod
+
+
+class TestPipePreview(unittest.TestCase):
+    """Test the fast approximate preview runs of a pipe"""
+
+    def setUp(self):
+        time = np.arange(10 * SAMPLERATE) / SAMPLERATE
+        self.samples = np.sin(2 * np.pi * 440 * time)[:, np.newaxis]
+        self.decoder = get_processor('array_decoder')(self.samples)
+
+    def test_preview(self):
+        "The results are coarser, tagged as approximate, and still aligned"
+        spectrogram = get_processor('spectrogram_analyzer')()
+        level = get_processor('level')()
+        pipe = self.decoder | spectrogram | level
+        pipe.run(preview=4)
+        self.assertEqual(spectrogram.samplerate(), SAMPLERATE // 4)
+        result = spectrogram.results['spectrogram_analyzer']
+        self.assertTrue(result.id_metadata.approximate)
+        self.assertTrue(level.results['level.rms'].id_metadata.approximate)
+        self.assertAlmostEqual(result.time[-1], 10., delta=0.2)
+        peak = result.data_object.y_value[result.data[10].argmax()]
+        self.assertAlmostEqual(peak, 440, delta=SAMPLERATE / 4 / 2048)
+        self.assertAlmostEqual(level.results['level.rms'].data[0], -3.,
+                               delta=0.1)
+
+        # The next run is exact
+        list(pipe.run_many([self.decoder]))
+        self.assertEqual(spectrogram.samplerate(), SAMPLERATE)
+        result = spectrogram.results['spectrogram_analyzer']
+        self.assertFalse(result.id_metadata.approximate)
+        self.assertAlmostEqual(result.time[-1], 10., delta=0.05)
+
+    def test_preview_blocks(self):
+        "The preview decodes the resampled samples and no empty block"
+        decoder = get_processor('array_decoder')(self.samples[:5 * SAMPLERATE])
+        counter = BlockCounter()
+        waveform = get_processor('waveform_analyzer')()
+        pipe = decoder | counter | waveform
+        pipe.run(preview=2, blocksize=1024)
+        totalframes = 5 * SAMPLERATE // 2
+        self.assertEqual(decoder.totalframes(), totalframes)
+        self.assertEqual(sum(counter.blocks), totalframes)
+        self.assertEqual(len(counter.blocks), -(-totalframes // 1024))
+        self.assertNotIn(0, counter.blocks)
+        self.assertEqual(len(waveform.results['waveform_analyzer'].data),
+                         totalframes)
+
+    def test_not_previewable(self):
+        pipe = self.decoder | get_processor('loudness_itu')()
+        self.assertRaises(ValueError, pipe.run, preview=2)
+
+    def test_resample(self):
+        "The array decoder resamples its samples"
+        pipe = self.decoder | get_processor('waveform_analyzer')()
+        pipe.run(samplerate=SAMPLERATE // 2)
+        self.assertEqual(self.decoder.totalframes(), len(self.samples) // 2)
+        waveform = pipe.processors[1].results['waveform_analyzer']
+        self.assertEqual(len(waveform.data), len(self.samples) // 2)
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -0,0 +1,64 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+
+from timeside.core import get_processor
+
+
+class TestPipeProfile(unittest.TestCase):
+    """Test the profiling of ProcessPipe.run"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.decoder = get_processor('array_decoder')(
+            np.random.randn(3 * 44100, 2))
+        self.level = get_processor('level')()
+        self.waveform = get_processor('waveform_analyzer')()
+        self.pipe = self.decoder | self.level | self.waveform
+
+    def test_no_profile(self):
+        self.pipe.run()
+        self.assertIsNone(self.pipe.profile())
+
+    def test_profile(self):
+        self.pipe.run(profile=True)
+        profile = self.pipe.profile()
+        self.assertEqual(list(profile.keys()),
+                         [proc.uuid() for proc in self.pipe.processors])
+        blocks = profile[self.decoder.uuid()].blocks
+        self.assertGreater(blocks, 0)
+        for stats in profile.values():
+            self.assertEqual(stats.blocks, blocks)
+            self.assertEqual(sum(stats.latency_histogram), blocks)
+            self.assertGreater(stats.time['process'], 0)
+        waveform = profile[self.waveform.uuid()]
+        self.assertEqual(waveform.frames_bytes,
+                         profile[self.decoder.uuid()].frames_bytes)
+        self.assertEqual(waveform.peak_result_bytes,
+                         self.waveform.results['waveform_analyzer']
+                         .data_object.value.nbytes)
+        self.assertEqual(len(profile.as_dict()), 3)
+
+    def test_chrome_trace(self):
+        self.pipe.run(profile=True, workers=2)
+        tmp = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        tmp.close()
+        try:
+            trace = self.pipe.profile().to_chrome_trace(tmp.name)
+            with open(tmp.name) as f:
+                self.assertEqual(json.load(f), trace)
+        finally:
+            os.remove(tmp.name)
+        methods = set(event['cat'] for event in trace['traceEvents'])
+        self.assertEqual(methods,
+                         set(['setup', 'process', 'post_process', 'release']))
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -0,0 +1,103 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.core import get_processor
+from timeside.core.processor import PipeTemplate
+
+ANALYZERS = [('level', 'level.rms'),
+             ('spectrogram_analyzer', 'spectrogram_analyzer'),
+             ('onset_detection_function', 'onset_detection_function'),
+             ('waveform_analyzer', 'waveform_analyzer')]
+
+
+class TestPipeRunMany(unittest.TestCase):
+    """Test running a pipe on several sources"""
+
+    def setUp(self):
+        np.random.seed(0)
+        # Sources of various lengths and samplerates
+        self.sources = [(np.random.randn(3 * 44100 + 123, 2), 44100),
+                        (np.random.randn(2 * 22050 + 7, 2), 22050),
+                        (np.random.randn(44100, 2), 44100)]
+
+    def decoders(self):
+        return [get_processor('array_decoder')(samples, samplerate=samplerate)
+                for samples, samplerate in self.sources]
+
+    def analyzers(self):
+        return [get_processor(analyzer_id)() for analyzer_id, _ in ANALYZERS]
+
+    def reference(self, decoder):
+        analyzers = self.analyzers()
+        pipe = decoder | analyzers
+        pipe.run()
+        return [analyzer.results[result_id].data
+                for analyzer, (_, result_id) in zip(analyzers, ANALYZERS)]
+
+    def assertResults(self, analyzers, results, reference):
+        for analyzer, (_, result_id), ref in zip(analyzers, ANALYZERS,
+                                                 reference):
+            assert_array_equal(results[analyzer.uuid()][result_id].data, ref)
+
+    def test_run_many(self):
+        "Same results as a new pipe for each source"
+        references = [self.reference(decoder) for decoder in self.decoders()]
+        analyzers = self.analyzers()
+        decoders = self.decoders()
+        pipe = decoders[0] | analyzers
+        outputs = list(pipe.run_many(decoders))
+
+        self.assertEqual(len(outputs), len(decoders))
+        for (source, results), decoder, reference in zip(outputs, decoders,
+                                                         references):
+            self.assertIs(source, decoder)
+            self.assertResults(analyzers, results, reference)
+        self.assertIs(pipe.processors[0], decoders[-1])
+        for analyzer in analyzers:
+            self.assertIn(analyzer, pipe.processors)
+
+    def test_template(self):
+        "Processors are built once and fed with each media"
+        references = [self.reference(decoder) for decoder in self.decoders()]
+        analyzers = self.analyzers()
+        template = PipeTemplate(analyzers, decoder='array_decoder')
+        media = [samples for samples, samplerate in self.sources
+                 if samplerate == 44100]
+        references = [reference for reference, (_, samplerate)
+                      in zip(references, self.sources)
+                      if samplerate == 44100]
+        outputs = list(template.run_many(media))
+        for (_, results), reference in zip(outputs, references):
+            self.assertResults(analyzers, results, reference)
+        pipe = template.pipe
+        processors = list(pipe.processors[1:])
+
+        results = template.run(self.sources[0][0])
+        self.assertResults(analyzers, results, references[0])
+        self.assertIs(template.pipe, pipe)
+        self.assertEqual([id(processor) for processor in pipe.processors[1:]],
+                         [id(processor) for processor in processors])
+
+    def test_template_no_media(self):
+        template = PipeTemplate(self.analyzers(), decoder='array_decoder')
+        self.assertEqual(list(template.run_many([])), [])
+        self.assertIsNone(template.pipe)
+
+    def test_reset(self):
+        "The input format set by setup is cleared by reset"
+        level = get_processor('level')()
+        decoders = self.decoders()
+        pipe = decoders[0] | level
+        for decoder, _ in pipe.run_many(decoders[:2]):
+            self.assertEqual(level.input_samplerate, decoder.samplerate())
+        level.reset()
+        self.assertEqual(level.input_samplerate, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
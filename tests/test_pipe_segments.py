@@ -0,0 +1,128 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.core import get_processor
+from timeside.core.analyzer import AnalyzerResult, AnalyzerResultContainer
+from timeside.core.analyzer import merge_results
+from timeside.plugins.decoder.array import ArrayDecoder
+
+FRAMEWISE = [('spectrogram_analyzer', 'spectrogram_analyzer'),
+             ('waveform_analyzer', 'waveform_analyzer')]
+
+
+class UnsplittableDecoder(ArrayDecoder):
+
+    def segment(self, start, duration=None):
+        return None
+
+
+class TestPipeSegments(unittest.TestCase):
+    """Test the segment-parallel run of a pipe"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = 0.3 * np.random.randn(10 * 44100 + 517, 2)
+
+    def run_pipe(self, analyzer_ids, **kwargs):
+        decoder = get_processor('array_decoder')(self.samples)
+        analyzers = [get_processor(analyzer_id)()
+                     for analyzer_id in analyzer_ids]
+        pipe = decoder | analyzers
+        pipe.run(**kwargs)
+        return pipe, analyzers
+
+    def test_framewise(self):
+        "Framewise results are identical to the serial ones"
+        analyzer_ids = [analyzer_id for analyzer_id, _ in FRAMEWISE]
+        _, reference = self.run_pipe(analyzer_ids)
+        pipe, analyzers = self.run_pipe(analyzer_ids, segments=4, workers=2)
+        for ref, analyzer, (_, result_id) in zip(reference, analyzers,
+                                                  FRAMEWISE):
+            result = analyzer.results[result_id]
+            assert_array_equal(result.data, ref.results[result_id].data)
+            self.assertEqual(result.audio_metadata,
+                             ref.results[result_id].audio_metadata)
+
+    def test_global(self):
+        "Global results are reduced over the segments"
+        analyzer_ids = ['level', 'mean_dc_shift']
+        _, reference = self.run_pipe(analyzer_ids)
+        _, analyzers = self.run_pipe(analyzer_ids, segments=3)
+        for ref, analyzer in zip(reference, analyzers):
+            for result_id, result in ref.results.items():
+                self.assertEqual(analyzer.results[result_id].data_object.value,
+                                 result.data_object.value)
+
+    def test_fallback(self):
+        "Analyzers without merge run serially"
+        _, (reference,) = self.run_pipe(['onset_detection_function'])
+        _, (odf,) = self.run_pipe(['onset_detection_function'], segments=4)
+        assert_array_equal(odf.results['onset_detection_function'].data,
+                           reference.results['onset_detection_function'].data)
+
+    def test_plan(self):
+        "Segments are aligned on the stepsizes and overlap by a frame"
+        decoder = get_processor('array_decoder')(self.samples)
+        spectrogram = get_processor('spectrogram_analyzer')(
+            input_blocksize=4096, input_stepsize=1024)
+        pipe = decoder | spectrogram
+        sources, overlaps = pipe._segments(decoder, [spectrogram], 4)
+        self.assertEqual(len(sources), 4)
+        for start, end, overlap in overlaps[:-1]:
+            self.assertEqual(round(start * 44100) % 8192, 0)
+            self.assertEqual(round(overlap * 44100), 3072)
+        self.assertEqual(overlaps[-1][2], 0)
+        self.assertEqual(round(overlaps[-1][1] * 44100), len(self.samples))
+        # Shorter than a segment
+        decoder = get_processor('array_decoder')(self.samples[:8192])
+        self.assertIsNone(pipe._segments(decoder, [spectrogram], 4))
+
+    def test_unsplittable(self):
+        "A source that can not be split is decoded in one run with a warning"
+        _, reference = self.run_pipe(['waveform_analyzer'])
+        waveform = get_processor('waveform_analyzer')()
+        pipe = UnsplittableDecoder(self.samples) | waveform
+        with self.assertWarns(UserWarning):
+            pipe.run(segments=4, workers=2)
+        assert_array_equal(waveform.results['waveform_analyzer'].data,
+                           reference[0].results['waveform_analyzer'].data)
+
+    def test_file_decoder(self):
+        "File decoder segments are decoded by seeking"
+        from timeside.core.tools.test_samples import samples
+        decoder = get_processor('file_decoder')(samples['sweep.wav'])
+        waveform = get_processor('waveform_analyzer')()
+        (decoder | waveform).run()
+        reference = waveform.results['waveform_analyzer'].data
+        segment = decoder.segment(1., 2.)
+        self.assertTrue(segment.is_segment)
+        decoder = get_processor('file_decoder')(samples['sweep.wav'])
+        waveform = get_processor('waveform_analyzer')()
+        pipe = decoder | waveform
+        self.assertIsNotNone(pipe._segments(decoder, [waveform], 4))
+        pipe.run(segments=4, workers=2)
+        assert_array_equal(waveform.results['waveform_analyzer'].data,
+                           reference)
+
+    def test_merge_events(self):
+        "Event times are shifted and kept in the segment they start in"
+        parts = []
+        for times in ([0.5, 1.5, 2.5], [0.2, 0.8, 1.2]):
+            result = AnalyzerResult(time_mode='event')
+            result.id_metadata.id = 'events'
+            result.data_object.value = np.arange(len(times))
+            result.data_object.time = times
+            parts.append(AnalyzerResultContainer(result))
+        merged = merge_results(parts, [(0., 2., 1.), (2., 3., 0.)])
+        result = merged['events']
+        assert_array_equal(result.time, [0.5, 1.5, 2.2, 2.8, 3.2])
+        assert_array_equal(result.data, [0, 1, 0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -0,0 +1,130 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import datetime
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from timeside.core import get_processor
+
+
+def analyzers():
+    return [get_processor('level')(),
+            get_processor('mean_dc_shift')(),
+            get_processor('spectrogram_analyzer')(),
+            get_processor('onset_detection_function')(),
+            get_processor('waveform_analyzer')()]
+
+
+class TestProcessPipeWorkers(unittest.TestCase):
+    """Test the parallel branch execution of ProcessPipe.run"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = np.random.randn(5 * 44100, 2)
+
+    def run_pipe(self, procs, **kwargs):
+        decoder = get_processor('array_decoder')(self.samples)
+        pipe = decoder
+        for proc in procs:
+            pipe = pipe | proc
+        pipe.run(**kwargs)
+        return procs
+
+    def assertSameResults(self, ref_procs, procs):
+        for ref, proc in zip(ref_procs, procs):
+            self.assertEqual(ref.results.keys(), proc.results.keys())
+            for key in ref.results:
+                assert_array_equal(ref.results[key].data,
+                                   proc.results[key].data)
+
+    def test_workers(self):
+        "Same results with and without workers"
+        ref = self.run_pipe(analyzers())
+        procs = self.run_pipe(analyzers(), workers=4)
+        self.assertSameResults(ref, procs)
+
+    def test_single_worker(self):
+        "Run with one worker"
+        ref = self.run_pipe(analyzers())
+        procs = self.run_pipe(analyzers(), workers=1)
+        self.assertSameResults(ref, procs)
+
+    def test_effect_stage(self):
+        "An effect between branches keeps its position in the pipe"
+        gain = get_processor('fx_gain')
+        ref = self.run_pipe([get_processor('waveform_analyzer')(),
+                             gain(gain=0.5), get_processor('level')()])
+        procs = self.run_pipe([get_processor('waveform_analyzer')(),
+                               gain(gain=0.5), get_processor('level')()],
+                              workers=2)
+        self.assertSameResults(ref[::2], procs[::2])
+        waveform = procs[0].results['waveform_analyzer'].data
+        self.assertEqual(procs[2].results['level.max'].data,
+                         np.round(20 * np.log10(0.5 * np.abs(waveform).max()),
+                                  3))
+
+    def test_branches(self):
+        "Analyzers off the decoder are grouped, effects split the stages"
+        decoder = get_processor('array_decoder')(self.samples)
+        level = get_processor('level')()
+        dc = get_processor('mean_dc_shift')()
+        gain = get_processor('fx_gain')(gain=0.5)
+        waveform = get_processor('waveform_analyzer')()
+        pipe = decoder | level | dc | gain | waveform
+        stages = pipe._branches(decoder, pipe.processors[1:])
+        self.assertEqual(stages, [[level, dc], [gain], [waveform]])
+
+    def test_process_backend(self):
+        "Same results with the process backend"
+        ref = self.run_pipe(analyzers())
+        procs = self.run_pipe(analyzers(), workers=3, backend='process')
+        self.assertSameResults(ref, procs)
+
+    def test_process_backend_effect(self):
+        "Analyzers after an effect stay in the parent process"
+        gain = get_processor('fx_gain')
+        ref = self.run_pipe([get_processor('waveform_analyzer')(),
+                             gain(gain=0.5), get_processor('level')()])
+        procs = self.run_pipe([get_processor('waveform_analyzer')(),
+                               gain(gain=0.5), get_processor('level')()],
+                              workers=2, backend='process')
+        self.assertSameResults(ref[::2], procs[::2])
+
+    def test_remote_groups(self):
+        "Only the analyzers before any effect can run in a worker"
+        decoder = get_processor('array_decoder')(self.samples)
+        level = get_processor('level')()
+        dc = get_processor('mean_dc_shift')()
+        gain = get_processor('fx_gain')(gain=0.5)
+        waveform = get_processor('waveform_analyzer')()
+        pipe = decoder | level | dc | gain | waveform
+        groups = pipe._remote_groups(pipe.processors[1:])
+        self.assertEqual(groups, [[level], [dc]])
+
+    def test_post_process_dag(self):
+        "Children are post-processed after their parents"
+        odf = get_processor('onset_detection_function')()
+        level = get_processor('level')()
+        decoder = get_processor('array_decoder')(self.samples)
+        pipe = decoder | level | odf
+        pipe.run(workers=2)
+        spectrogram = odf.parents['spectrogram']
+        self.assertEqual([proc.uuid() for proc in pipe.critical_path][-2:],
+                         [spectrogram.uuid(), odf.uuid()])
+        self.assertEqual(pipe.critical_path_time,
+                         sum([proc.post_process_time
+                              for proc in pipe.critical_path],
+                             datetime.timedelta(0)))
+        ref = self.run_pipe(analyzers())
+        self.assertSameResults(ref[3:4], [odf])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            self.run_pipe(analyzers(), workers=2, backend='cluster')
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
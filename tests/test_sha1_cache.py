@@ -0,0 +1,93 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unit_timeside import TestRunner
+
+from timeside.core.decoder import MediaInfo
+from timeside.core.tools.sha1_cache import (Sha1Cache, Sha1Tee,
+                                            set_sha1_cache)
+from timeside.plugins.decoder.utils import get_sha1
+
+DATA = os.urandom(100000)
+
+
+class LazySource(object):
+
+    def __init__(self):
+        self.reads = 0
+
+    @property
+    def sha1(self):
+        self.reads += 1
+        return 'abc'
+
+
+class TestSha1Cache(unittest.TestCase):
+    "Test the lazy and cached sha1 of the media files"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = Sha1Cache(os.path.join(self.tmpdir, 'cache'))
+        set_sha1_cache(self.cache)
+        self.path = os.path.join(self.tmpdir, 'sweep.wav')
+        with open(self.path, 'wb') as f:
+            f.write(DATA)
+        self.sha1 = hashlib.sha1(DATA).hexdigest()
+
+    def tearDown(self):
+        set_sha1_cache(None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_cache(self):
+        "The sha1 is computed once and again once the file is modified"
+        self.assertEqual(get_sha1(self.path), self.sha1)
+        self.assertEqual(get_sha1(self.path), self.sha1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        # Read back from the xattr or sidecar by another process
+        self.assertEqual(Sha1Cache(self.cache.path).get(self.path), self.sha1)
+
+        with open(self.path, 'ab') as f:
+            f.write(b'\0')
+        self.assertIsNone(self.cache.get(self.path))
+        self.assertEqual(get_sha1(self.path),
+                         hashlib.sha1(DATA + b'\0').hexdigest())
+
+    def test_modified_while_read(self):
+        key = [0, 0, 0, 0]
+        self.cache.set(self.path, self.sha1, key)
+        self.assertIsNone(self.cache.get(self.path))
+
+    def test_tee(self):
+        "Chunks read out of order by a demuxer"
+        tee = Sha1Tee(self.path)
+        tee.update(0, DATA[:12])
+        tee.update(len(DATA) - 128, DATA[-128:])
+        self.assertIsNone(tee.hexdigest())
+        for offset in range(0, len(DATA), 4096):
+            tee.update(offset, DATA[offset:offset + 4096])
+        self.assertTrue(tee.complete)
+        self.assertEqual(tee.hexdigest(), self.sha1)
+
+    def test_media_info(self):
+        "The sha1 of the media info is only read from the source if needed"
+        source = LazySource()
+        info = MediaInfo(source, uri='file:///sweep.wav', start=0)
+        self.assertEqual(info['uri'], 'file:///sweep.wav')
+        self.assertEqual(source.reads, 0)
+        self.assertEqual(info['sha1'], 'abc')
+        self.assertEqual(info['sha1'], 'abc')
+        self.assertEqual(source.reads, 1)
+        self.assertRaises(KeyError, info.__getitem__, 'samplerate')
+        self.assertEqual(pickle.loads(pickle.dumps(info)),
+                         {'uri': 'file:///sweep.wav', 'start': 0,
+                          'sha1': 'abc'})
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -0,0 +1,99 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+
+from timeside.core import get_processor
+from timeside.plugins.analyzer.spectrogram import Spectrogram
+
+
+class HalfSpectrogram(Spectrogram):
+    "Spectrogram of the frames scaled by one half"
+
+    @staticmethod
+    def id():
+        return "half_spectrogram"
+
+    def process(self, frames, eod=False):
+        super(HalfSpectrogram, self).process(0.5 * frames, eod)
+        return frames, eod
+
+
+class TestSharedPreprocessing(unittest.TestCase):
+    "Test the preprocessings shared by the analyzers of a pipe"
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = np.random.randn(5 * 44100, 2)
+        self.spectrogram = get_processor('spectrogram_analyzer')
+
+    def run_alone(self, analyzer):
+        decoder = get_processor('array_decoder')(self.samples)
+        (decoder | analyzer).run()
+        return analyzer.results['spectrogram_analyzer'].data
+
+    def test_shared(self):
+        "Analyzers with the same framing share it and get the same results"
+        specs = [self.spectrogram(fft_size=fft_size)
+                 for fft_size in (2048, 4096)]
+        specs.append(self.spectrogram(input_blocksize=1024))
+        decoder = get_processor('array_decoder')(self.samples)
+        pipe = decoder | specs[0] | specs[1] | specs[2]
+        pipe.run()
+
+        frames_states = [key for key in pipe._preprocessing_states
+                         if key[1] == 'frames']
+        self.assertEqual(len(frames_states), 2)
+
+        params = [{'fft_size': 2048}, {'fft_size': 4096},
+                  {'input_blocksize': 1024}]
+        for spec, kwargs in zip(specs, params):
+            assert_array_equal(spec.results['spectrogram_analyzer'].data,
+                               self.run_alone(self.spectrogram(**kwargs)))
+
+    def test_effect_stream(self):
+        "Analyzers after an effect do not share the source stream"
+        decoder = get_processor('array_decoder')(self.samples)
+        before = self.spectrogram(fft_size=2048)
+        gain = get_processor('fx_gain')(gain=0.5)
+        after = self.spectrogram(fft_size=4096)
+        pipe = decoder | before | gain | after
+        pipe.run()
+        self.assertNotEqual(pipe._streams[before.uuid()],
+                            pipe._streams[after.uuid()])
+        ref = self.run_alone(self.spectrogram(fft_size=4096))
+        assert_array_equal(after.results['spectrogram_analyzer'].data,
+                           ref * 0.5)
+
+    def test_different_frames(self):
+        "Analyzers fed with other frames than the stream do not share them"
+        ref = self.run_alone(self.spectrogram())
+        for workers in (None, 2):
+            spec = self.spectrogram()
+            half = HalfSpectrogram()
+            decoder = get_processor('array_decoder')(self.samples)
+            pipe = decoder | half | spec
+            pipe.run(workers=workers)
+            assert_array_equal(spec.results['spectrogram_analyzer'].data,
+                               ref)
+            assert_allclose(half.results['half_spectrogram'].data,
+                            0.5 * ref)
+
+    def test_workers(self):
+        "Shared preprocessings with concurrent branches"
+        specs = [self.spectrogram(fft_size=fft_size)
+                 for fft_size in (1024, 2048, 4096)]
+        decoder = get_processor('array_decoder')(self.samples)
+        pipe = decoder | specs[0] | specs[1] | specs[2]
+        pipe.run(workers=3)
+        for spec, fft_size in zip(specs, (1024, 2048, 4096)):
+            assert_array_equal(
+                spec.results['spectrogram_analyzer'].data,
+                self.run_alone(self.spectrogram(fft_size=fft_size)))
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
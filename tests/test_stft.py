@@ -0,0 +1,75 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+
+from timeside.core import get_processor
+from timeside.core.stft import stft
+
+
+class FakeAnalyzer(object):
+    frames_key = None
+
+
+class TestSTFT(unittest.TestCase):
+    "Test the STFT provider"
+
+    def setUp(self):
+        np.random.seed(0)
+        self.samples = np.random.randn(5 * 44100, 2)
+        self.frames_matrix = np.random.randn(10, 512)
+
+    def test_stft(self):
+        assert_array_equal(stft(FakeAnalyzer(), self.frames_matrix),
+                           np.fft.rfft(self.frames_matrix, axis=1))
+
+    def test_magnitude(self):
+        spectra = stft(FakeAnalyzer(), self.frames_matrix, fft_size=1024,
+                       magnitude=True)
+        self.assertEqual(spectra.shape, (10, 513))
+        assert_array_equal(spectra,
+                           np.abs(np.fft.rfft(self.frames_matrix, 1024,
+                                              axis=1)))
+        self.assertFalse(spectra.flags.writeable)
+
+    def test_window(self):
+        spectra = stft(FakeAnalyzer(), self.frames_matrix, window='hanning')
+        assert_array_almost_equal(
+            spectra, np.fft.rfft(self.frames_matrix * np.hanning(512),
+                                 axis=1))
+        with self.assertRaises(ValueError):
+            stft(FakeAnalyzer(), self.frames_matrix, window='unknown')
+
+    def test_shared(self):
+        "The spectrogram analyzers of a pipe share their STFT"
+        decoder = get_processor('array_decoder')(self.samples)
+        spectrogram = get_processor('spectrogram_analyzer')()
+        buffer = get_processor('spectrogram_analyzer_buffer')()
+        pipe = decoder | spectrogram | buffer
+        pipe.run()
+
+        stft_keys = [key for key in pipe._preprocessing if 'stft' in key]
+        self.assertEqual(len(stft_keys), 2)  # complex and magnitude
+        assert_array_equal(
+            spectrogram.results['spectrogram_analyzer'].data,
+            buffer.results['spectrogram_analyzer_buffer'].data)
+
+    def test_batch_unbatched(self):
+        "The batched and per-frame spectrograms are identical"
+        results = []
+        for batch in (True, False):
+            decoder = get_processor('array_decoder')(self.samples)
+            buffer = get_processor('spectrogram_analyzer_buffer')()
+            if not batch:
+                buffer.process_batch = None
+            (decoder | buffer).run()
+            results.append(buffer.results['spectrogram_analyzer_buffer'].data)
+        self.assertEqual(results[0].shape, results[1].shape)
+        assert_array_almost_equal(results[0], results[1])
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
@@ -0,0 +1,143 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from unit_timeside import TestRunner
+import numpy as np
+from numpy.testing import assert_allclose
+from scipy.io import wavfile
+
+from timeside.core import get_processor
+from timeside.plugins.decoder.wav import WavMmapDecoder
+
+SAMPLERATE = 32000
+
+
+def write_wav24(path, samples):
+    "Write 24 bit PCM samples in [-1, 1["
+    frames = np.round(samples * 2 ** 23).astype('<i4')
+    data = frames.view('u1').reshape(frames.shape + (4,))[..., :3].tobytes()
+    channels = samples.shape[1]
+    fmt = struct.pack('<HHIIHH', 1, channels, SAMPLERATE,
+                      SAMPLERATE * channels * 3, channels * 3, 24)
+    with open(path, 'wb') as f:
+        f.write(b'RIFF' + struct.pack('<I', 4 + 8 + len(fmt) + 8 + len(data)))
+        f.write(b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt)
+        f.write(b'data' + struct.pack('<I', len(data)) + data)
+
+
+def write_aiff(path, samples):
+    "Write 16 bit big endian PCM samples in [-1, 1["
+    data = np.round(samples * 2 ** 15).astype('>i2').tobytes()
+    # 80 bit extended float samplerate
+    exponent = int(np.floor(np.log2(SAMPLERATE)))
+    rate = struct.pack('>HQ', 16383 + exponent,
+                       SAMPLERATE << (63 - exponent))
+    comm = struct.pack('>hIh', samples.shape[1], len(samples), 16) + rate
+    with open(path, 'wb') as f:
+        f.write(b'FORM' + struct.pack('>I', 4 + 8 + len(comm) + 16 +
+                                      len(data)))
+        f.write(b'AIFF' + b'COMM' + struct.pack('>I', len(comm)) + comm)
+        f.write(b'SSND' + struct.pack('>III', len(data) + 8, 0, 0) + data)
+
+
+class TestWavMmapDecoder(unittest.TestCase):
+    "Test the memory-mapped WAV and AIFF decoder"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        time = np.arange(3 * SAMPLERATE) / SAMPLERATE
+        self.samples = 0.5 * np.stack([np.sin(2 * np.pi * 440 * time),
+                                       np.sin(2 * np.pi * 220 * time)],
+                                      axis=1)
+        self.files = {}
+        for name, dtype, scale in [('int16', 'int16', 2 ** 15),
+                                   ('int32', 'int32', 2 ** 31),
+                                   ('float32', 'float32', 1),
+                                   ('uint8', 'uint8', 2 ** 7)]:
+            path = os.path.join(self.tmpdir, name + '.wav')
+            data = np.round(self.samples * scale) if scale > 1 else \
+                self.samples
+            if dtype == 'uint8':
+                data = data + 128
+            wavfile.write(path, SAMPLERATE, data.astype(dtype))
+            self.files[name] = (path, 1. / scale)
+        self.files['int24'] = (os.path.join(self.tmpdir, 'int24.wav'),
+                               2. ** -23)
+        write_wav24(self.files['int24'][0], self.samples)
+        self.files['aiff'] = (os.path.join(self.tmpdir, 'int16.aiff'),
+                              2. ** -15)
+        write_aiff(self.files['aiff'][0], self.samples)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def decode(self, decoder, **kwargs):
+        decoder.setup(**kwargs)
+        blocks = []
+        eod = False
+        while not eod:
+            frames, eod = decoder.process()
+            blocks.append(frames)
+        decoder.release()
+        return blocks
+
+    def test_formats(self):
+        for name, (path, tolerance) in self.files.items():
+            decoder = get_processor('wav_mmap_decoder')(path)
+            blocks = self.decode(decoder, blocksize=4096)
+            self.assertTrue(all(len(block) == 4096 for block in blocks[:-1]))
+            frames = np.concatenate(blocks)
+            self.assertEqual(frames.dtype, np.float32)
+            assert_allclose(frames, self.samples, atol=tolerance, err_msg=name)
+            self.assertEqual(decoder.samplerate(), SAMPLERATE)
+            self.assertEqual(decoder.totalframes(), len(self.samples))
+
+    def test_segment(self):
+        "Segments are read from their offset"
+        path = self.files['int16'][0]
+        decoder = WavMmapDecoder(path, start=1., duration=0.5)
+        frames = np.concatenate(self.decode(decoder))
+        assert_allclose(frames, self.samples[SAMPLERATE:3 * SAMPLERATE // 2],
+                        atol=2. ** -15)
+        segment = WavMmapDecoder(path).segment(2.5)
+        self.assertEqual(len(np.concatenate(self.decode(segment))),
+                         SAMPLERATE // 2)
+        self.assertRaises(ValueError, WavMmapDecoder(path, start=4.).setup)
+
+    def test_mediainfo(self):
+        path = self.files['int16'][0]
+        decoder = WavMmapDecoder(path, start=1.)
+        info = decoder.mediainfo()
+        self.assertEqual(info['uri'], 'file://' + path)
+        self.assertEqual(info['duration'], 2.)
+        self.assertEqual(info['start'], 1.)
+        self.assertTrue(info['is_segment'])
+        self.assertEqual(info['samplerate'], SAMPLERATE)
+        self.assertEqual(len(info['sha1']), 40)
+        self.assertEqual(WavMmapDecoder('file://' + path).uri, info['uri'])
+
+    def test_pipe(self):
+        decoder = WavMmapDecoder(self.files['int16'][0])
+        level = get_processor('level')()
+        (decoder | level).run(channels=1)
+        # Downmixed to mono
+        peak = np.abs(self.samples.mean(axis=1)).max()
+        self.assertAlmostEqual(level.results['level.max'].data[0],
+                               20 * np.log10(peak), delta=0.01)
+        self.assertRaises(ValueError, (decoder | level).run,
+                          samplerate=SAMPLERATE // 2)
+
+    def test_not_pcm(self):
+        path = os.path.join(self.tmpdir, 'sweep.mp3')
+        with open(path, 'wb') as f:
+            f.write(b'ID3' + b'\0' * 100)
+        self.assertRaises(IOError, WavMmapDecoder, path)
+
+
+if __name__ == '__main__':
+    unittest.main(testRunner=TestRunner())
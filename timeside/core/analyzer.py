@@ -32,7 +32,7 @@ from timeside.core import implements, abstract
 from timeside.core.api import IAnalyzer
 
 import numpy as np
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 import h5py
 import simplejson as json
 
@@ -170,6 +170,10 @@ class MetadataObject(Parameters):
                                                     new_default_value)
             super(MetadataObject, self).__delattr__(name)
 
+    def __reduce__(self):
+        # Metadata are stored as attributes, not as dict items
+        return (self.__class__, (), self.__dict__)
+
     def as_dict(self):
         return dict((att, getattr(self, att))
                     for att in self.keys())
@@ -227,6 +231,8 @@ class IdMetadata(MetadataObject):
         version : str
         author : str
         proc_uuid : str
+        approximate : bool
+            True for the results of a preview run
     '''
 
     # Define default values
@@ -238,6 +244,7 @@ class IdMetadata(MetadataObject):
                                   ('version', None),
                                   ('author', None),
                                   ('proc_uuid', None),
+                                  ('approximate', False),
                                   ])
 
     def __setattr__(self, name, value):
@@ -583,6 +590,10 @@ class AnalyzerResult(MetadataObject):
 
         super(AnalyzerResult, self).__setattr__(name, value)
 
+    def __reduce__(self):
+        return (self.__class__, (self._data_mode, self._time_mode),
+                self.__dict__)
+
     def __len__(self):
         if self.data_mode == 'value':
             return len(self.data_object.value)
@@ -1063,7 +1074,7 @@ class AnalyzerResultContainer(dict):
     >>> a = Analyzer()
     >>> (d|a).run()
     >>> a.new_result() #doctest: +ELLIPSIS
-    AnalyzerResult(id_metadata=IdMetadata(id='analyzer', name='Generic analyzer', unit='', description='...', date='...', version='...', author='TimeSide', proc_uuid='...'), data_object=FrameValueObject(value=array([], dtype=float64), y_value=array([], dtype=float64), frame_metadata=FrameMetadata(samplerate=44100, blocksize=8192, stepsize=8192)), audio_metadata=AudioMetadata(uri='.../sweep.mp3', start=0.0, duration=8.0..., is_segment=False, sha1='...', channels=2, channelsManagement=''), parameters={})
+    AnalyzerResult(id_metadata=IdMetadata(id='analyzer', name='Generic analyzer', unit='', description='...', date='...', version='...', author='TimeSide', proc_uuid='...', approximate=False), data_object=FrameValueObject(value=array([], dtype=float64), y_value=array([], dtype=float64), frame_metadata=FrameMetadata(samplerate=44100, blocksize=8192, stepsize=8192)), audio_metadata=AudioMetadata(uri='.../sweep.mp3', start=0.0, duration=8.0..., is_segment=False, sha1='...', channels=2, channelsManagement=''), parameters={})
     >>> resContainer = timeside.core.analyzer.AnalyzerResultContainer()
     '''
 
@@ -1226,6 +1237,183 @@ class AnalyzerResultContainer(dict):
             h5_file.close()  # Close the HDF5 file
 
 
+class FrameAccumulator(object):
+
+    """Growable array collecting the frames of an analyzer
+
+    The storage is preallocated for the expected number of frames and grown
+    geometrically if the estimate is exceeded. The collected frames are
+    returned as a view, to be given to data_object.value without copy.
+
+    Parameters
+    ----------
+    frames : int, optional
+        Expected number of frames
+    shape : tuple, optional
+        Shape of each frame, inferred from the first frames if None
+    dtype : numpy dtype, optional
+        Type of the frames, inferred from the first frames if None
+
+    Examples
+    --------
+    >>> from timeside.core.analyzer import FrameAccumulator
+    >>> frames = FrameAccumulator(2, shape=(), dtype='float32')
+    >>> frames.append(1)
+    >>> frames.extend([2, 3])
+    >>> frames.data
+    array([1., 2., 3.], dtype=float32)
+    >>> len(frames)
+    3
+    """
+
+    # Minimum number of frames allocated
+    min_frames = 16
+
+    def __init__(self, frames=None, shape=None, dtype=None):
+        self.capacity = max(int(frames or 0), self.min_frames)
+        self.shape = shape
+        self.dtype = dtype
+        self._storage = None
+        self._size = 0
+
+    @classmethod
+    def for_analyzer(cls, analyzer, shape=None, dtype=None, stepsize=None):
+        """Accumulator sized for one frame every stepsize samples of the
+        source of an analyzer, its input_stepsize by default"""
+        totalframes = analyzer.source_totalframes
+        stepsize = stepsize or analyzer.input_stepsize
+        frames = None
+        if totalframes and stepsize:
+            frames = -(-totalframes // stepsize) + 1
+        return cls(frames, shape, dtype)
+
+    def _reserve(self, frames, sample):
+        if self._storage is None:
+            sample = np.asarray(sample)
+            if self.shape is None:
+                self.shape = sample.shape[1:]
+            if self.dtype is None:
+                self.dtype = sample.dtype
+            self._storage = np.empty((max(self.capacity, frames),) +
+                                     tuple(self.shape), self.dtype)
+        elif self._size + frames > len(self._storage):
+            storage = np.empty((max(2 * len(self._storage),
+                                    self._size + frames),) +
+                               self._storage.shape[1:], self._storage.dtype)
+            storage[:self._size] = self._storage[:self._size]
+            self._storage = storage
+
+    def append(self, frame):
+        "Add a frame"
+        self._reserve(1, np.asarray(frame)[np.newaxis])
+        self._storage[self._size] = frame
+        self._size += 1
+
+    def extend(self, frames):
+        "Add the frames stacked along the first axis of an array"
+        frames = np.asarray(frames)
+        self._reserve(len(frames), frames)
+        self._storage[self._size:self._size + len(frames)] = frames
+        self._size += len(frames)
+
+    def clear(self):
+        "Remove all the frames, keeping the storage"
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def data(self):
+        "View on the frames collected so far"
+        if self._storage is None:
+            return np.empty((0,) + tuple(self.shape or ()),
+                            self.dtype or np.float64)
+        return self._storage[:self._size]
+
+
+# Frames of a framewise result published while the pipe runs, see
+# Analyzer.emit: index is the position of the first frame in the result and
+# start and end the time range covered by the frames in seconds
+ResultChunk = namedtuple('ResultChunk', ['proc_uuid', 'result_id', 'index',
+                                         'start', 'end', 'data'])
+
+
+def merge_results(results, overlaps, reduce=None):
+    """Merge the results of an analyzer computed on consecutive segments
+
+    Parameters
+    ----------
+    results : list of AnalyzerResultContainer
+        The results of each segment, in time order
+    overlaps : list of tuple
+        The (start, end, overlap) of each segment in seconds: the results of
+        a segment cover the audio from start to end plus overlap seconds
+        decoded after end so that the last frames of the segment are complete
+    reduce : callable, optional
+        reduce(result_id, values, weights) returning the merged value of
+        a global result from the values of the segments weighted by their
+        durations. Required if there are global results.
+
+    Returns
+    -------
+    AnalyzerResultContainer
+        The framewise results are concatenated, dropping the frames starting
+        in the overlap, and the event and segment times are shifted to the
+        source time and kept in the segment they start in.
+    """
+    import copy
+
+    merged = AnalyzerResultContainer()
+    last = len(results) - 1
+    for result_id, first in results[0].items():
+        parts = [segment[result_id] for segment in results]
+        result = copy.deepcopy(first)
+        data_object = result.data_object
+        key = 'value' if result.data_mode == 'value' else 'label'
+
+        if result.time_mode == 'framewise':
+            frame_metadata = data_object.frame_metadata
+            datas = []
+            for index, (part, (start, end, _)) in enumerate(zip(parts,
+                                                                overlaps)):
+                data = part.data_object[key]
+                if index < last:
+                    span = int(round((end - start) *
+                                     frame_metadata.samplerate))
+                    data = data[:-(-span // frame_metadata.stepsize)]
+                datas.append(data)
+            data_object[key] = np.concatenate(datas)
+
+        elif result.time_mode in ('event', 'segment'):
+            fields = [key, 'time']
+            if result.time_mode == 'segment':
+                fields.append('duration')
+            columns = dict((field, []) for field in fields)
+            for index, (part, (start, end, _)) in enumerate(zip(parts,
+                                                                overlaps)):
+                time = part.data_object.time + start
+                keep = time >= start
+                if index < last:
+                    keep &= time < end
+                for field in fields:
+                    column = time if field == 'time' else part.data_object[field]
+                    columns[field].append(column[keep])
+            for field in fields:
+                data_object[field] = np.concatenate(columns[field])
+
+        else:
+            if reduce is None:
+                raise ValueError('Global result %s can not be merged'
+                                 % result_id)
+            data_object.value = reduce(
+                result_id, [part.data_object.value for part in parts],
+                [end - start for (start, end, _) in overlaps])
+
+        merged.add(result)
+    return merged
+
+
 class Analyzer(Processor):
 
     '''
@@ -1236,6 +1424,25 @@ class Analyzer(Processor):
     implements(IAnalyzer)
     abstract()
 
+    # Optional batched version of a process decorated by frames_adapter:
+    # process_batch(frames_matrix, eod) receives all the adapted frames of
+    # an incoming block as the rows of a 2D matrix
+    process_batch = None
+
+    # Optional merge(results, overlaps) returning the results of the whole
+    # source from the results computed on consecutive segments of it, see
+    # merge_results and ProcessPipe.run(segments=...)
+    merge = None
+
+    # Optional segment_state() returning the accumulators of the global
+    # results of a segment, given to merge as its states argument so that
+    # they are reduced before rounding
+    segment_state = None
+
+    # Analyzers whose results are meaningless at a reduced samplerate opt
+    # out of the preview runs, see ProcessPipe.run(preview=...)
+    previewable = True
+
     def __init__(self):
         super(Analyzer, self).__init__()
 
@@ -1251,6 +1458,9 @@ class Analyzer(Processor):
         self.result_blocksize = self.input_blocksize
         self.result_stepsize = self.input_stepsize
 
+        # Number of frames emitted for each result id
+        self._emitted = {}
+
     def add_result(self, result):
         if not self.uuid() in self.process_pipe.results:
             self.process_pipe.results[self.uuid()] = AnalyzerResultContainer()
@@ -1260,6 +1470,31 @@ class Analyzer(Processor):
     def results(self):
         return self.process_pipe.results[self.uuid()]
 
+    def emit(self, result_id, data):
+        """Publish the next frames of a framewise result while the pipe runs
+
+        The frames are sent as a ResultChunk to the subscribers of the pipe,
+        see ProcessPipe.subscribe. The complete result must still be added
+        by post_process.
+
+        Parameters
+        ----------
+        result_id : str
+        data : numpy array
+            The new frames, one per row
+        """
+        index = self._emitted.get(result_id, 0)
+        self._emitted[result_id] = index + len(data)
+        pipe = self.process_pipe
+        if pipe is None or not pipe._subscribers:
+            return
+        period = self.result_stepsize / self.result_samplerate
+        start = index * period
+        end = ((index + len(data) - 1) * period +
+               self.result_blocksize / self.result_samplerate)
+        pipe.publish(ResultChunk(self.uuid(), result_id, index, start, end,
+                                 data))
+
     @staticmethod
     def id():
         return "analyzer"
@@ -1302,6 +1537,9 @@ class Analyzer(Processor):
         result.id_metadata.description = self.description()
         result.id_metadata.unit = self.unit()
         result.id_metadata.proc_uuid = self.uuid()
+        pipe = self.process_pipe
+        result.id_metadata.approximate = bool(pipe is not None and
+                                              pipe._preview)
 
         result.audio_metadata.uri = self.mediainfo()['uri']
         result.audio_metadata.sha1 = self.mediainfo()['sha1']
@@ -90,6 +90,30 @@ class IProcessor(Interface):
 
         # implementations should always call the parent method
 
+    def reset(self):
+        """Reset the state left by a previous run, so that this processor
+        can be set up again for a new source, as done by
+        ProcessPipe.run_many between sources.
+
+        Processors accumulating data in attributes which are not
+        reinitialized by setup() must clear them here, while keeping any
+        costly object (plugin, engine...) that setup() can reuse.
+        """
+
+        # implementations should always call the parent method
+
+    def needs_more_audio(self):
+        """Return False once this processor has received all the audio it
+        needs, e.g. the first seconds of the source. When no processor of
+        a pipe needs more audio, the pipe stops the source and gives the
+        next block to the processors as the last one, with eod=True.
+        This is checked after each block."""
+
+    def estimate(self, duration, samplerate, channels):
+        """Return the estimated Cost (cpu_seconds, peak_bytes,
+        result_bytes) of processing duration seconds of audio given at
+        samplerate with channels, see timeside.core.tools.cost"""
+
     def mediainfo(self):
         """
         Information about the media object
@@ -188,6 +212,12 @@ class IDecoder(IProcessor):
     def mime_type():
         """Return the mime type corresponding to this decoded format"""
 
+    def segment(self, start, duration=None):
+        """Return a new decoder of the same media restricted to duration
+        seconds from start, relative to the start of this decoder, or None if
+        the decoder can not be split into segments. The whole remaining media
+        is decoded if duration is None."""
+
 
 class IGrapher(IProcessor):
 
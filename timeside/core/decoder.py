@@ -32,6 +32,29 @@ from timeside.core import Processor, implements, interfacedoc, abstract
 from timeside.core.api import IDecoder
 
 
+class MediaInfo(dict):
+
+    """Media information of a decoder
+
+    The sha1 of the media is only read from the decoder when accessed, as it
+    may require to read the whole media.
+    """
+
+    def __init__(self, decoder, **info):
+        super(MediaInfo, self).__init__(**info)
+        self._decoder = decoder
+
+    def __missing__(self, key):
+        if key != 'sha1':
+            raise KeyError(key)
+        self['sha1'] = sha1 = self._decoder.sha1
+        return sha1
+
+    def __reduce__(self):
+        self['sha1']
+        return (dict, (dict(self),))
+
+
 class Decoder(Processor):
 
     """General abstract base class for Decoder
@@ -54,6 +77,9 @@ class Decoder(Processor):
         else:
             self.uri_duration = duration
 
+        # Requested segment, part of the PCM cache key
+        self._segment = (float(start), duration and float(duration))
+
         if start == 0 and duration is None:
             self.is_segment = False
         else:
@@ -81,12 +107,12 @@ class Decoder(Processor):
 
     @interfacedoc
     def mediainfo(self):
-        return dict(uri=self.uri,
-                    duration=self.uri_duration,
-                    start=self.uri_start,
-                    is_segment=self.is_segment,
-                    samplerate=self.input_samplerate,
-                    sha1=self.sha1)
+        return MediaInfo(self,
+                         uri=self.uri,
+                         duration=self.uri_duration,
+                         start=self.uri_start,
+                         is_segment=self.is_segment,
+                         samplerate=self.input_samplerate)
 
     @property
     def sha1(self):
@@ -95,6 +121,10 @@ class Decoder(Processor):
     def __del__(self):
         self.release()
 
+    @interfacedoc
+    def segment(self, start, duration=None):
+        return None
+
     @interfacedoc
     def encoding(self):
         return self.format().split('/')[-1]
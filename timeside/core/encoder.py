@@ -24,7 +24,7 @@
 
 from timeside.core import Processor, implements, interfacedoc, abstract
 from timeside.core.api import IEncoder
-from .tools.gstutils import numpy_array_to_gst_buffer, MainloopThread
+from .tools.gstutils import numpy_array_to_gst_buffer, gst_runtime
 
 import gi
 gi.require_version('Gst', '1.0')
@@ -73,7 +73,7 @@ class GstEncoder(Processor):
 
     @interfacedoc
     def release(self):
-        if hasattr(self, 'eod') and hasattr(self, 'mainloopthread'):
+        if hasattr(self, 'eod') and hasattr(self, 'bus'):
             self.end_cond.acquire()
             while not hasattr(self, 'end_reached'):
                 self.end_cond.wait()
@@ -114,13 +114,7 @@ class GstEncoder(Processor):
         self.src.set_property('block', False)
         #self.src.set_property('do-timestamp', True)
 
-        self.bus = self.pipeline.get_bus()
-        self.bus.add_signal_watch()
-        self.bus.connect("message", self._on_message_cb)
-
-        self.mainloop = GLib.MainLoop()
-        self.mainloopthread = MainloopThread(self.mainloop)
-        self.mainloopthread.start()
+        self.bus = gst_runtime().register(self.pipeline, self._on_message_cb)
 
         # start pipeline
         self.pipeline.set_state(Gst.State.PLAYING)
@@ -133,7 +127,7 @@ class GstEncoder(Processor):
                 self._streaming_queue.put(Gst.MessageType.EOS)
 
             self.pipeline.set_state(Gst.State.NULL)
-            self.mainloop.quit()
+            gst_runtime().unregister(self.pipeline)
             self.end_reached = True
             self.end_cond.notify()
             self.end_cond.release()
@@ -141,7 +135,7 @@ class GstEncoder(Processor):
         elif t == Gst.MessageType.ERROR:
             self.end_cond.acquire()
             self.pipeline.set_state(Gst.State.NULL)
-            self.mainloop.quit()
+            gst_runtime().unregister(self.pipeline)
             self.end_reached = True
             err, debug = message.parse_error()
             self.error_msg = "Error: %s" % err, debug
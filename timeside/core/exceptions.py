@@ -47,6 +47,10 @@ class SubProcessError(Error):
                                                 error)
 
 
+class CostError(Error):
+    "Exception for reporting a pipe estimated beyond the admitted costs"
+
+
 class PIDError(KeyError):
     "Exception for reporting missing Processor ID in registered processors"
 
@@ -116,6 +116,48 @@ class Spectrum(object):
 
         return (spectral_centroid, db_spectrum)
 
+    def process_blocks(self, blocks, eod, spec_range=120.0):
+        """ Returns a tuple containing the spectral centroids and
+        the spectra (dB scales) of the rows of a (count, nsamples, channels)
+        block matrix, as computed by process for each block."""
+
+        samples = blocks[:, :, 0]
+        count, nsamples = samples.shape
+        if nsamples != self.blocksize:
+            self.window = self.window_function(nsamples)
+        samples *= self.window
+
+        while nsamples > self.fft_size:
+            self.fft_size = 2 * self.fft_size
+
+        start = int(self.fft_size / 2) - int(nsamples / 2)
+        padded = numpy.zeros((count, self.fft_size))
+        padded[:, start:start + nsamples] = samples
+
+        fft = numpy.fft.fft(padded, axis=1)
+        spectrum = numpy.abs(fft[:, :int(fft.shape[1] / 2 + 1)]) / \
+            float(nsamples)
+        length = numpy.float64(spectrum.shape[1])
+
+        db_spectrum = ((20 * (numpy.log10(spectrum + 1e-30)))
+                       .clip(-spec_range, 0.0) + spec_range) / spec_range
+        energy = spectrum.sum(axis=1)
+        spectral_centroid = numpy.zeros(count)
+
+        voiced = energy > 1e-20
+        if voiced.any():
+            if self.spectrum_range is None:
+                self.spectrum_range = numpy.arange(length)
+            centroid = (spectrum[voiced] * self.spectrum_range).sum(axis=1) / \
+                (energy[voiced] * (length - 1)) * \
+                self.samplerate * 0.5
+            centroid = numpy.clip(centroid, self.lower, self.higher)
+            spectral_centroid[voiced] = (numpy.log10(centroid) -
+                                         self.lower_log) / (self.higher_log -
+                                                            self.lower_log)
+
+        return (spectral_centroid, db_spectrum)
+
 
 class Grapher(Processor):
 
@@ -177,6 +219,12 @@ class Grapher(Processor):
         self.pixel = self.image.load()
         self.draw = ImageDraw.Draw(self.image)
 
+    def reset(self):
+        super(Grapher, self).reset()
+        self.frame_cursor = 0
+        self.pixel_cursor = 0
+        self.previous_x, self.previous_y = None, None
+
     @interfacedoc
     def render(self, output=None):
         if output:
@@ -26,9 +26,82 @@
 
     - Downmixing to mono
     - Adapt the frames to match the input_blocksize and input_stepsize of the analyzer
+
+    Within a ProcessPipe, the analyzers seeing the same stream share the
+    result of identical preprocessings: each distinct downmixed or framed
+    stream is computed once per block and handed read-only to all of them.
 '''
 
 
+def shared_preprocessing(analyzer, key, frames, compute, same_frames=True):
+    '''
+    Return compute(), shared with the analyzers of the same pipe stream
+    that request the same preprocessing key on the same block of frames
+
+    With same_frames=False, the result is shared for a block whatever the
+    frames object given, the key identifying the input stream by itself.
+    '''
+    pipe = getattr(analyzer, 'process_pipe', None)
+    streams = getattr(pipe, '_streams', None)
+    if not streams or analyzer.uuid() not in streams:
+        return compute()
+
+    key = (streams[analyzer.uuid()],) + key
+    with pipe._preprocessing_lock:
+        block = pipe._block_index
+        entry = pipe._preprocessing.get(key)
+        if (entry is not None and entry[0] == block and
+                (entry[1] is frames or not same_frames)):
+            return entry[2]
+        result = compute()
+        pipe._preprocessing[key] = (block, frames, result)
+    return result
+
+
+def shared_result(analyzer, key):
+    '''
+    Return the shared result of a preprocessing for the current block of
+    the pipe stream of the analyzer, if any
+    '''
+    pipe = getattr(analyzer, 'process_pipe', None)
+    streams = getattr(pipe, '_streams', None)
+    if not streams or analyzer.uuid() not in streams:
+        return None
+
+    entry = pipe._preprocessing.get((streams[analyzer.uuid()],) + key)
+    if entry is not None and entry[0] == pipe._block_index:
+        return entry[2]
+
+
+def stream_frames(analyzer):
+    '''
+    Return the frames of the pipe stream of the analyzer for the current
+    block, if any
+    '''
+    pipe = getattr(analyzer, 'process_pipe', None)
+    streams = getattr(pipe, '_streams', None)
+    if not streams or analyzer.uuid() not in streams:
+        return None
+    return pipe._stream_frames
+
+
+def shared_state(analyzer, key, factory):
+    '''
+    Return the preprocessing state stored for key in the pipe stream of
+    the analyzer, created by factory(), or None if it can not be shared
+    '''
+    pipe = getattr(analyzer, 'process_pipe', None)
+    streams = getattr(pipe, '_streams', None)
+    if not streams or analyzer.uuid() not in streams:
+        return None
+
+    key = (streams[analyzer.uuid()],) + key
+    with pipe._preprocessing_lock:
+        if key not in pipe._preprocessing_states:
+            pipe._preprocessing_states[key] = factory()
+        return pipe._preprocessing_states[key]
+
+
 def downmix_to_mono(process_func):
     '''
     Pre-processing decorator that downmixes frames from multi-channel to mono
@@ -63,11 +136,19 @@ def downmix_to_mono(process_func):
 
     import functools
 
+    def downmix(frames):
+        downmix_frames = frames.mean(axis=-1)
+        downmix_frames.flags.writeable = False
+        return downmix_frames
+
     @functools.wraps(process_func)
     def wrapper(analyzer, frames, eod):
         # Pre-processing
-        if frames.ndim > 1:
-            downmix_frames = frames.mean(axis=-1)
+        if frames.ndim > 1 and frames is stream_frames(analyzer):
+            downmix_frames = shared_preprocessing(
+                analyzer, ('downmix',), frames, lambda: downmix(frames))
+        elif frames.ndim > 1:
+            downmix_frames = downmix(frames)
         else:
             downmix_frames = frames
         # Processing
@@ -85,7 +166,7 @@ def frames_adapter(process_func):
     >>> from timeside.core.preprocessors import frames_adapter
     >>> @frames_adapter
     ... def process(analyzer,frames,eod):
-    ...     analyzer.frames.append(frames)
+    ...     analyzer.frames.append(frames.copy())
     ...     return frames, eod
     >>> class Fake_Analyzer(object):
     ...     def __init__(self):
@@ -102,7 +183,8 @@ def frames_adapter(process_func):
     >>> frames_, eod_ = process(analyzer,frames,eod)
 
     Inside the process the frames have been adapted to match input_blocksize
-    and input_stepsize
+    and input_stepsize. They are views on a buffer reused for the next blocks
+    and must be copied to be kept.
 
     >>> analyzer.frames
     [array([0, 1, 2, 3]), array([3, 4, 5, 6]), array([6, 7, 8, 9])]
@@ -121,6 +203,19 @@ def frames_adapter(process_func):
     >>> frames_, eod_ = process(analyzer,frames,eod)
     >>> analyzer.frames
     [array([0, 1, 2, 3]), array([3, 4, 5, 6]), array([6, 7, 8, 9]), array([ 9, 10, 11, 12]), array([12, 13,  0,  0])]
+
+    If the analyzer provides a `process_batch(frames_matrix, eod)` method, it
+    is called instead of process, once per incoming block, with all the
+    adapted frames stacked as the rows of a read-only matrix:
+
+    >>> def process_batch(frames_matrix, eod):
+    ...     print(frames_matrix)
+    >>> analyzer = Fake_Analyzer()
+    >>> analyzer.process_batch = process_batch
+    >>> frames_, eod_ = process(analyzer, np.asarray(range(0,12)), False)
+    [[0 1 2 3]
+     [3 4 5 6]
+     [6 7 8 9]]
     '''
 
     import functools
@@ -131,15 +226,38 @@ def frames_adapter(process_func):
         def __init__(self, blocksize, stepsize):
             self.blocksize = blocksize
             self.stepsize = stepsize
-            self.buffer = None
-
-        def frames(self, frames, eod):
-            if self.buffer is not None:
-                stack = np.concatenate([self.buffer, frames])
+            # Preallocated storage holding the frames carried over from the
+            # previous block at [start:start + carry]
+            self.data = None
+            self.start = 0
+            self.carry = 0
+
+        def reserve(self, frames, length):
+            "Move the carried over frames at the front of a large enough storage"
+            if self.carry:
+                dtype = np.result_type(self.data.dtype, frames.dtype)
             else:
-                stack = frames.copy()
-
-            stack_length = len(stack)
+                dtype = frames.dtype
+            shape = frames.shape[1:]
+            carried = slice(self.start, self.start + self.carry)
+            if (self.data is None or len(self.data) < length or
+                    self.data.dtype != dtype or self.data.shape[1:] != shape):
+                data = np.empty((length + self.blocksize,) + shape,
+                                dtype=dtype)
+                if self.carry:
+                    data[:self.carry] = self.data[carried]
+                self.data = data
+            elif self.start and self.carry:
+                self.data[:self.carry] = self.data[carried]
+            self.start = 0
+
+        def stack(self, frames, eod):
+            """Append frames to the buffer and return it with the frames count
+
+            The returned stack is a view on the buffer storage, only valid
+            until the next call.
+            """
+            stack_length = self.carry + len(frames)
 
             nb_frames = (
                 stack_length - self.blocksize + self.stepsize) // self.stepsize
@@ -148,43 +266,106 @@ def frames_adapter(process_func):
                 self.blocksize - self.stepsize
             last_block_size = stack_length - frames_length
 
+            length = stack_length
             if eod:
                 # Final zeropadding
-                pad_shape = tuple(
-                    int(self.blocksize - last_block_size) if i == 0 else x
-                    for i, x in enumerate(frames.shape))
-                stack = np.concatenate([stack, np.zeros(pad_shape,
-                                                        dtype=frames.dtype)])
+                length += int(self.blocksize - last_block_size)
+
+            self.reserve(frames, length)
+            self.data[self.carry:stack_length] = frames
+            if eod:
+                self.data[stack_length:length] = 0
                 nb_frames += 1
 
-            self.buffer = stack[int(nb_frames * self.stepsize):]
+            stack = self.data[:length]
+            self.start = min(int(nb_frames * self.stepsize), length)
+            self.carry = length - self.start
+
+            return stack, int(nb_frames)
+
+        def split(self, stack, nb_frames, eod):
+            "Yield the frames of a stack"
+            last = nb_frames - 1
+            for index in range(nb_frames):
+                start = index * int(self.stepsize)
+                yield (stack[start:start + self.blocksize],
+                       eod if index == last else False)
+
+        def strided(self, stack, nb_frames):
+            """Return the frames of a stack as rows of a read-only strided
+            view"""
+            shape = (nb_frames, self.blocksize) + stack.shape[1:]
+            strides = (int(self.stepsize) * stack.strides[0],) + stack.strides
+            return np.lib.stride_tricks.as_strided(stack, shape=shape,
+                                                   strides=strides,
+                                                   writeable=False)
 
-            eod_list = np.repeat(False, nb_frames)
-            if eod and len(eod_list):
-                eod_list[-1] = eod
+        def frames(self, frames, eod):
+            stack, nb_frames = self.stack(frames, eod)
+            return self.split(stack, nb_frames, eod)
 
-            for index, eod in zip(range(0, int(nb_frames * self.stepsize), int(self.stepsize)), eod_list):
-                yield (stack[index:index + self.blocksize], eod)
+        def matrix(self, frames, eod):
+            """Return all the complete frames as rows of a read-only strided
+            view on the buffer"""
+            stack, nb_frames = self.stack(frames, eod)
+            return self.strided(stack, nb_frames)
 
     aubio_analyzers = ['aubio_melenergy', 'aubio_mfcc', 'aubio_pitch', 'aubio_specdesc', 'aubio_temporal']
-    
+
+    def shared_stack(frames_buffer, frames, eod):
+        stack, nb_frames = frames_buffer.stack(frames, eod)
+        stack.flags.writeable = False
+        return stack, nb_frames
+
     @functools.wraps(process_func)
     def wrapper(analyzer, frames, eod):
         # Pre-processing
-        if not hasattr(analyzer, 'frames_buffer'):
-            if analyzer.id() in aubio_analyzers:
-                # Aubio analyzers are waiting for stepsize length block
-                # and reconstructs blocksize length frames itself
-                # thus frames_adapter has to provide Aubio Pitch blocksize=stepsize length frames
-                analyzer.frames_buffer = framesBuffer(analyzer.input_stepsize,
-                                                      analyzer.input_stepsize)
-            else:
-                analyzer.frames_buffer = framesBuffer(analyzer.input_blocksize,
-                                                      analyzer.input_stepsize)
+        if analyzer.id() in aubio_analyzers:
+            # Aubio analyzers are waiting for stepsize length block
+            # and reconstructs blocksize length frames itself
+            # thus frames_adapter has to provide Aubio Pitch blocksize=stepsize length frames
+            blocksize = analyzer.input_stepsize
+        else:
+            blocksize = analyzer.input_blocksize
+        stepsize = analyzer.input_stepsize
+
+        # Analyzers fed with the frames of the stream or with their shared
+        # downmix share a single frames buffer
+        if frames is stream_frames(analyzer):
+            key = ('frames', blocksize, stepsize, 'stream')
+        elif frames is shared_result(analyzer, ('downmix',)):
+            key = ('frames', blocksize, stepsize, 'downmix')
+        else:
+            key = None
+        frames_buffer = key and shared_state(
+            analyzer, key, lambda: framesBuffer(blocksize, stepsize))
+        shared = frames_buffer is not None
+        if shared:
+            stack, nb_frames = shared_preprocessing(
+                analyzer, key, frames,
+                lambda: shared_stack(frames_buffer, frames, eod),
+                same_frames=False)
+        else:
+            if not hasattr(analyzer, 'frames_buffer'):
+                analyzer.frames_buffer = framesBuffer(blocksize, stepsize)
+            frames_buffer = analyzer.frames_buffer
+            stack, nb_frames = frames_buffer.stack(frames, eod)
 
         # Processing
-        for adapted_frames, adapted_eod in analyzer.frames_buffer.frames(frames, eod):
-            process_func(analyzer, adapted_frames, adapted_eod)
+        process_batch = getattr(analyzer, 'process_batch', None)
+        if process_batch is not None and analyzer.id() not in aubio_analyzers:
+            frames_matrix = frames_buffer.strided(stack, nb_frames)
+            if len(frames_matrix):
+                # Identifies the shared frames of this block, see
+                # timeside.core.stft
+                analyzer.frames_key = key if shared else None
+                try:
+                    process_batch(frames_matrix, eod)
+                finally:
+                    analyzer.frames_key = None
+        else:
+            for adapted_frames, adapted_eod in frames_buffer.split(stack, nb_frames, eod):
+                process_func(analyzer, adapted_frames, adapted_eod)
 
         return frames, eod
     return wrapper
@@ -23,6 +23,8 @@ from .component import implements, implementations, interfacedoc
 from .api import IProcessor
 from .exceptions import Error, PIDError, ApiError
 from .tools.parameters import HasParam
+from .tools.profiling import PipeProfile
+from .tools.cost import COST_MODELS, CostModel, PipeEstimate
 
 import re
 import datetime
@@ -30,9 +32,15 @@ import numpy
 import uuid
 import networkx as nx
 import inspect
+import itertools
 import os
 import csv
 import sys
+import math
+import threading
+import functools
+import warnings
+import asyncio
 
 
 __all__ = ['Processor', 'MetaProcessor', 'implements', 'abstract',
@@ -41,6 +49,13 @@ __all__ = ['Processor', 'MetaProcessor', 'implements', 'abstract',
 
 _processors = {}
 
+# Processor types that pass their input frames through unchanged and can
+# thus run as parallel branches of a pipe
+BRANCH_TYPES = ('analyzer', 'grapher', 'encoder')
+
+# Pipe and segment sources of a segmented run, inherited by the forked workers
+_segment_run = None
+
 
 class MetaProcessor(MetaComponent):
     """Metaclass of the Processor class, used mainly for ensuring
@@ -95,6 +110,10 @@ class Processor(Component, HasParam, metaclass=MetaProcessor):
     implements(IProcessor)
 
     type = ''
+    # Cost model used when no calibrated one is registered for the id
+    cost_model = CostModel()
+    # Whether the processor can run at a reduced samplerate for a preview
+    previewable = False
 
     def __init__(self):
         super(Processor, self).__init__()
@@ -110,6 +129,8 @@ class Processor(Component, HasParam, metaclass=MetaProcessor):
         self.input_blocksize = 0
         self.input_stepsize = 0
         self.run_time = None
+        # Input format requested by the processor itself, see reset()
+        self._input_format = None
 
     @interfacedoc
     def setup(self, channels=None, samplerate=None, blocksize=None,
@@ -119,6 +140,10 @@ class Processor(Component, HasParam, metaclass=MetaProcessor):
         self.source_blocksize = blocksize
         self.source_totalframes = totalframes
 
+        if self._input_format is None:
+            self._input_format = (self.input_channels, self.input_samplerate,
+                                  self.input_blocksize, self.input_stepsize)
+
         # If empty Set default values for input_* attributes
         # may be setted by the processor during __init__()
         if not self.input_channels:
@@ -169,6 +194,26 @@ class Processor(Component, HasParam, metaclass=MetaProcessor):
     def release(self):
         pass
 
+    @interfacedoc
+    def reset(self):
+        # The input format set by default in setup and the frames buffered
+        # by the preprocessors belong to the previous source
+        if self._input_format is not None:
+            (self.input_channels, self.input_samplerate,
+             self.input_blocksize, self.input_stepsize) = self._input_format
+        if 'frames_buffer' in self.__dict__:
+            del self.frames_buffer
+
+    @interfacedoc
+    def needs_more_audio(self):
+        return True
+
+    @interfacedoc
+    def estimate(self, duration, samplerate, channels):
+        samples = (duration * (self.input_samplerate or samplerate) *
+                   (self.input_channels or channels))
+        return COST_MODELS.get(self.id(), self.cost_model)(samples)
+
     @interfacedoc
     def mediainfo(self):
         return self.source_mediainfo
@@ -272,6 +317,72 @@ class FixedSizeInputAdapter(object):
             yield block, True
             self.len = 0
 
+    def process_runs(self, frames, eod):
+        """Returns a tuple (runs, last) where runs is a list of arrays of
+        shape (count, buffer_size, channels) holding all the complete
+        fixed-sized blocks available, and last is the final incomplete block
+        if eod, otherwise None.
+
+        The block completing the frames left from the previous call is in a
+        run of its own, in the dtype of the buffer as the blocks of process,
+        the other blocks are a view on frames. The remaining frames are kept
+        for the next call. In case padding is deactivated the last block may
+        be smaller than the buffer size.
+        """
+        runs = []
+        if self.len:
+            copylen = min(len(frames), self.buffer_size - self.len)
+            self.buffer[self.len:self.len + copylen] = frames[:copylen]
+            self.len += copylen
+            frames = frames[copylen:]
+            if self.len == self.buffer_size:
+                runs.append(self.buffer.copy()[numpy.newaxis])
+                self.len = 0
+
+        count = len(frames) // self.buffer_size
+        length = count * self.buffer_size
+        if count:
+            runs.append(frames[:length].reshape(
+                (count, self.buffer_size) + frames.shape[1:]))
+
+        remaining = len(frames) - length
+        if remaining:
+            self.buffer[:remaining] = frames[length:]
+            self.len = remaining
+
+        last = None
+        if eod and self.len:
+            last = self.buffer
+            if self.pad:
+                self.buffer[self.len:self.buffer_size] = 0
+            else:
+                last = self.buffer[0:self.len]
+            self.len = 0
+
+        return runs, last
+
+    def process_blocks(self, frames, eod):
+        """Returns a tuple (blocks, last) where blocks is an array of shape
+        (count, buffer_size, channels) holding all the complete fixed-sized
+        blocks available, and last is the final incomplete block if eod,
+        otherwise None.
+
+        This is an alternative to process, allowing all the blocks to be
+        processed at once. The blocks are a view on frames unless some
+        frames left from the previous call have to be completed, in which
+        case they are copied, see process_runs.
+        """
+        runs, last = self.process_runs(frames, eod)
+        if len(runs) == 1 and runs[0].dtype == frames.dtype:
+            blocks = runs[0]
+        elif runs:
+            blocks = numpy.concatenate([run.astype(frames.dtype, copy=False)
+                                        for run in runs])
+        else:
+            blocks = frames[:0].reshape((0, self.buffer_size) +
+                                        frames.shape[1:])
+        return blocks, last
+
 
 def processors(interface=IProcessor, recurse=True):
     """Returns the processors implementing a given interface and, if recurse,
@@ -375,18 +486,37 @@ class ProcessPipe(object):
         processor: List of all processors in the Process pipe
         results : Dictionnary of Results Container from all the analyzers
                   in the Pipe process
+        critical_path : Longest chain of dependent processors in the last
+                        post-processing, critical_path_time being its duration
+        Partial results can be received while the pipe runs, see subscribe
     """
 
     def __init__(self, *others):
         self.processors = []
         self._streamer = None
-        self._stream_thread = False
         self._is_running = False
         self._graph = nx.DiGraph(name='ProcessPipe')
 
         self |= others
 
         self.results = {}
+        self.critical_path = []
+        self.critical_path_time = datetime.timedelta(0)
+        self._profile = None
+        self.prefetch_stats = None
+        # Preprocessings shared by the analyzers seeing the same stream
+        self._streams = {}
+        self._preprocessing = {}
+        self._preprocessing_states = {}
+        self._preprocessing_lock = threading.Lock()
+        self._block_index = 0
+        self._stream_frames = None
+        # Set once the processors are set up and the blocks are flowing
+        self._started = threading.Event()
+        # Set by stop() to end the current run at the next block
+        self._stopping = threading.Event()
+        self._subscribers = []
+        self._preview = None
 
     def append_processor(self, proc, source_proc=None):
         "Append a new processor to the pipe"
@@ -409,7 +539,7 @@ class ProcessPipe(object):
             else: # py2 compat
                 neighbors = self._graph.neighbors_iter
             for child in neighbors(source_proc.uuid()):
-                child_proc = self._graph.node[child]['processor']
+                child_proc = self._node_processor(child)
                 if proc == child_proc:
                     proc._uuid = child_proc.uuid()
                     proc.process_pipe = self
@@ -426,6 +556,14 @@ class ProcessPipe(object):
                 self._graph.add_edge(parent.uuid(), proc.uuid(),
                                      type='data_source')
 
+    def _node_processor(self, node):
+        "Return the processor stored at a given node of the pipe graph"
+        if hasattr(self._graph, 'node'):
+            nodes = self._graph.node
+        else:  # networkx >= 2.4
+            nodes = self._graph.nodes
+        return nodes[node]['processor']
+
     def append_pipe(self, proc_pipe):
         "Append a sub-pipe to the pipe"
 
@@ -453,7 +591,8 @@ class ProcessPipe(object):
                                style='dashed', arrows=True)
 
         # labels
-        labels = {node: repr(self._graph.node[node]['processor']) for node in self._graph.nodes()}
+        labels = {node: repr(self._node_processor(node))
+                  for node in self._graph.nodes()}
         nx.draw_networkx_labels(self._graph, pos, labels, font_size=20,
                                 font_family='sans-serif')
 
@@ -492,12 +631,67 @@ class ProcessPipe(object):
                 pipe += ' | '
         return pipe
 
-    def run(self, channels=None, samplerate=None, blocksize=None):
-        """Setup/reset all processors in cascade"""
+    def run(self, channels=None, samplerate=None, blocksize=None,
+            workers=None, backend='thread', profile=False, prefetch=None,
+            segments=None, preview=None):
+        """Setup/reset all processors in cascade
+
+        Parameters
+        ----------
+        channels, samplerate, blocksize : int, optional
+            Output format requested from the source
+        workers : int, optional
+            If set, the independent branches hanging off the source are
+            dispatched concurrently on a pool of `workers` threads for
+            each block. Blocks are still processed in order: every branch
+            must be done with a block before the next one is decoded.
+            The post-processing is then scheduled on the same pool following
+            the data_source dependencies.
+        backend : {'thread', 'process'}
+            With 'process', the analyzers fed with the unmodified source
+            frames run in up to `workers` forked processes reading the blocks
+            from a shared memory ring buffer. Their results are gathered back
+            in the pipe before the post-processing of the other items.
+        profile : bool
+            Record the time spent by each processor in setup, process,
+            post_process and release, see :meth:`profile`. The analyzers
+            running in worker processes are not profiled.
+        prefetch : int or float, optional
+            Decode ahead of the processing in a background thread, up to
+            `prefetch` blocks if an int or `prefetch` seconds of audio if
+            a float. The queue occupancy statistics are then available in
+            `prefetch_stats`.
+        segments : int, optional
+            Split the source into `segments` time segments analyzed in up to
+            `workers` forked processes (one per segment by default), each
+            segment being decoded with enough overlap to complete its last
+            frames. The results are then merged by the merge method of each
+            analyzer. The pipe runs serially if an item is not an analyzer
+            implementing merge or if the source can not be segmented.
+            The backend and profile arguments are ignored in this mode.
+        preview : int, optional
+            Run a fast approximate analysis with the source decoded at its
+            samplerate divided by `preview`, the stepsizes of the analyzers
+            thus spanning `preview` times longer. The results are tagged as
+            approximate in their id_metadata. All the items must be
+            previewable.
+        """
+        if backend not in ('thread', 'process'):
+            raise ValueError("Unknown pipe backend: %s" % backend)
 
         source = self.processors[0]
         items = self.processors[1:]
 
+        self._preview = preview or None
+        if preview:
+            exact = [item.id() for item in items
+                     if not item.previewable or item.force_samplerate]
+            if exact:
+                raise ValueError("Processors can not run in preview mode: %s"
+                                 % ', '.join(exact))
+            samplerate = int((samplerate or source.input_samplerate)
+                             // preview)
+
         # Check if any processor in items need to force the samplerate
         force_samplerate = set([item.force_samplerate for item in items
                                 if item.force_samplerate])
@@ -512,30 +706,62 @@ class ProcessPipe(object):
 
             samplerate = force_samplerate
 
-        source.setup(channels=channels, samplerate=samplerate,
-                     blocksize=blocksize)
+        if segments and segments > 1:
+            plan = self._segments(source, items, segments, samplerate,
+                                  blocksize)
+            if plan is not None:
+                self._profile = None
+                self._run_segments(items, *plan, workers=workers or segments,
+                                   channels=channels, samplerate=samplerate,
+                                   blocksize=blocksize, prefetch=prefetch)
+                return
+
+        self._profile = PipeProfile(self) if profile else None
+
+        self._call(source, 'setup', channels=channels, samplerate=samplerate,
+                   blocksize=blocksize)
         source.SIG_STOP = False
         last = source
 
         # setup/reset processors and configure properties throughout the pipe
         for item in items:
             item.source_mediainfo = source.mediainfo()
-            item.setup(channels=last.channels(),
+            self._call(item, 'setup', channels=last.channels(),
                        samplerate=last.samplerate(),
                        blocksize=last.blocksize(),
                        totalframes=last.totalframes())
             self._register_streamer(item)
             last = item
 
+        self._share_preprocessing(items)
+
+        pool = None
+        local_items = items
+        if workers and backend == 'process':
+            groups = self._remote_groups(items)
+            if groups:
+                from .tools.workers import BranchPool
+                pool = BranchPool(self, groups, workers,
+                                  blocksize=source.blocksize(),
+                                  channels=source.channels())
+                remote = set(proc.uuid() for group in groups
+                             for proc in group)
+                local_items = [item for item in items
+                               if item.uuid() not in remote]
+
+        if workers:
+            from concurrent.futures import ThreadPoolExecutor
+            stages = self._branches(source, local_items)
+            executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            stages = [local_items]
+            executor = None
+
         # now stream audio data along the pipe
-        if self._stream_thread:
-            self._running_cond.acquire()
         self._is_running = True
-        if self._stream_thread:
-            self._running_cond.notify()
-            self._running_cond.release()
+        self._started.set()
 
-        eod = False
+        eod = source_eod = False
 
         if source.id() == 'live_decoder':
             # Set handler for Interruption signal
@@ -549,32 +775,606 @@ class ProcessPipe(object):
         for item in items:
             item.start_time = datetime.datetime.utcnow()
 
-        while not eod:
-            frames, eod = source.process()
-            for item in items:
-                frames, eod = item.process(frames, eod)
-
-        if source.id() == 'live_decoder':
-            # Restore default handler for Interruption signal
-            signal.signal(signal.SIGINT, signal.SIG_DFL)
+        self.prefetch_stats = None
+        if prefetch:
+            from .tools.prefetch import Prefetcher
+            if isinstance(prefetch, float):
+                prefetch = int(numpy.ceil(
+                    prefetch * source.samplerate() / source.blocksize()))
+            prefetcher = Prefetcher(lambda: self._call(source, 'process'),
+                                    prefetch)
+            read = prefetcher.get
+        else:
+            prefetcher = None
+            read = lambda: self._call(source, 'process')
 
-        # Post-processing
-        for item in items:
-            item.post_process()
+        try:
+            try:
+                if pool is not None:
+                    pool.start()
+                if prefetcher is not None:
+                    prefetcher.start()
+                while not eod:
+                    frames, source_eod = read()
+                    # A stopped pipe ends its processors with this block
+                    eod = source_eod or self._stopping.is_set()
+                    self._block_index += 1
+                    if pool is not None:
+                        pool.dispatch(frames, eod)
+                    for stage in stages:
+                        frames, eod = self._process_stage(stage, frames, eod,
+                                                          executor)
+                    # The analyzers of the worker processes can not be asked
+                    if (not eod and items and pool is None and
+                            not any(item.needs_more_audio()
+                                    for item in items)):
+                        self.stop()
+                if pool is not None:
+                    self.results.update(pool.join())
+                if not source_eod:
+                    self._drain(source, read)
+            finally:
+                if prefetcher is not None:
+                    prefetcher.stop()
+                    self.prefetch_stats = prefetcher.stats()
+                if pool is not None:
+                    pool.close()
+
+            if source.id() == 'live_decoder':
+                # Restore default handler for Interruption signal
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+            # Post-processing
+            self._post_process(local_items, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
 
         # Release source
-        source.release()
+        self._call(source, 'release')
         # Release processors
         for item in items:
-            item.release()
+            self._call(item, 'release')
             item.run_time = datetime.datetime.utcnow() - item.start_time
 
         self._is_running = False
+        self._stopping.clear()
 
-    def stream(self):
-        self._stream_thread = True
+    def stop(self):
+        """Stop the current run of the pipe
 
-        import threading
+        The processors receive the next block as the last one, so that they
+        are post-processed and released as at the end of the source.
+        Thread-safe: meant to be called while `run` is executing elsewhere.
+        """
+        self._stopping.set()
+
+    def _drain(self, source, read):
+        "Stop a source before its end of data and wait for its last block"
+        stop = getattr(source, 'stop', None)
+        if stop is None:
+            return
+        # e.g. the GStreamer pipeline of a decoder, that must reach its
+        # end-of-stream to be torn down
+        stop()
+        eod = False
+        while not eod:
+            _, eod = read()
+
+    async def arun(self, executor=None, **kwargs):
+        """Run the pipe without blocking the asyncio event loop
+
+        The decoding and processing run in `executor`, the default executor
+        of the loop if None. Cancelling the awaiting task stops the pipe, see
+        :meth:`stop`, and waits for its processors to be released before
+        raising CancelledError.
+
+        Parameters
+        ----------
+        executor : concurrent.futures.Executor, optional
+        **kwargs
+            Arguments of :meth:`run`
+
+        Returns
+        -------
+        results : dict
+            The results of the analyzers
+        """
+        loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        run = loop.run_in_executor(executor,
+                                   functools.partial(self.run, **kwargs))
+        try:
+            await asyncio.shield(run)
+        except asyncio.CancelledError:
+            self.stop()
+            await run
+            raise
+        return self.results
+
+    async def astream(self, executor=None, **kwargs):
+        """Asynchronous version of :meth:`stream`
+
+        Yield the chunks of the streaming encoder of the pipe while it runs in
+        `executor`, see :meth:`arun`. Each chunk is read only when the
+        consumer asks for it, the bounded queue of the encoder then holding
+        back the decoding. Leaving the iteration early or cancelling it stops
+        the pipe.
+        """
+        loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._started.clear()
+        run = loop.run_in_executor(executor,
+                                   functools.partial(self.run, **kwargs))
+        # Wake up the wait below if the run fails before starting
+        run.add_done_callback(lambda future: self._started.set())
+        await loop.run_in_executor(executor, self._started.wait)
+        if run.done():
+            await run
+        if self._streamer is None:
+            self.stop()
+            await run
+            raise TypeError('Function only available in streaming mode')
+
+        chunks = functools.partial(loop.run_in_executor, executor,
+                                   self._streamer.get_stream_chunk)
+        chunk = pending = None
+        try:
+            while True:
+                pending = chunks()
+                chunk = await asyncio.shield(pending)
+                pending = None
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            if chunk is not None or pending is not None:
+                self.stop()
+                # Consume the remaining chunks up to the encoder end
+                chunk = await (pending or chunks())
+                while chunk is not None:
+                    chunk = await chunks()
+            await run
+
+    def subscribe(self, callback):
+        """Receive the partial results of the analyzers while the pipe runs
+
+        callback(chunk) is called with each ResultChunk emitted by the
+        framewise analyzers, see Analyzer.emit, from the thread processing
+        them: concurrently if the pipe runs with several workers. Chunks are
+        not emitted by the analyzers running in worker processes.
+
+        Returns
+        -------
+        callback
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def publish(self, chunk):
+        "Send a result chunk to the subscribers"
+        for callback in list(self._subscribers):
+            callback(chunk)
+
+    def partial_results(self, maxsize=64, **kwargs):
+        """Run the pipe in a thread and iterate over its result chunks
+
+        Parameters
+        ----------
+        maxsize : int
+            Maximum number of chunks waiting to be consumed, the pipe being
+            held back beyond
+        **kwargs
+            Arguments of :meth:`run`
+
+        Yields
+        ------
+        chunk : ResultChunk
+            See :meth:`subscribe`. Leaving the iteration early stops the pipe.
+        """
+        try:
+            import queue
+        except ImportError:  # py2
+            import Queue as queue
+        chunks = queue.Queue(maxsize)
+        end = object()
+        errors = []
+
+        def run():
+            try:
+                self.run(**kwargs)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                chunks.put(end)
+
+        self.subscribe(chunks.put)
+        pipe_thread = threading.Thread(target=run, name='pipe_thread')
+        pipe_thread.start()
+        chunk = None
+        try:
+            chunk = chunks.get()
+            while chunk is not end:
+                yield chunk
+                chunk = chunks.get()
+        finally:
+            if chunk is not end:
+                self.stop()
+                while chunks.get() is not end:
+                    pass
+            pipe_thread.join()
+            self.unsubscribe(chunks.put)
+        if errors:
+            raise errors[0]
+
+    def run_many(self, sources, **kwargs):
+        """Run the pipe on several sources in turn, reusing its processors
+
+        Each source replaces the first processor of the pipe and the other
+        processors are reset before being set up for it, so that they are
+        built and configured only once.
+
+        Parameters
+        ----------
+        sources : iterable of Processor
+            The decoders of the media to process
+        **kwargs
+            Arguments of :meth:`run`
+
+        Yields
+        ------
+        (source, results) : (Processor, dict)
+            Each source and the results of the analyzers on it. The other
+            outputs of the processors (e.g. the graphers images) must be
+            collected before moving to the next source.
+        """
+        for source in sources:
+            self._set_source(source)
+            for item in self.processors[1:]:
+                item.reset()
+            self.results = {}
+            self.run(**kwargs)
+            yield source, self.results
+
+    def _set_source(self, source):
+        "Replace the first processor of the pipe"
+        if not isinstance(source, Processor):
+            raise TypeError('source must be a Processor')
+        current = self.processors[0]
+        if source is current:
+            return
+
+        nx.relabel_nodes(self._graph, {current.uuid(): source.uuid()},
+                         copy=False)
+        if hasattr(self._graph, 'node'):
+            nodes = self._graph.node
+        else:  # networkx >= 2.4
+            nodes = self._graph.nodes
+        nodes[source.uuid()].update(processor=source, id=source.id())
+        self.processors[0] = source
+        source.process_pipe = self
+
+    def _segments(self, source, items, segments, samplerate=None,
+                  blocksize=None):
+        """Split the source into segments for a segmented run
+
+        The segments are aligned on the stepsizes requested by the items and
+        on the source blocksize, so that the frames of each segment match the
+        ones of a serial run, and extended by the overlap needed to complete
+        their last frame.
+
+        Returns
+        -------
+        (sources, overlaps) : (list of Processor, list of tuple)
+            The decoder of each segment and its (start, end, overlap) in
+            seconds, see analyzer.merge_results, or None if the pipe can not
+            be segmented
+        """
+        if not items or any(item.type != 'analyzer' or item.merge is None
+                            for item in items):
+            return None
+        duration = getattr(source, 'uri_duration', None)
+        samplerate = samplerate or source.input_samplerate
+        if not duration or not samplerate:
+            return None
+
+        grid = blocksize or source.blocksize()
+        overlap = 0
+        for item in items:
+            if item._input_format is None:
+                item_blocksize, item_stepsize = (item.input_blocksize,
+                                                 item.input_stepsize)
+            else:
+                item_blocksize, item_stepsize = item._input_format[2:]
+            if item_blocksize:
+                item_stepsize = item_stepsize or item_blocksize
+                grid = grid * item_stepsize // math.gcd(grid, item_stepsize)
+                overlap = max(overlap, item_blocksize - item_stepsize)
+
+        totalframes = int(round(duration * samplerate))
+        length = -(-totalframes // (segments * grid)) * grid
+        if length >= totalframes:
+            return None
+
+        sources = []
+        overlaps = []
+        for start in range(0, totalframes, length):
+            end = min(start + length, totalframes)
+            stop = min(end + overlap, totalframes)
+            if stop < totalframes:
+                segment = source.segment(start / samplerate,
+                                         (stop - start) / samplerate)
+            else:
+                segment = source.segment(start / samplerate)
+            if segment is None:
+                warnings.warn("%s can not be split into segments, the pipe "
+                              "is run serially" % source.id(), UserWarning)
+                return None
+            sources.append(segment)
+            overlaps.append((start / samplerate, end / samplerate,
+                             (stop - end) / samplerate))
+        return sources, overlaps
+
+    def _run_segments(self, items, sources, overlaps, workers, **kwargs):
+        "Run the pipe on each segment in a forked process and merge results"
+        global _segment_run
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            raise Error('A segmented run requires the fork start method')
+
+        for item in items:
+            item.start_time = datetime.datetime.utcnow()
+
+        _segment_run = (self, sources)
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(sources)),
+                                     mp_context=context) as executor:
+                parts = list(executor.map(_run_segment, range(len(sources)),
+                                          itertools.repeat(kwargs)))
+        finally:
+            _segment_run = None
+
+        mediainfo = self.processors[0].mediainfo()
+        self.results = {}
+        for item in items:
+            if item.uuid() not in parts[0][0]:
+                continue
+            results = [part[item.uuid()] for part, _ in parts]
+            if item.segment_state is None:
+                results = item.merge(results, overlaps)
+            else:
+                results = item.merge(results, overlaps,
+                                     [states[item.uuid()]
+                                      for _, states in parts])
+            for result in results.values():
+                for key in ('uri', 'sha1', 'start', 'duration', 'is_segment'):
+                    result.audio_metadata[key] = mediainfo[key]
+            self.results[item.uuid()] = results
+
+        for item in items:
+            item.run_time = datetime.datetime.utcnow() - item.start_time
+
+    def _branches(self, source, items):
+        """Group items into stages of independent branches fed by source
+
+        Analyzers, graphers and encoders connected to the source in the graph
+        return their input frames untouched, so consecutive ones can process
+        the same block concurrently. Any other processor (e.g. an effect)
+        transforms the frames and gets a stage of its own.
+        """
+        audio_children = set(
+            child for (_, child, data)
+            in self._graph.out_edges(source.uuid(), data=True)
+            if data['type'] == 'audio_source')
+
+        stages = []
+        branches = []
+        for item in items:
+            if item.type in BRANCH_TYPES and item.uuid() in audio_children:
+                branches.append(item)
+                continue
+            if branches:
+                stages.append(branches)
+                branches = []
+            stages.append([item])
+        if branches:
+            stages.append(branches)
+
+        return stages
+
+    def _share_preprocessing(self, items):
+        """Index the streams seen by the items to share their preprocessings
+
+        Analyzers, graphers and encoders pass their input frames unchanged,
+        so all the items between two other processors (e.g. effects) see
+        the same stream.
+        """
+        self._streams = {}
+        self._preprocessing = {}
+        self._preprocessing_states = {}
+        self._block_index = 0
+        self._stream_frames = None
+        stream = 0
+        for item in items:
+            if item.type in BRANCH_TYPES:
+                self._streams[item.uuid()] = stream
+            else:
+                stream += 1
+
+    def _remote_groups(self, items):
+        """Return the groups of analyzers that can run in a worker process
+
+        Only the analyzers seeing the unmodified source frames, i.e. placed
+        before any effect in the pipe, are eligible. Analyzers linked by a
+        data_source edge share their state and are kept in the same group.
+        """
+        eligible = set()
+        for item in items:
+            if item.type not in BRANCH_TYPES:
+                break
+            if item.type == 'analyzer':
+                eligible.add(item.uuid())
+
+        # Connected components of the data_source edges
+        group_of = dict((item.uuid(), [item]) for item in items)
+        for (parent, child, data) in self._graph.edges(data=True):
+            if data['type'] != 'data_source':
+                continue
+            if parent not in group_of or child not in group_of:
+                continue
+            if group_of[parent] is group_of[child]:
+                continue
+            merged = group_of[parent] + group_of[child]
+            for proc in merged:
+                group_of[proc.uuid()] = merged
+
+        groups = []
+        seen = set()
+        for item in items:
+            group = group_of[item.uuid()]
+            if id(group) in seen:
+                continue
+            seen.add(id(group))
+            if all(proc.uuid() in eligible for proc in group):
+                groups.append(group)
+        return groups
+
+    def _post_process(self, items, executor=None):
+        """Post-process items, each one after its data_source parents
+
+        With an executor, independent items are post-processed concurrently
+        and a child is submitted as soon as all its parents are done.
+        The duration of each post_process is stored in `post_process_time`
+        and the longest chain of dependent items in `critical_path`.
+        """
+        uuids = set(item.uuid() for item in items)
+        procs = dict((item.uuid(), item) for item in items)
+        parents = dict((item.uuid(), set()) for item in items)
+        children = dict((item.uuid(), []) for item in items)
+        for (parent, child, data) in self._graph.edges(data=True):
+            if (data['type'] == 'data_source' and
+                    parent in uuids and child in uuids):
+                parents[child].add(parent)
+                children[parent].append(child)
+
+        def post_process(item):
+            start = datetime.datetime.utcnow()
+            self._call(item, 'post_process')
+            item.post_process_time = datetime.datetime.utcnow() - start
+
+        if executor is None:
+            for item in items:
+                post_process(item)
+        else:
+            from concurrent.futures import wait, FIRST_COMPLETED
+            pending = dict((uuid, set(deps)) for uuid, deps in parents.items())
+            futures = dict((executor.submit(post_process, item), item.uuid())
+                           for item in items if not pending[item.uuid()])
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    uuid = futures.pop(future)
+                    for child in children[uuid]:
+                        pending[child].discard(uuid)
+                        if not pending[child]:
+                            futures[executor.submit(post_process,
+                                                    procs[child])] = child
+
+        # Critical path
+        finish = {}
+        previous = {}
+        for uuid in nx.topological_sort(self._graph):
+            if uuid not in uuids:
+                continue
+            item = procs[uuid]
+            start = datetime.timedelta(0)
+            previous[uuid] = None
+            for parent in parents[uuid]:
+                if finish[parent] > start:
+                    start = finish[parent]
+                    previous[uuid] = parent
+            finish[uuid] = start + item.post_process_time
+
+        self.critical_path = []
+        self.critical_path_time = datetime.timedelta(0)
+        if finish:
+            uuid = max(finish, key=finish.get)
+            self.critical_path_time = finish[uuid]
+            while uuid is not None:
+                self.critical_path.insert(0, procs[uuid])
+                uuid = previous[uuid]
+
+    def _call(self, item, method, *args, **kwargs):
+        "Call a method of a processor of the pipe, profiling it if required"
+        if self._profile is None:
+            return getattr(item, method)(*args, **kwargs)
+        return self._profile.call(item, method, *args, **kwargs)
+
+    def profile(self):
+        """Return the profile of the last run
+
+        Returns
+        -------
+        profile : PipeProfile or None
+            Statistics of each processor, indexed by uuid, or None if the
+            pipe was not run with profile=True
+        """
+        return self._profile
+
+    def estimate(self, duration, samplerate=None, channels=None):
+        """Estimate the cost of a run before running it
+
+        Parameters
+        ----------
+        duration : float
+            Duration (in s) of the source
+        samplerate : int, optional
+            Default to the samplerate of the source
+        channels : int, optional
+            Default to the number of channels of the source
+
+        Returns
+        -------
+        estimate : PipeEstimate
+            Cost of each processor, indexed by uuid, and the total cost of
+            the pipe
+        """
+        source = self.processors[0]
+        samplerate = samplerate or getattr(source, 'input_samplerate', None)
+        channels = channels or getattr(source, 'input_channels', None)
+        if not (samplerate and channels):
+            raise ValueError('The samplerate and channels of the source '
+                             'are unknown')
+        return PipeEstimate(self, [
+            (item.uuid(), item.estimate(duration, samplerate, channels))
+            for item in self.processors])
+
+    def _process_stage(self, stage, frames, eod, executor=None):
+        "Feed a block to a stage and return the frames for the next one"
+        # The frames of the stream seen by the items of the stage
+        self._stream_frames = frames
+        if executor is None or len(stage) == 1:
+            for item in stage:
+                frames, eod = self._call(item, 'process', frames, eod)
+            return frames, eod
+
+        futures = [executor.submit(self._call, item, 'process', frames, eod)
+                   for item in stage]
+        # Barrier: all branches are done with this block before the next
+        for future in futures:
+            future.result()
+
+        return frames, eod
+
+    def stream(self):
+        self._started.clear()
 
         class PipeThread(threading.Thread):
 
@@ -589,11 +1389,7 @@ class ProcessPipe(object):
         pipe_thread.start()
 
         # wait for pipe thread to be ready to stream
-        self._running_cond = threading.Condition(threading.Lock())
-        self._running_cond.acquire()
-        while not self._is_running:
-            self._running_cond.wait()
-        self._running_cond.release()
+        self._started.wait()
 
         if self._streamer is None:
             raise TypeError('Function only available in streaming mode')
@@ -610,5 +1406,93 @@ class ProcessPipe(object):
         if hasattr(processor, 'streaming') and processor.streaming:
             if self._streamer is None:
                 self._streamer = processor
-            else:
+            elif self._streamer is not processor:
                 raise TypeError('More than one streaming processor in pipe')
+
+
+def _run_segment(index, kwargs):
+    "Run the pipe of a segmented run on a segment, in a worker process"
+    pipe, sources = _segment_run
+    # The subscribers of the pipe live in the parent process
+    pipe._subscribers = []
+    for source, results in pipe.run_many([sources[index]], **kwargs):
+        states = dict((item.uuid(), item.segment_state())
+                      for item in pipe.processors
+                      if getattr(item, 'segment_state', None) is not None)
+        return results, states
+
+
+class PipeTemplate(object):
+
+    """Processors piped once and run on several media
+
+    Parameters
+    ----------
+    processors : list of Processor
+        The processors to pipe after the decoder of each media
+    decoder : str or callable, optional
+        Id of the decoder or factory returning the decoder of a media,
+        'file_decoder' by default
+    **decoder_parameters
+        Parameters given to the decoder with each media
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from timeside.core import get_processor
+    >>> from timeside.core.processor import PipeTemplate
+    >>> level = get_processor('level')()
+    >>> template = PipeTemplate([level], decoder='array_decoder')
+    >>> for source, results in template.run_many(
+    ...         [np.ones(1024), 0.5 * np.ones(1024)]):
+    ...     print(results[level.uuid()]['level.max'].data)
+    [0.]
+    [-6.021]
+    """
+
+    def __init__(self, processors, decoder='file_decoder',
+                 **decoder_parameters):
+        if not callable(decoder):
+            decoder = get_processor(decoder)
+        self.processors = list(processors)
+        self.decoder = decoder
+        self.decoder_parameters = decoder_parameters
+        self.pipe = None
+
+    def _sources(self, media):
+        for medium in media:
+            if not isinstance(medium, Processor):
+                medium = self.decoder(medium, **self.decoder_parameters)
+            yield medium
+
+    def run_many(self, media, **kwargs):
+        """Run the processors on each media in turn
+
+        Parameters
+        ----------
+        media : iterable
+            The media (e.g. uris) given to the decoder, or decoders
+        **kwargs
+            Arguments of :meth:`ProcessPipe.run`
+
+        Yields
+        ------
+        (source, results) : (Processor, dict)
+            The decoder of each media and the results of the analyzers on
+            it, see :meth:`ProcessPipe.run_many`
+        """
+        sources = self._sources(media)
+        if self.pipe is None:
+            for source in sources:
+                self.pipe = ProcessPipe(source, self.processors)
+                sources = itertools.chain([source], sources)
+                break
+            else:
+                return
+        for source, results in self.pipe.run_many(sources, **kwargs):
+            yield source, results
+
+    def run(self, medium, **kwargs):
+        "Run the processors on a single media and return the results"
+        for source, results in self.run_many([medium], **kwargs):
+            return results
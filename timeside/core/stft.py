@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of TimeSide.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+    Short-time Fourier transform shared by the analyzers of a pipe
+
+    Analyzers implementing `process_batch` get their spectra with
+    :func:`stft` instead of computing the FFT themselves. Within a pipe, each
+    distinct (blocksize, stepsize, window, fft_size) configuration is then
+    computed once per block for all the analyzers seeing the same stream.
+
+    >>> import numpy as np
+    >>> from timeside.core.stft import stft
+    >>> class Fake_Analyzer(object):
+    ...     frames_key = None
+    >>> frames_matrix = np.ones((3, 4))
+    >>> stft(Fake_Analyzer(), frames_matrix, magnitude=True)
+    array([[4., 0., 0.],
+           [4., 0., 0.],
+           [4., 0., 0.]])
+'''
+
+import numpy as np
+
+from .preprocessors import shared_preprocessing
+
+WINDOWS = {'hanning': np.hanning,
+           'hamming': np.hamming,
+           'blackman': np.blackman,
+           'bartlett': np.bartlett}
+
+
+def get_window(window, size):
+    "Return a window function by name, None for a rectangular one"
+    if window is None:
+        return None
+    try:
+        return WINDOWS[window](size)
+    except KeyError:
+        raise ValueError('Unknown window: %s' % window)
+
+
+def stft(analyzer, frames_matrix, fft_size=None, window=None,
+         magnitude=False):
+    '''
+    Return the spectra of the frames given to the process_batch of an
+    analyzer
+
+    Parameters
+    ----------
+    analyzer : Analyzer
+        Analyzer requesting the spectra from its process_batch method
+    frames_matrix : numpy array
+        Frames matrix given to process_batch, one frame per row
+    fft_size : int, optional
+        Size of the FFT, default to the frames size
+    window : str, optional
+        Name of the window applied to the frames, see WINDOWS
+    magnitude : bool, optional
+        Return the magnitude instead of the complex spectra
+
+    Returns
+    -------
+    spectra : numpy array
+        Read-only array of fft_size // 2 + 1 bins per frame
+    '''
+    if not fft_size:
+        fft_size = frames_matrix.shape[1]
+
+    def spectra():
+        frames = frames_matrix
+        window_values = get_window(window, frames.shape[1])
+        if window_values is not None:
+            frames = frames * window_values
+        result = np.fft.rfft(frames, fft_size, axis=1)
+        result.flags.writeable = False
+        return result
+
+    def magnitudes():
+        result = np.abs(spectra_matrix)
+        result.flags.writeable = False
+        return result
+
+    frames_key = getattr(analyzer, 'frames_key', None)
+    if frames_key is None:
+        spectra_matrix = spectra()
+        return magnitudes() if magnitude else spectra_matrix
+
+    # The frames key identifies the frames of the current block
+    key = frames_key + ('stft', fft_size, window)
+    spectra_matrix = shared_preprocessing(analyzer, key, frames_matrix,
+                                          spectra, same_frames=False)
+    if not magnitude:
+        return spectra_matrix
+    return shared_preprocessing(analyzer, key + ('magnitude',),
+                                frames_matrix, magnitudes, same_frames=False)
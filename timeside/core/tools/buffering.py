@@ -22,6 +22,7 @@
 
 import tables
 from tempfile import NamedTemporaryFile
+import time
 import numpy as np
 
 
@@ -60,6 +61,7 @@ class BufferTable(object):
             if name not in self.array_names:
                 self.array_names.append(name)
             # The following is compatible with pytables 3 only
+            # The array is created with new_array as its first row
             self.fileh.create_earray(where=self.fileh.root,
                                      name=name,
                                      obj=[new_array])
@@ -73,10 +75,162 @@ class BufferTable(object):
             #                         name=name,
             #                         atom=atom,
             #                         shape=shape)
-            self.append(name, new_array)
+
+    def extend(self, name, new_arrays):
+        "Append the rows of new_arrays"
+        if not len(new_arrays):
+            return
+        try:
+            self.fileh.root.__getattr__(name).append(new_arrays)
+        except tables.exceptions.NoSuchNodeError:
+            if name not in self.array_names:
+                self.array_names.append(name)
+            self.fileh.create_earray(where=self.fileh.root,
+                                     name=name,
+                                     obj=np.asarray(new_arrays))
 
     def close(self):
+        if not self.fileh.isopen:
+            return
         for name in self.array_names:
             self.fileh.remove_node(self.fileh.root, name)
         self.fileh.close()
         self._tempfile.close()
+
+
+class FramesStack(object):
+
+    """Stack of decoded (frames, eod) blocks stored in a temporary file
+
+    The blocks are read back as views on a memory map of the file, so that
+    the memory used by the stack does not grow with the duration of the
+    stream. Blocks already backed by a memory map (e.g. read from the PCM
+    cache) are kept as is instead of being copied.
+    """
+
+    def __init__(self):
+        self._tempfile = NamedTemporaryFile(mode='w+b', suffix='.raw',
+                                            prefix='ts_stack_',
+                                            delete=True)
+        self._blocks = []
+        self._size = 0
+        self._map = None
+
+    def append(self, block):
+        frames, eod = block
+        if frames is None or isinstance(frames, np.memmap):
+            self._blocks.append((frames, None, eod))
+            return
+        frames = np.ascontiguousarray(frames)
+        self._tempfile.write(frames.tobytes())
+        self._blocks.append(((frames.shape, frames.dtype), self._size, eod))
+        self._size += frames.nbytes
+        self._map = None
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __getitem__(self, index):
+        frames, offset, eod = self._blocks[index]
+        if offset is None:
+            return frames, eod
+        shape, dtype = frames
+        if not np.prod(shape):
+            return np.empty(shape, dtype=dtype), eod
+        if self._map is None:
+            self._tempfile.flush()
+            self._map = np.memmap(self._tempfile.name, dtype=np.uint8,
+                                  mode='r', shape=(self._size,))
+        return np.ndarray(shape, dtype=dtype, buffer=self._map,
+                          offset=offset), eod
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        self._map = None
+        self._blocks = []
+        self._tempfile.close()
+
+
+class BlockAssembler(object):
+
+    """Assemble fixed-size blocks from buffers of any size
+
+    Each incoming sample is copied once, straight into the preallocated
+    block being filled. A full block is handed over as is and a new one is
+    allocated, as the consumers of the blocks may keep them.
+
+    >>> blocks = BlockAssembler(4, 1)
+    >>> [block[:, 0].tolist() for block in blocks.write(np.arange(6.))]
+    [[0.0, 1.0, 2.0, 3.0]]
+    >>> [block[:, 0].tolist() for block in blocks.write(np.arange(6., 9.))]
+    [[4.0, 5.0, 6.0, 7.0]]
+    >>> blocks.flush()[:, 0].tolist()
+    [8.0]
+    """
+
+    def __init__(self, blocksize, channels, dtype='float32'):
+        self.blocksize = int(blocksize)
+        self.channels = int(channels)
+        self.dtype = np.dtype(dtype)
+        self._block = None
+        self._filled = 0
+        # Throughput counters
+        self.samples = 0
+        self.buffers = 0
+        self.blocks = 0
+        self.start_time = None
+        self.last_time = None
+
+    def write(self, frames):
+        "Append frames and return the list of the blocks they complete"
+        frames = np.asarray(frames).reshape((-1, self.channels))
+        now = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = now
+        self.last_time = now
+        self.buffers += 1
+        self.samples += len(frames)
+
+        blocks = []
+        offset = 0
+        while offset < len(frames):
+            if self._block is None:
+                self._block = np.empty((self.blocksize, self.channels),
+                                       dtype=self.dtype)
+            length = min(len(frames) - offset, self.blocksize - self._filled)
+            self._block[self._filled:self._filled + length] = \
+                frames[offset:offset + length]
+            self._filled += length
+            offset += length
+            if self._filled == self.blocksize:
+                blocks.append(self._block)
+                self._block = None
+                self._filled = 0
+        self.blocks += len(blocks)
+        return blocks
+
+    def flush(self):
+        "Return the frames of the incomplete block, possibly empty"
+        if self._block is None:
+            block = np.empty((0, self.channels), dtype=self.dtype)
+        else:
+            block = self._block[:self._filled]
+        self._block = None
+        self._filled = 0
+        return block
+
+    def stats(self):
+        "Return the throughput counters"
+        elapsed = ((self.last_time - self.start_time)
+                   if self.start_time is not None else 0.)
+        return {'samples': self.samples,
+                'buffers': self.buffers,
+                'blocks': self.blocks,
+                'elapsed': elapsed,
+                'samples_per_second': (self.samples / elapsed
+                                       if elapsed else 0.),
+                'buffers_per_second': (self.buffers / elapsed
+                                       if elapsed else 0.)}
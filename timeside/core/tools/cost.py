@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of TimeSide.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Cost models of the processors, fitted from profiled runs
+"""
+
+from collections import namedtuple, OrderedDict
+import json
+import tracemalloc
+
+import numpy as np
+
+from timeside.core.exceptions import CostError
+
+# Durations (in s) of the calibration signals
+CALIBRATION_DURATIONS = (5., 10., 20.)
+
+Cost = namedtuple('Cost', ['cpu_seconds', 'peak_bytes', 'result_bytes'])
+
+# Cost models fitted by calibrate(), indexed by processor id
+COST_MODELS = {}
+
+
+class CostModel(object):
+
+    """Cost of a processor, linear in the number of input samples
+
+    Each field of :class:`Cost` is given as an (intercept, slope) pair.
+    """
+
+    def __init__(self, cpu_seconds=(0., 0.), peak_bytes=(0., 0.),
+                 result_bytes=(0., 0.)):
+        self.coefficients = Cost(tuple(cpu_seconds), tuple(peak_bytes),
+                                 tuple(result_bytes))
+
+    def __call__(self, samples):
+        return Cost(*[intercept + slope * samples
+                      for intercept, slope in self.coefficients])
+
+    def __repr__(self):
+        return 'CostModel(%s)' % ', '.join(
+            '%s=%r' % item for item in self.coefficients._asdict().items())
+
+    @classmethod
+    def fit(cls, samples, costs):
+        """Fit a model on the costs measured for several numbers of samples
+
+        Parameters
+        ----------
+        samples : list of int
+        costs : list of Cost
+        """
+        coefficients = []
+        for values in zip(*costs):
+            slope, intercept = np.polyfit(samples, values, 1)
+            # A negative slope is measurement noise
+            slope = max(float(slope), 0.)
+            intercept = max(float(np.mean(values) -
+                                  slope * np.mean(samples)), 0.)
+            coefficients.append((intercept, slope))
+        return cls(*coefficients)
+
+    def as_dict(self):
+        return OrderedDict((field, list(value)) for field, value
+                           in self.coefficients._asdict().items())
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class PipeEstimate(OrderedDict):
+
+    """Estimated costs of the processors of a pipe, indexed by uuid"""
+
+    def __init__(self, pipe, costs):
+        super(PipeEstimate, self).__init__(costs)
+        self.ids = dict((proc.uuid(), proc.id()) for proc in pipe.processors)
+        self._decoders = set(proc.uuid() for proc in pipe.processors
+                             if proc.type == 'decoder')
+
+    @property
+    def total(self):
+        """Cost of the whole pipe
+
+        All the results are kept until the end of the run, so the peak
+        memory is bounded by the sum of the peaks of the processors.
+        """
+        return Cost(*[sum(values) for values in zip(*self.values())]
+                    or (0., 0, 0))
+
+    @property
+    def uncalibrated(self):
+        "Ids of the non-decoder processors without a calibrated model"
+        return sorted(set(proc_id for uuid, proc_id in self.ids.items()
+                          if uuid in self and proc_id not in COST_MODELS
+                          and uuid not in self._decoders))
+
+    def __str__(self):
+        lines = ['%-36s %12s %14s %14s' %
+                 ('processor', 'cpu_seconds', 'peak_bytes', 'result_bytes')]
+        for uuid, cost in list(self.items()) + [(None, self.total)]:
+            lines.append('%-36s %12.3f %14d %14d' % (
+                self.ids.get(uuid, 'total'), cost.cpu_seconds,
+                cost.peak_bytes, cost.result_bytes))
+        return '\n'.join(lines)
+
+
+def admit(estimate, max_cpu_seconds=None, max_peak_bytes=None):
+    """Check the total cost of a PipeEstimate against the given limits
+
+    The check is skipped, and None returned, if a processor of the pipe has
+    no calibrated model, as its cost would be counted as null.
+
+    Raises
+    ------
+    CostError
+        If a limit is exceeded
+    """
+    if estimate.uncalibrated:
+        return None
+    total = estimate.total
+    for field, limit in (('cpu_seconds', max_cpu_seconds),
+                         ('peak_bytes', max_peak_bytes)):
+        value = getattr(total, field)
+        if limit is not None and value > limit:
+            raise CostError('Estimated %s %d exceeds the limit %d' %
+                            (field, value, limit))
+    return total
+
+
+def load_models(path):
+    """Load the cost models of a calibration file into COST_MODELS"""
+    with open(path) as f:
+        data = json.load(f)
+    COST_MODELS.update((proc_id, CostModel.from_dict(model))
+                       for proc_id, model in data.items())
+    return COST_MODELS
+
+
+def save_models(path, models=None):
+    """Save cost models, default to COST_MODELS, as a calibration file"""
+    if models is None:
+        models = COST_MODELS
+    with open(path, 'w') as f:
+        json.dump(OrderedDict((proc_id, model.as_dict()) for proc_id, model
+                              in sorted(models.items())), f, indent=2)
+
+
+def measure(processor, samples, samplerate=44100):
+    """Measure the cost of a processor on an array of samples
+
+    The run is profiled, and traced by tracemalloc for the peak memory.
+    """
+    from timeside.core import get_processor
+    from timeside.core.tools.profiling import results_size
+
+    decoder = get_processor('array_decoder')(samples, samplerate=samplerate)
+    pipe = decoder | processor
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    origin = tracemalloc.get_traced_memory()[0]
+    try:
+        pipe.run(profile=True)
+        peak = tracemalloc.get_traced_memory()[1] - origin
+    finally:
+        if started:
+            tracemalloc.stop()
+    profile = pipe.profile()[processor.uuid()]
+    results = pipe.results.get(processor.uuid())
+    return Cost(profile.total_time, peak,
+                results_size(results) if results is not None else 0)
+
+
+def calibrate(processor_ids, durations=CALIBRATION_DURATIONS,
+              samplerate=44100, channels=2, register=True):
+    """Fit the cost models of processors from profiled runs
+
+    Each processor runs with its default parameters on white noise of
+    each of the given durations.
+
+    Parameters
+    ----------
+    processor_ids : list of str
+    durations : list of float
+        Durations (in s) of the calibration signals
+    samplerate : int
+    channels : int
+    register : bool
+        If True, the fitted models are added to COST_MODELS
+
+    Returns
+    -------
+    models : dict
+        Cost models indexed by processor id
+    """
+    from timeside.core import get_processor
+
+    models = {}
+    sizes = [int(duration * samplerate) for duration in durations]
+    signals = [0.1 * np.random.randn(size, channels) for size in sizes]
+    for proc_id in processor_ids:
+        costs = [measure(get_processor(proc_id)(), signal, samplerate)
+                 for signal in signals]
+        models[proc_id] = CostModel.fit(
+            [size * channels for size in sizes], costs)
+    if register:
+        COST_MODELS.update(models)
+    return models
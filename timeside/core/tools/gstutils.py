@@ -7,6 +7,7 @@ gi.require_version('GObject', '2.0')
 from gi.repository import GLib, GObject, Gst
 Gst.init(None)
 
+import os
 import threading
 
 
@@ -38,3 +39,69 @@ class MainloopThread(threading.Thread):
 
     def run(self):
         self.mainloop.run()
+
+
+class GstRuntime(object):
+
+    """Process-wide GLib main loop watching the bus of the Gst pipelines
+
+    A single MainloopThread, started with the first registered pipeline,
+    dispatches the bus messages of all the pipelines of the decoders and
+    encoders instead of one loop thread per pipeline.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.context = GLib.MainContext()
+        self.mainloop = GLib.MainLoop(self.context)
+        self.thread = None
+        self._lock = threading.Lock()
+        self._watches = {}
+
+    def register(self, pipeline, callback):
+        """Watch the bus of a pipeline, callback(bus, message) being called
+        from the loop thread for each message"""
+        bus = pipeline.get_bus()
+        # The watch is attached to the thread-default context
+        self.context.push_thread_default()
+        try:
+            bus.add_signal_watch()
+        finally:
+            self.context.pop_thread_default()
+        handler = bus.connect('message', callback)
+        with self._lock:
+            self._watches[pipeline] = (bus, handler)
+            if self.thread is None:
+                self.thread = MainloopThread(self.mainloop)
+                self.thread.name = 'gst_mainloop'
+                self.thread.daemon = True
+                self.thread.start()
+        return bus
+
+    def unregister(self, pipeline):
+        "Stop watching the bus of a pipeline, e.g. on EOS or error"
+        with self._lock:
+            bus, handler = self._watches.pop(pipeline, (None, None))
+        if bus is not None:
+            bus.disconnect(handler)
+            bus.remove_signal_watch()
+
+    def __len__(self):
+        return len(self._watches)
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def gst_runtime():
+    """Return the GstRuntime of the process
+
+    A forked process, e.g. a pipe worker, gets its own runtime as the loop
+    thread of its parent does not exist in it.
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None or _runtime.pid != os.getpid():
+            _runtime = GstRuntime()
+        return _runtime
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of TimeSide.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    On-disk cache of the media discovery results
+
+    Each entry is a JSON file holding the duration and the audio streams
+    discovered in a media, keyed by its path, size and modification time
+    for a local file or by its sha1.
+
+    The cache used by get_media_uri_info is configured with
+    :func:`set_media_info_cache` or with the TIMESIDE_MEDIA_INFO_CACHE_DIR
+    environment variable.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+from urllib.parse import urlparse, unquote
+
+_cache = None
+_cache_configured = False
+
+
+class MediaInfoCache(object):
+
+    """Media discovery cache stored in a directory
+
+    Parameters
+    ----------
+    path : str
+        Directory of the cache, created if needed
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    @staticmethod
+    def key(uri, sha1=None):
+        """Return the key of a media, None if it can not be identified
+
+        Local files are identified by their path, size and modification
+        time, remote media by their sha1 if given.
+        """
+        parsed = urlparse(uri)
+        if parsed.scheme in ('', 'file'):
+            path = os.path.abspath(unquote(parsed.path))
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            params = ['file', path, stat.st_size, stat.st_mtime_ns]
+        elif sha1:
+            if isinstance(sha1, bytes):
+                sha1 = sha1.decode('utf8')
+            params = ['sha1', sha1]
+        else:
+            return None
+        return hashlib.sha1(json.dumps(params).encode('utf8')).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.json')
+
+    def get(self, key):
+        "Return the cached info of a media or None if not in cache"
+        try:
+            with open(self._file(key)) as f:
+                info = json.load(f)
+        except (IOError, OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return info
+
+    def set(self, key, info):
+        tmp = os.path.join(self.path, '.%s.tmp' % uuid.uuid4().hex)
+        with open(tmp, 'w') as f:
+            json.dump(info, f)
+        os.rename(tmp, self._file(key))
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.path, name))
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / requests if requests else 0.,
+                'entries': len([name for name in os.listdir(self.path)
+                                if name.endswith('.json')])}
+
+
+def set_media_info_cache(cache):
+    """Set the MediaInfoCache used by get_media_uri_info, None to disable
+    it"""
+    global _cache, _cache_configured
+    _cache = cache
+    _cache_configured = True
+
+
+def get_media_info_cache():
+    """Return the MediaInfoCache used by get_media_uri_info or None
+
+    Unless set with set_media_info_cache, the cache is configured from the
+    TIMESIDE_MEDIA_INFO_CACHE_DIR environment variable and disabled if it
+    is not set.
+    """
+    global _cache, _cache_configured
+    if not _cache_configured:
+        path = os.environ.get('TIMESIDE_MEDIA_INFO_CACHE_DIR')
+        if path:
+            _cache = MediaInfoCache(path)
+        _cache_configured = True
+    return _cache
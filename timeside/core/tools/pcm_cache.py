@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of TimeSide.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    On-disk cache of decoded audio
+
+    Each entry is a raw float32 file holding the interleaved decoded frames
+    and a JSON sidecar with the stream properties. Entries are read back
+    through numpy.memmap and evicted in least recently used order once the
+    cache exceeds its size limit.
+
+    The cache used by the decoders is configured with :func:`set_pcm_cache`
+    or with the TIMESIDE_PCM_CACHE_DIR and TIMESIDE_PCM_CACHE_MAX_BYTES
+    environment variables.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+
+DATA_SUFFIX = '.f32'
+META_SUFFIX = '.json'
+TMP_SUFFIX = '.tmp'
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+
+_cache = None
+_cache_configured = False
+
+
+class PCMCache(object):
+
+    """Decoded audio cache stored in a directory
+
+    Parameters
+    ----------
+    path : str
+        Directory of the cache, created if needed
+    max_bytes : int, optional
+        Maximum total size of the cached audio data
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    @staticmethod
+    def key(sha1, samplerate=None, channels=None, start=0, duration=None):
+        "Return the key of a decoded stream"
+        if isinstance(sha1, bytes):
+            sha1 = sha1.decode('utf8')
+        params = json.dumps([sha1, samplerate, channels, float(start or 0),
+                             duration and float(duration)])
+        return hashlib.sha1(params.encode('utf8')).hexdigest()
+
+    def _file(self, key, suffix):
+        return os.path.join(self.path, key + suffix)
+
+    def get(self, key):
+        """Return the cached frames and properties of a stream
+
+        Returns
+        -------
+        (frames, meta) : (numpy.memmap, dict) or None if not in cache
+        """
+        try:
+            with open(self._file(key, META_SUFFIX)) as f:
+                meta = json.load(f)
+            shape = (meta['frames'], meta['channels'])
+            if meta['frames']:
+                frames = np.memmap(self._file(key, DATA_SUFFIX),
+                                   dtype='<f4', mode='r', shape=shape)
+            else:
+                frames = np.zeros(shape, dtype='<f4')
+        except (IOError, OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        # The sidecar time is the last access time of the entry
+        os.utime(self._file(key, META_SUFFIX), None)
+        with self._lock:
+            self.hits += 1
+        return frames, meta
+
+    def writer(self, key):
+        "Return a PCMCacheWriter to store a stream under key"
+        return PCMCacheWriter(self, key)
+
+    def entries(self):
+        "Return the (key, bytes, last access time) of the cached streams"
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(META_SUFFIX):
+                continue
+            key = name[:-len(META_SUFFIX)]
+            try:
+                size = os.path.getsize(self._file(key, DATA_SUFFIX))
+                atime = os.path.getmtime(self._file(key, META_SUFFIX))
+            except OSError:
+                continue
+            entries.append((key, size, atime))
+        return entries
+
+    def remove(self, key):
+        for suffix in (META_SUFFIX, DATA_SUFFIX):
+            try:
+                os.remove(self._file(key, suffix))
+            except OSError:
+                pass
+
+    def evict(self):
+        "Remove the least recently used streams above the size limit"
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(entry[1] for entry in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(key)
+            total -= size
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            self.remove(key)
+
+    def stats(self):
+        entries = self.entries()
+        requests = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / requests if requests else 0.,
+                'entries': len(entries),
+                'bytes': sum(entry[1] for entry in entries),
+                'max_bytes': self.max_bytes}
+
+
+class PCMCacheWriter(object):
+
+    """Store the blocks of a decoded stream in a PCMCache
+
+    The entry only becomes visible once committed.
+    """
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.frames = 0
+        self.channels = None
+        self._tmp = cache._file(key, '.%s%s' % (uuid.uuid4().hex, TMP_SUFFIX))
+        self._file = open(self._tmp, 'wb')
+
+    def append(self, frames):
+        if frames is None or not len(frames):
+            return
+        frames = np.asarray(frames, dtype='<f4')
+        if frames.ndim == 1:
+            frames = frames[:, np.newaxis]
+        self.channels = frames.shape[1]
+        self._file.write(frames.tobytes())
+        self.frames += len(frames)
+
+    def commit(self, meta):
+        "Publish the entry with the stream properties in meta"
+        self._file.close()
+        meta = dict(meta, frames=self.frames)
+        if self.channels is not None:
+            meta['channels'] = self.channels
+        os.rename(self._tmp, self.cache._file(self.key, DATA_SUFFIX))
+        with open(self.cache._file(self.key, META_SUFFIX), 'w') as f:
+            # numpy scalars are stored as python numbers
+            json.dump(meta, f, default=lambda value: value.item())
+        self.cache.evict()
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+
+def set_pcm_cache(cache):
+    """Set the PCMCache used by the decoders, None to disable it"""
+    global _cache, _cache_configured
+    _cache = cache
+    _cache_configured = True
+
+
+def get_pcm_cache():
+    """Return the PCMCache used by the decoders or None
+
+    Unless set with set_pcm_cache, the cache is configured from the
+    TIMESIDE_PCM_CACHE_DIR and TIMESIDE_PCM_CACHE_MAX_BYTES environment
+    variables and disabled if the former is not set.
+    """
+    global _cache, _cache_configured
+    if not _cache_configured:
+        path = os.environ.get('TIMESIDE_PCM_CACHE_DIR')
+        if path:
+            max_bytes = os.environ.get('TIMESIDE_PCM_CACHE_MAX_BYTES',
+                                       DEFAULT_MAX_BYTES)
+            _cache = PCMCache(path, max_bytes=int(max_bytes))
+        _cache_configured = True
+    return _cache
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of TimeSide.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Read-ahead of the source blocks of a pipe
+"""
+
+import threading
+
+try:
+    from queue import Queue, Full
+except ImportError:  # py2
+    from Queue import Queue, Full
+
+# Period (s) at which a blocked producer checks if it has been stopped
+STOP_POLL = 0.1
+
+
+class Prefetcher(threading.Thread):
+
+    """Call a block reader ahead of the consumer in a background thread
+
+    Parameters
+    ----------
+    read : callable
+        Return the next `(frames, eod)` block
+    depth : int
+        Maximum number of blocks read ahead
+    """
+
+    def __init__(self, read, depth):
+        super(Prefetcher, self).__init__(name='pipe_prefetch')
+        self.daemon = True
+        self.read = read
+        self.depth = max(1, int(depth))
+        self.queue = Queue(maxsize=self.depth)
+        self._stopped = threading.Event()
+        # Queue size seen by the consumer at each block
+        self.occupancy = [0] * (self.depth + 1)
+        # Blocks the consumer had to wait for (decoding is the bottleneck)
+        self.underruns = 0
+        # Blocks the producer had to wait to queue (analysis is the bottleneck)
+        self.overruns = 0
+
+    def run(self):
+        eod = False
+        try:
+            while not eod and not self._stopped.is_set():
+                frames, eod = self.read()
+                self._put((frames, eod, None))
+        except Exception as error:
+            self._put((None, True, error))
+
+    def _put(self, block):
+        if self.queue.full():
+            self.overruns += 1
+        while not self._stopped.is_set():
+            try:
+                self.queue.put(block, timeout=STOP_POLL)
+                return
+            except Full:
+                pass
+
+    def get(self):
+        "Return the next block, waiting for it if needed"
+        size = min(self.queue.qsize(), self.depth)
+        self.occupancy[size] += 1
+        if not size:
+            self.underruns += 1
+        frames, eod, error = self.queue.get()
+        if error is not None:
+            raise error
+        return frames, eod
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+
+    def stats(self):
+        "Return the occupancy statistics of the queue"
+        blocks = sum(self.occupancy)
+        mean = (sum(size * count for size, count in enumerate(self.occupancy))
+                / float(blocks)) if blocks else 0.
+        return {'depth': self.depth,
+                'blocks': blocks,
+                'mean_occupancy': mean,
+                'max_occupancy': max([size for size, count
+                                      in enumerate(self.occupancy) if count]
+                                     or [0]),
+                'occupancy_histogram': list(self.occupancy),
+                'underruns': self.underruns,
+                'overruns': self.overruns}
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of TimeSide.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Per processor profiling of a ProcessPipe run
+"""
+
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+PROFILED_METHODS = ('setup', 'process', 'post_process', 'release')
+# Upper bounds (in µs) of the block latency histogram bins, the last bin
+# gathering everything above
+LATENCY_BINS = [10 * 2 ** n for n in range(16)]
+# Maximum number of trace events kept per processor
+MAX_TRACE_EVENTS = 100000
+
+
+def results_size(results):
+    "Return the size in bytes of the data of an AnalyzerResultContainer"
+    size = 0
+    for result in results.values():
+        for value in result.data_object.values():
+            size += getattr(value, 'nbytes', 0)
+    return size
+
+
+class ProcessorProfile(object):
+
+    """Timing and memory statistics of a processor"""
+
+    def __init__(self, processor):
+        self.uuid = processor.uuid()
+        self.id = processor.id()
+        self.type = processor.type
+        self.time = OrderedDict((method, 0.) for method in PROFILED_METHODS)
+        self.blocks = 0
+        self.frames_bytes = 0
+        self.peak_result_bytes = 0
+        self.latency_histogram = [0] * (len(LATENCY_BINS) + 1)
+        self.events = []
+
+    def add(self, method, start, duration, frames=None):
+        self.time[method] += duration
+        if method == 'process':
+            self.blocks += 1
+            if frames is not None:
+                self.frames_bytes += getattr(frames, 'nbytes', 0)
+            index = np.searchsorted(LATENCY_BINS, duration * 1e6)
+            self.latency_histogram[index] += 1
+        if len(self.events) < MAX_TRACE_EVENTS:
+            self.events.append((method, start, duration,
+                                threading.current_thread().ident))
+
+    @property
+    def total_time(self):
+        return sum(self.time.values())
+
+    def as_dict(self):
+        return OrderedDict([
+            ('uuid', self.uuid),
+            ('id', self.id),
+            ('type', self.type),
+            ('time', OrderedDict(self.time)),
+            ('total_time', self.total_time),
+            ('blocks', self.blocks),
+            ('frames_bytes', self.frames_bytes),
+            ('peak_result_bytes', self.peak_result_bytes),
+            ('latency_histogram', OrderedDict(
+                zip([str(bound) for bound in LATENCY_BINS] + ['inf'],
+                    self.latency_histogram)))])
+
+
+class PipeProfile(OrderedDict):
+
+    """Profiles of the processors of a pipe, indexed by processor uuid"""
+
+    def __init__(self, pipe):
+        super(PipeProfile, self).__init__()
+        self.pipe = pipe
+        self.origin = time.perf_counter()
+        for proc in pipe.processors:
+            self[proc.uuid()] = ProcessorProfile(proc)
+
+    def call(self, proc, method, *args, **kwargs):
+        "Call a method of a processor and record its duration"
+        start = time.perf_counter()
+        result = None
+        try:
+            result = getattr(proc, method)(*args, **kwargs)
+            return result
+        finally:
+            frames = None
+            if method == 'process':
+                # Frames seen by a processor, produced by a decoder
+                frames = args[0] if args else result and result[0]
+            profile = self[proc.uuid()]
+            profile.add(method, start - self.origin,
+                        time.perf_counter() - start, frames)
+            if method in ('post_process', 'release'):
+                results = self.pipe.results.get(proc.uuid())
+                if results is not None:
+                    profile.peak_result_bytes = max(
+                        profile.peak_result_bytes, results_size(results))
+
+    def as_dict(self):
+        return [profile.as_dict() for profile in self.values()]
+
+    def __str__(self):
+        lines = ['%-36s %10s %10s %10s %10s %8s' %
+                 ('processor', 'setup', 'process', 'post_proc', 'release',
+                  'blocks')]
+        for profile in sorted(self.values(), key=lambda p: p.total_time,
+                              reverse=True):
+            lines.append('%-36s %10.4f %10.4f %10.4f %10.4f %8d' % (
+                profile.id, profile.time['setup'], profile.time['process'],
+                profile.time['post_process'], profile.time['release'],
+                profile.blocks))
+        return '\n'.join(lines)
+
+    def to_chrome_trace(self, output_file=None):
+        """Export the recorded calls in the Chrome trace event format
+
+        The result can be loaded in chrome://tracing or Perfetto.
+
+        Parameters
+        ----------
+        output_file : str, optional
+            If given, the trace is written to this file
+
+        Returns
+        -------
+        trace : dict
+        """
+        pid = os.getpid()
+        events = []
+        for profile in self.values():
+            for (method, start, duration, tid) in profile.events:
+                events.append({'name': profile.id,
+                               'cat': method,
+                               'ph': 'X',
+                               'ts': start * 1e6,
+                               'dur': duration * 1e6,
+                               'pid': pid,
+                               'tid': tid,
+                               'args': {'uuid': profile.uuid,
+                                        'method': method}})
+        trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if output_file:
+            with open(output_file, 'w') as f:
+                json.dump(trace, f)
+        return trace
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of TimeSide.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Cache of the sha1 of media files
+
+    The sha1 of a file is keyed by its device, inode, size and modification
+    time, so that it is computed again once the file is modified. It is
+    memoised in the process and stored in an extended attribute of the file
+    or, where those are not supported, in a sidecar JSON file of the
+    directory given by :func:`set_sha1_cache` or by the
+    TIMESIDE_SHA1_CACHE_DIR environment variable.
+
+    :class:`Sha1Tee` computes the sha1 of a file from the chunks read by a
+    decoder, so that the file is not read twice.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+XATTR = 'user.timeside.sha1'
+
+_cache = None
+_cache_configured = False
+
+
+def file_key(filename):
+    "Return the (device, inode, size, mtime) key of a file, None if missing"
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return [stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+class Sha1Cache(object):
+
+    """Sha1 cache of the media files
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory of the sidecar files, created if needed, used when the
+        extended attributes are not supported
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._memo = {}
+        self._lock = threading.Lock()
+        if path and not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _sidecar(self, key):
+        name = hashlib.sha1(json.dumps(key).encode('utf8')).hexdigest()
+        return os.path.join(self.path, name + '.json')
+
+    def _load(self, filename, key):
+        if hasattr(os, 'getxattr'):
+            try:
+                entry = json.loads(os.getxattr(filename, XATTR).decode('utf8'))
+                if entry[:-1] == key:
+                    return entry[-1]
+            except (OSError, ValueError):
+                pass
+        if self.path:
+            try:
+                with open(self._sidecar(key)) as f:
+                    return json.load(f)
+            except (IOError, OSError, ValueError):
+                pass
+        return None
+
+    def get(self, filename):
+        "Return the cached sha1 of a file or None if not in cache"
+        key = file_key(filename)
+        sha1 = None
+        if key is not None:
+            sha1 = self._memo.get(tuple(key))
+            if sha1 is None:
+                sha1 = self._load(filename, key)
+                if sha1 is not None:
+                    self._memo[tuple(key)] = sha1
+        with self._lock:
+            if sha1 is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return sha1
+
+    def set(self, filename, sha1, key=None):
+        """Cache the sha1 of a file
+
+        The key of the file when it was read can be given, the sha1 is then
+        not cached if the file was modified since.
+        """
+        if isinstance(sha1, bytes):
+            sha1 = sha1.decode('utf8')
+        current = file_key(filename)
+        if current is None or (key is not None and key != current):
+            return
+        self._memo[tuple(current)] = sha1
+        try:
+            os.setxattr(filename, XATTR,
+                        json.dumps(current + [sha1]).encode('utf8'))
+            return
+        except (AttributeError, OSError):
+            # Not supported by the platform or filesystem, or read-only
+            pass
+        if self.path:
+            tmp = os.path.join(self.path, '.%s.tmp' % uuid.uuid4().hex)
+            with open(tmp, 'w') as f:
+                json.dump(sha1, f)
+            os.rename(tmp, self._sidecar(current))
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / requests if requests else 0.}
+
+
+class Sha1Tee(object):
+
+    """Sha1 of a file computed from the chunks read by a decoder
+
+    The chunks may be read in any order, e.g. by a demuxer probing the end
+    of the file: only the ones continuing the hashed part are hashed and the
+    sha1 is known once the file has been read up to its end.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the file read
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> f = tempfile.NamedTemporaryFile()
+    >>> _ = f.write(b'0123456789'); f.flush()
+    >>> tee = Sha1Tee(f.name)
+    >>> tee.update(6, b'6789')
+    >>> tee.update(0, b'012345')
+    >>> tee.hexdigest() is None
+    True
+    >>> tee.update(4, b'456789')
+    >>> tee.hexdigest() == hashlib.sha1(b'0123456789').hexdigest()
+    True
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.key = file_key(filename)
+        self.size = self.key[2] if self.key else None
+        self.position = 0
+        self._sha1 = hashlib.sha1()
+
+    def update(self, offset, data):
+        "Hash the part of a chunk read at offset continuing the hashed part"
+        end = offset + len(data)
+        if offset <= self.position < end:
+            self._sha1.update(memoryview(data)[self.position - offset:])
+            self.position = end
+
+    @property
+    def complete(self):
+        return self.size is not None and self.position == self.size
+
+    def hexdigest(self):
+        "Return the sha1 of the file or None if it was not read to its end"
+        if not self.complete:
+            return None
+        return self._sha1.hexdigest()
+
+
+def set_sha1_cache(cache):
+    "Set the Sha1Cache used by get_sha1"
+    global _cache, _cache_configured
+    _cache = cache
+    _cache_configured = True
+
+
+def get_sha1_cache():
+    """Return the Sha1Cache used by get_sha1
+
+    Unless set with set_sha1_cache, the cache is configured from the
+    TIMESIDE_SHA1_CACHE_DIR environment variable for its sidecar files.
+    """
+    global _cache, _cache_configured
+    if not _cache_configured:
+        _cache = Sha1Cache(os.environ.get('TIMESIDE_SHA1_CACHE_DIR'))
+        _cache_configured = True
+    return _cache
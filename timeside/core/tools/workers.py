@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of TimeSide.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Process based execution of pipe branches
+
+    The decoded blocks are written once into a ring buffer living in shared
+    memory and every worker process reads them back as read-only views.
+    Blocks that do not fit in the ring (unexpected size or dtype) are sent
+    through the task queue instead.
+"""
+
+import multiprocessing
+import traceback
+
+import numpy as np
+
+from ..exceptions import Error
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
+
+# Number of blocks a worker can lag behind the source
+RING_SLOTS = 8
+# Polling period (s) when waiting on a worker, to detect its death
+WORKER_POLL = 1.
+
+
+class FrameRing(object):
+
+    """Ring buffer of fixed size frame blocks in shared memory"""
+
+    def __init__(self, slots, blocksize, channels, dtype='float32'):
+        if shared_memory is None:
+            raise Error('Shared memory requires Python >= 3.8')
+        self.slots = slots
+        self.blocksize = blocksize
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        nbytes = slots * blocksize * channels * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True,
+                                               size=max(nbytes, 1))
+        self.array = np.ndarray((slots, blocksize, channels),
+                                dtype=self.dtype, buffer=self._shm.buf)
+        self._index = 0
+
+    def fits(self, frames):
+        return (frames.dtype == self.dtype and frames.ndim == 2 and
+                frames.shape[0] <= self.blocksize and
+                frames.shape[1] == self.channels)
+
+    def write(self, frames):
+        "Copy frames in the next slot and return its index"
+        slot = self._index % self.slots
+        self.array[slot, :len(frames)] = frames
+        self._index += 1
+        return slot
+
+    def view(self, slot, length):
+        "Return a read-only view on the first length frames of a slot"
+        frames = self.array[slot, :length]
+        frames.flags.writeable = False
+        return frames
+
+    def close(self, unlink=False):
+        if self._shm is None:
+            return
+        del self.array
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+        self._shm = None
+
+
+class BranchWorker(object):
+
+    """Run a list of processors of a pipe in a forked process
+
+    The processors are fed with the blocks dispatched by the parent, then
+    post-processed, and their results are sent back to the parent.
+    """
+
+    def __init__(self, context, pipe, items, ring):
+        self.pipe = pipe
+        self.items = items
+        self.ring = ring
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        # One credit per free ring slot, taken by the parent for each block
+        # and given back by the worker once the block is processed
+        self.credits = context.Semaphore(ring.slots)
+        self.process = context.Process(target=self._run,
+                                       name='pipe_branch_worker')
+        self.process.daemon = True
+
+    def start(self):
+        self.process.start()
+
+    def _run(self):
+        # The subscribers of the pipe live in the parent process
+        self.pipe._subscribers = []
+        try:
+            eod = False
+            while not eod:
+                kind, payload, eod = self.tasks.get()
+                if kind == 'slot':
+                    frames = self.ring.view(*payload)
+                else:
+                    frames = payload
+                self.pipe._block_index += 1
+                for item in self.items:
+                    item.process(frames, eod)
+                self.credits.release()
+
+            for item in self.items:
+                item.post_process()
+
+            self.results.put(('results',
+                              {item.uuid(): self.pipe.results[item.uuid()]
+                               for item in self.items
+                               if item.uuid() in self.pipe.results}))
+        except Exception:
+            self.results.put(('error', traceback.format_exc()))
+
+    def acquire(self):
+        "Wait for a free slot in the ring buffer"
+        while not self.credits.acquire(timeout=WORKER_POLL):
+            if not self.process.is_alive():
+                # Raise the worker error if any
+                self.join()
+                raise Error('Pipe worker ended before the end of data')
+
+    def send(self, message):
+        self.tasks.put(message)
+
+    def join(self):
+        "Wait for the worker to end and return its results"
+        message = []
+
+        def get():
+            try:
+                message.append(self.results.get(timeout=WORKER_POLL))
+            except Exception:
+                if not self.process.is_alive() and self.results.empty():
+                    raise Error('Pipe worker %s died with exit code %s'
+                                % (self.process.pid, self.process.exitcode))
+                return False
+            return True
+
+        while not get():
+            pass
+        self.process.join()
+
+        kind, payload = message[0]
+        if kind == 'error':
+            raise Error('Pipe worker failed:\n%s' % payload)
+        return payload
+
+
+class BranchPool(object):
+
+    """Dispatch the blocks of a pipe to a pool of BranchWorker
+
+    Parameters
+    ----------
+    pipe : ProcessPipe
+    groups : list of list of Processor
+        Groups of processors that must run in the same process
+    workers : int
+        Maximum number of worker processes
+    blocksize, channels : int
+        Shape of the source blocks
+    """
+
+    def __init__(self, pipe, groups, workers, blocksize, channels,
+                 slots=RING_SLOTS):
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            raise Error('The process backend requires the fork start method')
+
+        # Balance the groups over the workers, biggest groups first
+        workers = max(1, min(workers, len(groups)))
+        loads = [[] for _ in range(workers)]
+        for group in sorted(groups, key=len, reverse=True):
+            min(loads, key=len).extend(group)
+        # Keep the pipe order inside each worker (parents before children)
+        order = {proc.uuid(): index
+                 for index, proc in enumerate(pipe.processors)}
+        loads = [sorted(load, key=lambda proc: order[proc.uuid()])
+                 for load in loads if load]
+
+        self.ring = FrameRing(slots, blocksize or 1, channels or 1)
+        self.workers = [BranchWorker(context, pipe, load, self.ring)
+                        for load in loads]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def dispatch(self, frames, eod):
+        for worker in self.workers:
+            worker.acquire()
+        if self.ring.fits(frames):
+            slot = self.ring.write(frames)
+            message = ('slot', (slot, len(frames)), eod)
+        else:
+            message = ('frames', frames, eod)
+        for worker in self.workers:
+            worker.send(message)
+
+    def join(self):
+        "Wait for all workers and return their merged results"
+        results = {}
+        for worker in self.workers:
+            results.update(worker.join())
+        return results
+
+    def close(self):
+        for worker in self.workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self.ring.close(unlink=True)
@@ -20,7 +20,7 @@
 # Author: Guillaume Pellerin <yomguy@parisson.com>
 
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator, merge_results
 from timeside.core.api import IValueAnalyzer
 import numpy
 
@@ -37,7 +37,8 @@ class MeanDCShift(Analyzer):
               totalframes=None):
         super(MeanDCShift, self).setup(
             channels, samplerate, blocksize, totalframes)
-        self.values = numpy.array([0])
+        self.values = FrameAccumulator.for_analyzer(self, shape=(),
+                                                    dtype=numpy.float64)
 
     @staticmethod
     @interfacedoc
@@ -61,11 +62,26 @@ class MeanDCShift(Analyzer):
 
     def process(self, frames, eod=False):
         if frames.size:
-            self.values = numpy.append(self.values, numpy.mean(frames))
+            self.values.append(numpy.mean(frames))
         return frames, eod
 
     def post_process(self):
         dc_result = self.new_result(data_mode='value', time_mode='global')
-        dc_result.data_object.value = numpy.round(
-            numpy.mean(100 * self.values), 3)
+        dc_result.data_object.value = self._value(*self.segment_state())
         self.add_result(dc_result)
+
+    def segment_state(self):
+        "Return the sum and the number of the block means"
+        return numpy.sum(self.values.data), len(self.values.data)
+
+    @staticmethod
+    def _value(total, count):
+        if not count:
+            return 0.
+        return numpy.round(100 * total / count, 3)
+
+    def merge(self, results, overlaps, states):
+        value = self._value(sum(total for total, _ in states),
+                            sum(count for _, count in states))
+        return merge_results(results, overlaps,
+                             lambda result_id, values, weights: value)
@@ -24,7 +24,7 @@
 from __future__ import absolute_import
 
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator
 from timeside.core.api import IAnalyzer
 from timeside.core.preprocessors import downmix_to_mono, frames_adapter
 from aubio import filterbank, pvoc
@@ -46,7 +46,6 @@ class AubioMelEnergy(Analyzer):
         self.pvoc = pvoc(self.input_blocksize, self.input_stepsize)
         self.melenergy = filterbank(self.n_filters, self.input_blocksize)
         self.block_read = 0
-        self.melenergy_results = []
 
     @interfacedoc
     def setup(self, channels=None, samplerate=None,
@@ -55,6 +54,13 @@ class AubioMelEnergy(Analyzer):
                                           blocksize, totalframes)
 
         self.melenergy.set_mel_coeffs_slaney(samplerate)
+        self.melenergy_results = FrameAccumulator.for_analyzer(
+            self, shape=(self.n_filters,))
+
+    def reset(self):
+        super(AubioMelEnergy, self).reset()
+        self.pvoc = pvoc(self.input_blocksize, self.input_stepsize)
+        self.block_read = 0
 
     @staticmethod
     @interfacedoc
@@ -95,5 +101,5 @@ class AubioMelEnergy(Analyzer):
         melenergy = self.new_result(data_mode='value', time_mode='framewise')
         melenergy.parameters = dict(n_filters=self.n_filters,
                                     n_coeffs=self.n_coeffs)
-        melenergy.data_object.value = self.melenergy_results
+        melenergy.data_object.value = self.melenergy_results.data
         self.add_result(melenergy)
@@ -24,7 +24,7 @@
 from __future__ import absolute_import
 
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator
 from timeside.core.api import IAnalyzer
 from timeside.core.preprocessors import downmix_to_mono, frames_adapter
 
@@ -48,7 +48,6 @@ class AubioMfcc(Analyzer):
         self.pvoc = pvoc(self.input_blocksize, self.input_stepsize)
         self.mfcc = None
         self.block_read = 0
-        self.mfcc_results = np.zeros([self.n_coeffs, ])
 
     @interfacedoc
     def setup(self, channels=None, samplerate=None,
@@ -60,6 +59,14 @@ class AubioMfcc(Analyzer):
                          self.n_filters,
                          self.n_coeffs,
                          samplerate)
+        self.mfcc_results = FrameAccumulator.for_analyzer(
+            self, shape=(self.n_coeffs,), dtype=np.float64)
+        self.mfcc_results.append(np.zeros([self.n_coeffs, ]))
+
+    def reset(self):
+        super(AubioMfcc, self).reset()
+        self.pvoc = pvoc(self.input_blocksize, self.input_stepsize)
+        self.block_read = 0
 
     @staticmethod
     @interfacedoc
@@ -93,7 +100,7 @@ class AubioMfcc(Analyzer):
 
         fftgrain = self.pvoc(frames)
         coeffs = self.mfcc(fftgrain)
-        self.mfcc_results = np.nan_to_num(np.vstack((self.mfcc_results, coeffs)))
+        self.mfcc_results.append(np.nan_to_num(coeffs))
         self.block_read += 1
         return frames, eod
 
@@ -101,5 +108,5 @@ class AubioMfcc(Analyzer):
         mfcc_res = self.new_result(data_mode='value', time_mode='framewise')
         mfcc_res.parameters = dict(n_filters=self.n_filters,
                                    n_coeffs=self.n_coeffs)
-        mfcc_res.data_object.value = self.mfcc_results
+        mfcc_res.data_object.value = self.mfcc_results.data
         self.add_result(mfcc_res)
@@ -25,7 +25,7 @@
 from __future__ import absolute_import
 
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator
 from timeside.core.api import IAnalyzer
 from timeside.core.preprocessors import downmix_to_mono, frames_adapter
 from aubio import pitch as aubio_pitch
@@ -63,8 +63,6 @@ class AubioPitch(Analyzer):
         # Aubio Pitch Initialisation
         self.aubio_pitch = None
         self.block_read = 0
-        self.pitches = []
-        self.pitch_confidences = []
 
     @interfacedoc
     def setup(self, channels=None, samplerate=None,
@@ -90,6 +88,12 @@ class AubioPitch(Analyzer):
         self.aubio_pitch = aubio_pitch("default", self.input_blocksize,
                                        self.input_stepsize, samplerate)
         self.aubio_pitch.set_unit("freq")
+        self.pitches = FrameAccumulator.for_analyzer(self, shape=())
+        self.pitch_confidences = FrameAccumulator.for_analyzer(self, shape=())
+
+    def reset(self):
+        super(AubioPitch, self).reset()
+        self.block_read = 0
 
     @staticmethod
     @interfacedoc
@@ -126,8 +130,8 @@ class AubioPitch(Analyzer):
         #           of length stepsize.
         #           This is achieve through  @frames_adapter that handles Aubio Analyzer specifically (blocksize=stepsize).
 
-        self.pitches += [self.aubio_pitch(frames)[0]]
-        self.pitch_confidences += [self.aubio_pitch.get_confidence()]
+        self.pitches.append(self.aubio_pitch(frames)[0])
+        self.pitch_confidences.append(self.aubio_pitch.get_confidence())
         self.block_read += 1
         return frames, eod
 
@@ -140,7 +144,7 @@ class AubioPitch(Analyzer):
         pitch.id_metadata.id += '.' + "pitch"
         pitch.id_metadata.name += ' ' + "pitch"
         pitch.id_metadata.unit = "Hz"
-        pitch.data_object.value = self.pitches
+        pitch.data_object.value = self.pitches.data
         self.add_result(pitch)
 
         pitch_confidence = self.new_result(
@@ -148,7 +152,7 @@ class AubioPitch(Analyzer):
         pitch_confidence.id_metadata.id += '.' + "pitch_confidence"
         pitch_confidence.id_metadata.name += ' ' + "pitch confidence"
         pitch_confidence.id_metadata.unit = None
-        pitch_confidence.data_object.value = self.pitch_confidences
+        pitch_confidence.data_object.value = self.pitch_confidences.data
         self.add_result(pitch_confidence)
 
 
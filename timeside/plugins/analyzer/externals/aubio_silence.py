@@ -23,7 +23,7 @@
 from __future__ import absolute_import
 
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator
 from timeside.core.api import IAnalyzer
 from timeside.core.preprocessors import downmix_to_mono, frames_adapter
 from timeside.core.tools.parameters import Float, HasTraits
@@ -50,7 +50,6 @@ class AubioSilence(Analyzer):
         self.input_blocksize = 1024
         self.input_stepsize = 1024
         self.threshold = threshold
-        self.silence = []
 
     @interfacedoc
     def setup(self,
@@ -60,6 +59,8 @@ class AubioSilence(Analyzer):
               totalframes=None):
         super(AubioSilence, self).setup(channels, samplerate,
                                         blocksize, totalframes)
+        self.silence = FrameAccumulator.for_analyzer(self, shape=(),
+                                                     dtype=int)
 
     @staticmethod
     @interfacedoc
@@ -92,7 +93,7 @@ class AubioSilence(Analyzer):
         silence = self.new_result(data_mode='label', time_mode='segment')
         silence.data_object.time = (np.arange(0, len(self.silence) * self.input_stepsize,
                                               self.input_stepsize) / self.input_samplerate)
-        silence.data_object.label = np.array(self.silence, dtype=int)
+        silence.data_object.label = self.silence.data
         duration = self.input_blocksize / float(self.input_samplerate)
         silence.data_object.duration = np.ones(silence.data_object.label.shape) * duration
         silence.data_object.label_metadata.label = {0: 'Silence', 1: 'Not Silence'}
@@ -24,7 +24,7 @@
 from __future__ import absolute_import
 
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator
 from timeside.core.api import IAnalyzer
 from timeside.core.preprocessors import downmix_to_mono, frames_adapter
 
@@ -52,7 +52,6 @@ class AubioSpecdesc(Analyzer):
         self.specdesc_results = {}
         for method in self.methods:
             self.specdesc[method] = specdesc(method, self.input_blocksize)
-            self.specdesc_results[method] = []
 
     @interfacedoc
     def setup(self, channels=None, samplerate=None,
@@ -61,6 +60,16 @@ class AubioSpecdesc(Analyzer):
                                          samplerate,
                                          blocksize,
                                          totalframes)
+        for method in self.methods:
+            self.specdesc_results[method] = FrameAccumulator.for_analyzer(
+                self, shape=())
+
+    def reset(self):
+        super(AubioSpecdesc, self).reset()
+        self.block_read = 0
+        self.pvoc = pvoc(self.input_blocksize, self.input_stepsize)
+        for method in self.methods:
+            self.specdesc[method] = specdesc(method, self.input_blocksize)
 
     @staticmethod
     @interfacedoc
@@ -94,8 +103,8 @@ class AubioSpecdesc(Analyzer):
 
         fftgrain = self.pvoc(frames)
         for method in self.methods:
-            self.specdesc_results[method] += [
-                self.specdesc[method](fftgrain)[0]]
+            self.specdesc_results[method].append(
+                self.specdesc[method](fftgrain)[0])
         return frames, eod
 
     def post_process(self):
@@ -107,6 +116,6 @@ class AubioSpecdesc(Analyzer):
             # Set metadata
             res_specdesc.id_metadata.id += '.' + method
             res_specdesc.id_metadata.name = ' ' + method
-            res_specdesc.data_object.value = self.specdesc_results[method]
+            res_specdesc.data_object.value = self.specdesc_results[method].data
 
             self.add_result(res_specdesc)
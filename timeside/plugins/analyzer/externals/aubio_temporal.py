@@ -63,6 +63,13 @@ class AubioTemporal(Analyzer):
         self.t = tempo("default", self.input_blocksize,
                        self.input_stepsize, samplerate)
 
+    def reset(self):
+        super(AubioTemporal, self).reset()
+        self.block_read = 0
+        self.onsets = []
+        self.beats = []
+        self.beat_confidences = []
+
     @staticmethod
     @interfacedoc
     def id():
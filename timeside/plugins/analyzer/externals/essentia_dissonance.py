@@ -20,7 +20,7 @@
 # Author: Thomas Fillon <thomas@parisson.com>
 
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator
 from timeside.core.api import IAnalyzer
 from timeside.core.tools.parameters import HasTraits, Int
 from timeside.core.preprocessors import downmix_to_mono, frames_adapter
@@ -64,8 +64,6 @@ class Essentia_Dissonance(Analyzer):
         self.spec_peaks_alg = None
         self.dissonance_alg = Dissonance()
 
-        self.dissonance = []
-
     @interfacedoc
     def setup(self, channels=None, samplerate=None,
               blocksize=None, totalframes=None):
@@ -77,6 +75,7 @@ class Essentia_Dissonance(Analyzer):
             maxFrequency=self.input_samplerate / 2,
             minFrequency=0,
             orderBy='frequency')
+        self.dissonance = FrameAccumulator.for_analyzer(self, shape=())
 
     @staticmethod
     @interfacedoc
@@ -111,7 +110,7 @@ class Essentia_Dissonance(Analyzer):
     def post_process(self):
 
         dissonance = self.new_result(data_mode='value', time_mode='framewise')
-        dissonance.data_object.value = self.dissonance
+        dissonance.data_object.value = self.dissonance.data
         self.add_result(dissonance)
 
 # Generate Grapher for Essentia dissonance
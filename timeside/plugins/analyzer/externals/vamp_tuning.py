@@ -36,6 +36,9 @@ class VampTuning(VampAnalyzer):
 
     implements(IValueAnalyzer)
 
+    # The tuning needs the full frequency resolution
+    previewable = False
+
     _schema = {'$schema': 'http://json-schema.org/schema#',
                'properties': {},
                'type': 'object'}
@@ -60,6 +60,7 @@ class VampAnalyzer(Analyzer):
         self.output_desc = None
         # Attributes initialize later during setup
         self.plugin = None
+        self._plugin_config = None
         self.out_index = None  # TODO: manage several outputs
         self.vamp_results = []
         # Process Attribute
@@ -71,16 +72,25 @@ class VampAnalyzer(Analyzer):
         super(VampAnalyzer, self).setup(
             channels, samplerate, blocksize, totalframes)
 
-        self.plugin = vampyhost.load_plugin(self.plugin_key,
-                                            float(self.input_samplerate),
-                                            vampyhost.ADAPT_INPUT_DOMAIN +
-                                            vampyhost.ADAPT_BUFFER_SIZE +
-                                            vampyhost.ADAPT_CHANNEL_COUNT)
-
-        if not self.plugin.initialise(self.input_channels,
-                                      self.input_stepsize,
-                                      self.input_blocksize):
-            raise RuntimeError("Vampy-Host failed to initialise plugin %d" % self.plugin_key)
+        plugin_config = (self.plugin_key, self.input_samplerate,
+                         self.input_channels, self.input_stepsize,
+                         self.input_blocksize)
+        if self.plugin is not None and plugin_config == self._plugin_config:
+            # Reuse the plugin loaded for the previous source
+            self.plugin.reset()
+        else:
+            self._unload_plugin()
+            self.plugin = vampyhost.load_plugin(
+                self.plugin_key, float(self.input_samplerate),
+                vampyhost.ADAPT_INPUT_DOMAIN +
+                vampyhost.ADAPT_BUFFER_SIZE +
+                vampyhost.ADAPT_CHANNEL_COUNT)
+
+            if not self.plugin.initialise(self.input_channels,
+                                          self.input_stepsize,
+                                          self.input_blocksize):
+                raise RuntimeError("Vampy-Host failed to initialise plugin %d" % self.plugin_key)
+            self._plugin_config = plugin_config
 
         self.out_index = self.plugin.get_output(
             self.plugin_output)["output_index"]
@@ -91,6 +101,22 @@ class VampAnalyzer(Analyzer):
         else:
             self.output_desc = self.plugin.get_output(self.plugin_output)
 
+    def _unload_plugin(self):
+        "Unload the plugin, kept loaded between the runs to be reused"
+        if getattr(self, 'plugin', None) is not None:
+            self.plugin.unload()
+            self.plugin = None
+            self._plugin_config = None
+
+    def __del__(self):
+        self._unload_plugin()
+        super(VampAnalyzer, self).__del__()
+
+    def reset(self):
+        super(VampAnalyzer, self).reset()
+        self.vamp_results = []
+        self.frame_index = 0
+
     @staticmethod
     @interfacedoc
     def id():
@@ -138,5 +164,4 @@ class VampAnalyzer(Analyzer):
                            self.output_desc,
                            shape)
 
-        self.plugin.unload()
         self.vamp_results = {shape: res_vamp}
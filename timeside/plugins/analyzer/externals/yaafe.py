@@ -104,22 +104,26 @@ class Yaafe(Analyzer):
 
         self.feature_plan = feature_plan
         self.yaafe_engine = None
+        self._engine_samplerate = None
 
     @interfacedoc
     def setup(self, channels=None, samplerate=None,
               blocksize=None, totalframes=None):
         super(Yaafe, self).setup(channels, samplerate, blocksize, totalframes)
 
-        # Setup Yaafe Feature plan and Dataflow
-        yaafe_feature_plan = yaafelib.FeaturePlan(sample_rate=samplerate)
-        for feat in self.feature_plan:
-            yaafe_feature_plan.addFeature(feat)
+        if self.yaafe_engine is None or samplerate != self._engine_samplerate:
+            # Setup Yaafe Feature plan and Dataflow
+            yaafe_feature_plan = yaafelib.FeaturePlan(sample_rate=samplerate)
+            for feat in self.feature_plan:
+                yaafe_feature_plan.addFeature(feat)
 
-        self.data_flow = yaafe_feature_plan.getDataFlow()
+            self.data_flow = yaafe_feature_plan.getDataFlow()
 
-        # Configure a YAAFE engine
-        self.yaafe_engine = yaafelib.Engine()
-        self.yaafe_engine.load(self.data_flow)
+            # Configure a YAAFE engine
+            self.yaafe_engine = yaafelib.Engine()
+            self.yaafe_engine.load(self.data_flow)
+            self._engine_samplerate = samplerate
+        # The engine loaded for a previous source is reused once reset
         self.yaafe_engine.reset()
         # self.input_samplerate = samplerate
         # self.input_blocksize = blocksize
@@ -21,7 +21,7 @@
 # Author: Guillaume Pellerin <yomguy@parisson.com>
 
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator, merge_results
 from timeside.core.api import IValueAnalyzer
 import numpy as np
 from timeside.plugins.analyzer.utils import MACHINE_EPSILON
@@ -59,7 +59,8 @@ class Level(Analyzer):
         # max_level
         self.max_value = 0
         # rms_level
-        self.mean_values = np.array([])
+        self.mean_values = FrameAccumulator.for_analyzer(self, shape=(),
+                                                         dtype=np.float64)
 
     @staticmethod
     @interfacedoc
@@ -88,36 +89,52 @@ class Level(Analyzer):
             if max_value > self.max_value:
                 self.max_value = max_value
             # rms_level
-            self.mean_values = np.append(self.mean_values,
-                                         np.mean(np.square(frames)))
+            self.mean_values.append(np.mean(np.square(frames)))
         return frames, eod
 
     def post_process(self):
+        max_value, rms_value = self._levels(*self.segment_state())
+
         # Max level
         max_level = self.new_result(data_mode='value', time_mode='global')
 
         max_level.id_metadata.id += '.' + "max"
         max_level.id_metadata.name += ' ' + "Max"
-
-        if self.max_value == 0:  # Prevent np.log10(0) = Inf
-            self.max_value = MACHINE_EPSILON
-
-        max_level.data_object.value = np.round(
-            20 * np.log10(self.max_value), 3)
+        max_level.data_object.value = max_value
         self.add_result(max_level)
 
         # RMS level
         rms_level = self.new_result(data_mode='value', time_mode='global')
         rms_level.id_metadata.id += '.' + "rms"
         rms_level.id_metadata.name += ' ' + "RMS"
+        rms_level.data_object.value = rms_value
+        self.add_result(rms_level)
 
-        rms_val = np.sqrt(np.mean(self.mean_values))
+    def segment_state(self):
+        "Return the max, the sum and the number of the block mean squares"
+        return (self.max_value, np.sum(self.mean_values.data),
+                len(self.mean_values.data))
 
+    @staticmethod
+    def _levels(max_value, total, count):
+        "Return the max and RMS levels in dBFS"
+        if max_value == 0:  # Prevent np.log10(0) = Inf
+            max_value = MACHINE_EPSILON
+        rms_val = np.sqrt(total / count) if count else np.nan
         if rms_val == 0:
             rms_val = MACHINE_EPSILON
-
-        rms_level.data_object.value = np.round(20 * np.log10(rms_val), 3)
-        self.add_result(rms_level)
+        return (np.round(20 * np.log10(max_value), 3),
+                np.round(20 * np.log10(rms_val), 3))
+
+    def merge(self, results, overlaps, states):
+        max_value, rms_value = self._levels(
+            max(state[0] for state in states),
+            sum(state[1] for state in states),
+            sum(state[2] for state in states))
+        levels = {'level.max': max_value, 'level.rms': rms_value}
+        return merge_results(results, overlaps,
+                             lambda result_id, values, weights:
+                             levels[result_id])
 
 if __name__ == "__main__":
     import doctest
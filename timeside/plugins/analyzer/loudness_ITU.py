@@ -50,6 +50,9 @@ class LoudnessITU(Analyzer):
 
     implements(IAnalyzer)
 
+    # The filters are specified for 44100Hz and 48000Hz
+    previewable = False
+
     class _Param(HasTraits):
         pass
 
@@ -102,6 +105,10 @@ class LoudnessITU(Analyzer):
             self.B2 = np.array([1.0, -2.0, 1.0])
             self.A2 = np.array([1.0, -1.99004745483398, 0.99007225036621])
 
+    def reset(self):
+        super(LoudnessITU, self).reset()
+        self.l = []
+
     @staticmethod
     @interfacedoc
     def id():
@@ -20,9 +20,10 @@
 # Author: Paul Brossier <piem@piem.org>
 from __future__ import division
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator, merge_results
 from timeside.core.api import IAnalyzer
 from timeside.core.preprocessors import downmix_to_mono, frames_adapter
+from timeside.core.stft import stft
 from timeside.core.tools.buffering import BufferTable
 from timeside.core.tools.parameters import store_parameters, Int, HasTraits
 
@@ -106,13 +107,13 @@ class Spectrogram(Analyzer):
         else:
             self.fft_size = fft_size
 
-        self.values = []
-
     @interfacedoc
     def setup(self, channels=None, samplerate=None,
               blocksize=None, totalframes=None):
         super(Spectrogram, self).setup(channels, samplerate,
                                        blocksize, totalframes)
+        self.values = FrameAccumulator.for_analyzer(
+            self, shape=(self.fft_size // 2 + 1,))
 
     @staticmethod
     @interfacedoc
@@ -137,19 +138,40 @@ class Spectrogram(Analyzer):
     @downmix_to_mono
     @frames_adapter
     def process(self, frames, eod=False):
-        self.values.append(np.abs(np.fft.rfft(frames, self.fft_size)))
+        spectrum = np.abs(np.fft.rfft(frames, self.fft_size))
+        self.values.append(spectrum)
+        self.emit(self.id(), spectrum[np.newaxis])
         return frames, eod
 
+    def process_batch(self, frames_matrix, eod=False):
+        spectra = stft(self, frames_matrix, self.fft_size, magnitude=True)
+        self.values.extend(spectra)
+        self.emit(self.id(), spectra)
+
     def post_process(self):
         spectrogram = self.new_result(data_mode='value', time_mode='framewise')
         spectrogram.parameters = {'fft_size': self.fft_size}
         # spectrogram.data_object.value = self.values['spectrogram']
-        spectrogram.data_object.value = self.values
+        spectrogram.data_object.value = self.values.data
         nb_freq = spectrogram.data_object.value.shape[1]
         spectrogram.data_object.y_value = (np.arange(0, nb_freq) *
                                            self.samplerate() / self.fft_size)
         self.add_result(spectrogram)
 
+    def merge(self, results, overlaps):
+        return merge_results(results, overlaps)
+
+    @interfacedoc
+    def estimate(self, duration, samplerate, channels):
+        cost = super(Spectrogram, self).estimate(duration, samplerate,
+                                                 channels)
+        # float64 spectra, one per step
+        frames = duration * (self.input_samplerate or samplerate)
+        result_bytes = (np.ceil(frames / self.input_stepsize) *
+                        (self.fft_size // 2 + 1) * 8)
+        return cost._replace(peak_bytes=max(cost.peak_bytes, result_bytes),
+                             result_bytes=result_bytes)
+
 
 # Generate Grapher for Spectrogram analyzer
 from timeside.core.grapher import DisplayAnalyzer
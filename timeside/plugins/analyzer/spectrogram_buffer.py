@@ -25,6 +25,7 @@ from timeside.core import implements, interfacedoc
 from timeside.core.analyzer import Analyzer
 from timeside.core.api import IAnalyzer
 from timeside.core.preprocessors import downmix_to_mono, frames_adapter
+from timeside.core.stft import stft
 from timeside.core.tools.parameters import store_parameters, Int, HasTraits
 from timeside.core.tools.buffering import BufferTable
 from timeside.plugins.analyzer.spectrogram import Spectrogram
@@ -59,7 +60,7 @@ class SpectrogramBuffer(Spectrogram):
     ['spectrogram_analyzer_buffer']
     >>> result = spectrogram.results['spectrogram_analyzer_buffer']
     >>> result.data.shape
-    (345, 1025)
+    (344, 1025)
 
      .. plot::
 
@@ -84,6 +85,17 @@ class SpectrogramBuffer(Spectrogram):
         super(SpectrogramBuffer, self).__init__()
         self.values = BufferTable()
 
+    @interfacedoc
+    def setup(self, channels=None, samplerate=None,
+              blocksize=None, totalframes=None):
+        # Keep the BufferTable instead of the frames accumulator of Spectrogram
+        super(Spectrogram, self).setup(channels, samplerate,
+                                       blocksize, totalframes)
+
+    def reset(self):
+        super(SpectrogramBuffer, self).reset()
+        self.values = BufferTable()
+
     @staticmethod
     @interfacedoc
     def id():
@@ -102,10 +114,13 @@ class SpectrogramBuffer(Spectrogram):
     @downmix_to_mono
     @frames_adapter
     def process(self, frames, eod=False):
-        stft = np.fft.rfft(frames, self.fft_size)
-        self.values.append('stft', stft)
+        spectrum = np.fft.rfft(frames, self.fft_size)
+        self.values.append('stft', spectrum)
         return frames, eod
 
+    def process_batch(self, frames_matrix, eod=False):
+        self.values.extend('stft', stft(self, frames_matrix, self.fft_size))
+
     def post_process(self):
         spectrogram = self.new_result(data_mode='value', time_mode='framewise')
         spectrogram.parameters = {'fft_size': self.fft_size}
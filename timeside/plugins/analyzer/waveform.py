@@ -21,7 +21,7 @@
 # Author: Thomas Fillon <thomas@parisson.com>
 
 from timeside.core import implements, interfacedoc
-from timeside.core.analyzer import Analyzer
+from timeside.core.analyzer import Analyzer, FrameAccumulator, merge_results
 from timeside.core.api import IAnalyzer
 import numpy as np
 
@@ -41,7 +41,8 @@ class Waveform(Analyzer):
               blocksize=None, totalframes=None):
         super(Waveform, self).setup(channels, samplerate,
                                     blocksize, totalframes)
-        self.values = []
+        self.values = FrameAccumulator.for_analyzer(
+            self, shape=(self.input_channels,), stepsize=1)
         self.result_blocksize = 1
         self.result_stepsize = 1
 
@@ -68,14 +69,28 @@ class Waveform(Analyzer):
 #    @downmix_to_mono
 #    @frames_adapter
     def process(self, frames, eod=False):
-        self.values.append(frames)
+        # The last block of a source may be empty
+        if len(frames):
+            self.values.extend(frames)
+            self.emit(self.id(), self.values.data[-len(frames):])
         return frames, eod
 
     def post_process(self):
         waveform = self.new_result(data_mode='value', time_mode='framewise')
-        waveform.data_object.value = np.vstack(self.values)
+        waveform.data_object.value = self.values.data
         self.add_result(waveform)
 
+    def merge(self, results, overlaps):
+        return merge_results(results, overlaps)
+
+    @interfacedoc
+    def estimate(self, duration, samplerate, channels):
+        cost = super(Waveform, self).estimate(duration, samplerate, channels)
+        # The float32 decoded frames
+        result_bytes = duration * samplerate * channels * 4
+        return cost._replace(peak_bytes=max(cost.peak_bytes, result_bytes),
+                             result_bytes=result_bytes)
+
 
 # Generate Grapher for Waveform analyzer
 from timeside.core.grapher import DisplayAnalyzer
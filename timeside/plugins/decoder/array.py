@@ -44,7 +44,8 @@ class ArrayDecoder(Decoder):
     def id():
         return "array_decoder"
 
-    def __init__(self, samples, samplerate=44100, start=0, duration=None):
+    def __init__(self, samples, samplerate=44100, start=0, duration=None,
+                 sha1=None):
         '''
             Construct a new ArrayDecoder from an numpy array
 
@@ -57,6 +58,8 @@ class ArrayDecoder(Decoder):
                 start time of the segment in seconds
             duration : float
                 duration of the segment in seconds
+            sha1 : str, optional
+                sha1 hash of the samples, computed if not given
         '''
         super(ArrayDecoder, self).__init__(start=start, duration=duration)
 
@@ -67,14 +70,22 @@ class ArrayDecoder(Decoder):
             samples = samples[:, np.newaxis]  # reshape to 2D array
 
         self.samples = samples.astype('float32')  # Create a 2 dimensions array
+        # Whole array, self.samples being restricted to the segment by setup
+        self._samples = self.samples
         self.input_samplerate = samplerate
         self.input_channels = self.samples.shape[1]
 
+        if self.uri_duration is None:
+            self.uri_duration = (len(self.samples) / self.input_samplerate
+                                 - self.uri_start)
+
         self.uri = '_'.join(['raw_audio_array',
                              'x'.join([str(dim) for dim in samples.shape]),
                              samples.dtype.type.__name__])
-        from .utils import sha1sum_numpy
-        self._sha1 = sha1sum_numpy(self.samples)
+        if sha1 is None:
+            from .utils import sha1sum_numpy
+            sha1 = sha1sum_numpy(self.samples)
+        self._sha1 = sha1
         self.frames = self.get_frames()
 
     def setup(self, channels=None, samplerate=None, blocksize=None):
@@ -82,38 +93,46 @@ class ArrayDecoder(Decoder):
         # the output data format we want
         if blocksize:
             self.output_blocksize = blocksize
-        if samplerate:
-            self.output_samplerate = int(samplerate)
+        # A samplerate requested by a previous run, e.g. a preview, does not
+        # apply to this one
+        self.output_samplerate = int(samplerate or self.input_samplerate)
         if channels:
             self.output_channels = int(channels)
 
-        if self.uri_duration is None:
-            self.uri_duration = (len(self.samples) / self.input_samplerate
-                                 - self.uri_start)
-
+        samples = self._samples
         if self.is_segment:
-            start_index = np.floor(self.uri_start * self.input_samplerate).astype(np.int)
+            # Round first so that float errors do not shift the bounds
+            start_index = int(np.floor(np.round(
+                self.uri_start * self.input_samplerate, 6)))
             stop_index = start_index
-            stop_index += np.ceil(self.uri_duration
-                                  * self.input_samplerate).astype(np.int)
-            stop_index = min(stop_index, len(self.samples))
-            self.samples = self.samples[start_index:stop_index]
-
-        if not self.output_samplerate:
-            self.output_samplerate = self.input_samplerate
+            stop_index += int(np.ceil(np.round(
+                self.uri_duration * self.input_samplerate, 6)))
+            stop_index = min(stop_index, len(self._samples))
+            samples = self._samples[start_index:stop_index]
 
         if not self.output_channels:
             self.output_channels = self.input_channels
 
-        self.input_totalframes = len(self.samples)
+        self.input_totalframes = len(samples)
         self.input_duration = self.input_totalframes / self.input_samplerate
-        self.input_width = self.samples.itemsize * 8
+        self.input_width = samples.itemsize * 8
+
+        if self.output_samplerate != self.input_samplerate:
+            from scipy.signal import resample_poly
+            gcd = np.gcd(self.output_samplerate, int(self.input_samplerate))
+            samples = resample_poly(samples,
+                                    self.output_samplerate // gcd,
+                                    int(self.input_samplerate) // gcd,
+                                    axis=0).astype('float32')
+        self.samples = samples
 
     def get_frames(self):
         "Define an iterator that will return frames at the given blocksize"
-        nb_frames = self.input_totalframes // self.output_blocksize
+        # The samples at the output samplerate
+        totalframes = len(self.samples)
+        nb_frames = totalframes // self.output_blocksize
 
-        if self.input_totalframes % self.output_blocksize == 0:
+        if totalframes % self.output_blocksize == 0:
             nb_frames -= 1  # Last frame must send eod=True
 
         for index in range(0,
@@ -127,6 +146,10 @@ class ArrayDecoder(Decoder):
     def process(self):
         return next(self.frames)
 
+    @interfacedoc
+    def totalframes(self):
+        return len(self.samples)
+
     # IDecoder methods
     @interfacedoc
     def format(self):
@@ -147,6 +170,12 @@ class ArrayDecoder(Decoder):
     def release(self):
         self.frames = self.get_frames()
 
+    @interfacedoc
+    def segment(self, start, duration=None):
+        return ArrayDecoder(self._samples, samplerate=self.input_samplerate,
+                            start=self.uri_start + start, duration=duration,
+                            sha1=self._sha1)
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
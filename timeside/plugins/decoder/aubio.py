@@ -4,6 +4,7 @@
 
 from timeside.core.decoder import Decoder, IDecoder, implements, interfacedoc
 from timeside.plugins.decoder.utils import get_sha1, get_media_uri_info
+from timeside.plugins.decoder.utils import pcm_cache_setup, pcm_cache_process
 import aubio
 import mimetypes
 
@@ -37,11 +38,16 @@ class AubioDecoder(Decoder):
         self.mimetype = mimetypes.guess_type(uri)[0]
         self.input_width = 8
 
-        if sha1 is not None:
-            self._sha1 = sha1
-        else:
-            self._sha1 = get_sha1(uri)
+        # Computed when needed
+        self._sha1 = sha1
+
+    @property
+    def sha1(self):
+        if self._sha1 is None:
+            self._sha1 = get_sha1(self.uri)
+        return self._sha1
 
+    @pcm_cache_setup
     def setup(self, channels=None, samplerate=None, blocksize=None):
         if self.start or self.duration:
             if self.start > self.uri_duration:
@@ -89,6 +95,7 @@ class AubioDecoder(Decoder):
         return "1.0"
 
     @interfacedoc
+    @pcm_cache_process
     def process(self):
         frames, read = self.source.do_multi()
         self.eod = (read < self.output_blocksize)
@@ -31,11 +31,16 @@
 from __future__ import division
 
 from timeside.core.decoder import Decoder, IDecoder, implements, interfacedoc
-from timeside.core.tools.gstutils import MainloopThread, GLib, Gst
+from timeside.core.tools.gstutils import gst_runtime, Gst
 from timeside.core.tools.gstutils import gst_buffer_to_numpy_array
+from timeside.core.tools.buffering import FramesStack, BlockAssembler
 import threading
+import time
 
 from timeside.plugins.decoder.utils import get_uri, get_media_uri_info, stack, get_sha1
+from timeside.plugins.decoder.utils import pcm_cache_setup, pcm_cache_process
+from timeside.plugins.decoder.utils import pcm_cache_stop
+from timeside.core.tools.sha1_cache import Sha1Tee, get_sha1_cache
 
 try:
     import queue
@@ -61,8 +66,8 @@ class FileDecoder(Decoder):
         duration of the segment in seconds
     stack : boolean, optional
         keep decoded data in the stack
-    sha1 : boolean, optional
-        compute the sha1 hash of the data
+    sha1 : str, optional
+        sha1 hash of the media, computed when needed if not given
 
 
     Examples
@@ -83,7 +88,6 @@ class FileDecoder(Decoder):
     output_blocksize = 8 * 1024
 
     pipeline = None
-    mainloopthread = None
 
     # IProcessor methods
 
@@ -100,28 +104,43 @@ class FileDecoder(Decoder):
         self.stack = stack
 
         self.uri = get_uri(uri)
+        self._source = uri
 
+        # Computed when needed, from the decoded file if possible
         if not sha1:
-            self._sha1 = get_sha1(uri)
+            self._sha1 = None
         else:
             self._sha1 = sha1.encode('utf8')
+        self._sha1_tee = None
 
-        self.uri_total_duration = get_media_uri_info(self.uri)['duration']
-        self.uri_duration = self.uri_total_duration
+        uri_info = get_media_uri_info(self.uri, sha1)
+        self.uri_total_duration = uri_info['duration']
+        if self.uri_duration is None:
+            self.uri_duration = self.uri_total_duration - self.uri_start
+        if uri_info['streams']:
+            # Updated from the negotiated caps by setup
+            self.input_samplerate = uri_info['streams'][0]['samplerate']
+            self.input_channels = uri_info['streams'][0]['channels']
 
         self.mimetype = None
 
+    @pcm_cache_setup
     def setup(self, channels=None, samplerate=None, blocksize=None):
 
         self.eod = False
         self.last_buffer = None
+        self._blocks = None
+        # Blocks the GStreamer thread waited to queue (analysis is the
+        # bottleneck) and the pipe waited for (decoding is the bottleneck)
+        self.queue_waits = {'put': 0, 'put_time': 0., 'get': 0,
+                            'get_time': 0.}
 
         if self.from_stack:
             self._frames_iterator = iter(self.process_pipe.frames_stack)
             return
 
         if self.stack:
-            self.process_pipe.frames_stack = []
+            self.process_pipe.frames_stack = FramesStack()
 
         if self.uri_duration is None:
             # Set the duration from the length of the file
@@ -144,34 +163,20 @@ class FileDecoder(Decoder):
         # the output data format we want
         if blocksize:
             self.output_blocksize = blocksize
-        if samplerate:
-            self.output_samplerate = int(samplerate)
+        # A samplerate requested by a previous run, e.g. a preview, does not
+        # apply to this one
+        self.output_samplerate = int(samplerate) if samplerate else None
         if channels:
             self.output_channels = int(channels)
 
-        if self.is_segment:
-            # Create the pipe with Gnonlin gnlurisource
-            self.pipe = ''' gnlurisource name=src uri={uri}
-                            start=0
-                            duration={uri_duration}
-                            media-start={uri_start}
-                            media-duration={uri_duration}
-                            ! audioconvert name=audioconvert
-                            ! audioresample
-                            ! appsink name=sink sync=False async=True
-                            '''.format(uri=self.uri,
-                                       uri_start=np.uint64(
-                                           round(self.uri_start * gst.SECOND)),
-                                       uri_duration=np.int64(round(self.uri_duration * gst.SECOND)))
-                                       # convert uri_start and uri_duration to
-                                       # nanoseconds
-        else:
-            # Create the pipe with standard Gstreamer uridecodebin
-            self.pipe = ''' uridecodebin name=src uri={uri}
-                           ! audioconvert name=audioconvert
-                           ! audioresample
-                           ! appsink name=sink sync=False async=True
-                           '''.format(uri=self.uri)
+        # Create the pipe with standard Gstreamer uridecodebin, a segment is
+        # decoded by seeking once the pipeline is prerolled
+        self.pipe = ''' uridecodebin name=src uri={uri}
+                       ! audioconvert name=audioconvert
+                       ! audioresample
+                       ! appsink name=sink sync=False async=True
+                       '''.format(uri=self.uri)
+        self._segment_frames = None
 
         self.pipeline = Gst.parse_launch(self.pipe)
 
@@ -189,11 +194,10 @@ class FileDecoder(Decoder):
             rate=(int)%s""" % (caps_channels, caps_samplerate))
 
         self.src = self.pipeline.get_by_name('src')
+        self.src.connect("autoplug-continue", self._autoplug_cb)
         if not self.is_segment:
-            self.src.connect("autoplug-continue", self._autoplug_cb)
-        else:
-            uridecodebin = self.src.get_by_name('internal-uridecodebin')
-            uridecodebin.connect("autoplug-continue", self._autoplug_cb)
+            # A segment does not read the whole file
+            self._setup_sha1_tee()
 
         self.conv = self.pipeline.get_by_name('audioconvert')
         self.conv.get_static_pad("sink").connect("notify::caps", self._notify_caps_cb)
@@ -205,19 +209,13 @@ class FileDecoder(Decoder):
         self.sink.set_property('emit-signals', True)
         self.sink.connect("new-sample", self._on_new_buffer_cb)
 
-        self.bus = self.pipeline.get_bus()
-        self.bus.add_signal_watch()
-        self.bus.connect('message', self._on_message_cb)
-
         self.queue = queue.Queue(QUEUE_SIZE)
 
-        self.mainloop = GLib.MainLoop()
-        self.mainloopthread = MainloopThread(self.mainloop)
-        self.mainloopthread.start()
-        #self.mainloopthread = get_loop_thread()
-        ##self.mainloop = self.mainloopthread.mainloop
+        self.bus = gst_runtime().register(self.pipeline, self._on_message_cb)
 
         # start pipeline
+        if self.is_segment:
+            self._seek_segment()
         self.pipeline.set_state(Gst.State.PLAYING)
 
         self.discovered_cond.acquire()
@@ -232,6 +230,76 @@ class FileDecoder(Decoder):
             else:
                 raise IOError('no known audio stream found')
 
+    def _seek_segment(self):
+        "Preroll the pipeline and seek to the start and end of the segment"
+        self.pipeline.set_state(Gst.State.PAUSED)
+        state_change = self.pipeline.get_state(Gst.CLOCK_TIME_NONE)[0]
+        if state_change == Gst.StateChangeReturn.FAILURE:
+            # The error is reported on the bus
+            return
+        # convert uri_start and uri_duration to nanoseconds
+        start = int(round(self.uri_start * Gst.SECOND))
+        stop = int(round((self.uri_start + self.uri_duration) * Gst.SECOND))
+        self.pipeline.seek(1.0, Gst.Format.TIME,
+                           Gst.SeekFlags.FLUSH | Gst.SeekFlags.ACCURATE,
+                           Gst.SeekType.SET, start, Gst.SeekType.SET, stop)
+
+    def _clip_segment(self, buf, frames):
+        """Clip the decoded frames of a buffer to the segment
+
+        Seeking is accurate to the buffer for most formats, the frames are
+        clipped to the sample from the timestamp of the buffer.
+        """
+        if buf.pts == Gst.CLOCK_TIME_NONE:
+            return frames
+        if self._segment_frames is None:
+            start = int(round(self.uri_start * self.output_samplerate))
+            stop = start + int(round(self.uri_duration *
+                                     self.output_samplerate))
+            self._segment_frames = (start, stop)
+        start, stop = self._segment_frames
+        first = int(round(buf.pts * self.output_samplerate / Gst.SECOND))
+        return frames[max(start - first, 0):max(stop - first, 0)]
+
+    def _setup_sha1_tee(self):
+        "Hash the bytes read by the source element of a local file"
+        self._sha1_tee = None
+        if self._sha1 is not None or not self.uri.startswith('file://'):
+            return
+        pathname = Gst.uri_get_location(self.uri)
+        if get_sha1_cache() is None or get_sha1_cache().get(pathname):
+            return
+        self._sha1_tee = Sha1Tee(pathname)
+        self.src.connect("source-setup", self._source_setup_cb)
+
+    def _source_setup_cb(self, src, source):
+        source.get_static_pad('src').add_probe(Gst.PadProbeType.BUFFER,
+                                               self._sha1_probe_cb)
+
+    def _sha1_probe_cb(self, pad, info):
+        buf = info.get_buffer()
+        tee = self._sha1_tee
+        if buf is not None and tee is not None and not tee.complete:
+            success, map_info = buf.map(Gst.MapFlags.READ)
+            if success:
+                try:
+                    tee.update(buf.offset, map_info.data)
+                finally:
+                    buf.unmap(map_info)
+        return Gst.PadProbeReturn.OK
+
+    @property
+    def sha1(self):
+        if self._sha1 is None:
+            tee = self._sha1_tee
+            sha1 = tee.hexdigest() if tee is not None else None
+            if sha1 is not None:
+                get_sha1_cache().set(tee.filename, sha1, tee.key)
+                self._sha1 = sha1
+            else:
+                self._sha1 = get_sha1(self._source)
+        return self._sha1
+
     def _autoplug_cb(self, src, arg0, arg1):
         # use the autoplug-continue callback from uridecodebin
         # to get the mimetype string
@@ -271,7 +339,10 @@ class FileDecoder(Decoder):
             self.input_channels = caps[0]["channels"]
             if not self.output_channels:
                 self.output_channels = self.input_channels
-            self.input_duration = length / Gst.SECOND
+            if self.is_segment:
+                self.input_duration = self.uri_duration
+            else:
+                self.input_duration = length / Gst.SECOND
 
             self.input_totalframes = int(
                 self.input_duration * self.input_samplerate)
@@ -287,15 +358,15 @@ class FileDecoder(Decoder):
     def _on_message_cb(self, bus, message):
         t = message.type
         if t == Gst.MessageType.EOS:
-            self.queue.put(Gst.MessageType.EOS)
             self.pipeline.set_state(Gst.State.NULL)
-            self.mainloop.quit()
+            gst_runtime().unregister(self.pipeline)
+            self._put_eos()
         elif t == Gst.MessageType.ERROR:
             self.pipeline.set_state(Gst.State.NULL)
             err, debug = message.parse_error()
             self.discovered_cond.acquire()
             self.discovered = True
-            self.mainloop.quit()
+            gst_runtime().unregister(self.pipeline)
             self.error_msg = "Error: %s" % err, debug
             self.discovered_cond.notify()
             self.discovered_cond.release()
@@ -304,28 +375,65 @@ class FileDecoder(Decoder):
             # msg.parse_tags()
             pass
 
+    def _put_eos(self):
+        "Queue the end of stream without blocking the shared loop thread"
+        try:
+            self.queue.put_nowait(Gst.MessageType.EOS)
+        except queue.Full:
+            threading.Thread(target=self.queue.put,
+                             args=(Gst.MessageType.EOS,), daemon=True).start()
+
     def _on_new_buffer_cb(self, sink):
         buf = sink.emit('pull-sample').get_buffer()
         new_array = gst_buffer_to_numpy_array(buf, self.output_channels)
-        #print('processing new buffer', new_array.shape)
-        if self.last_buffer is None:
-            self.last_buffer = new_array
-        else:
-            self.last_buffer = np.concatenate(
-                (self.last_buffer, new_array), axis=0)
-        while self.last_buffer.shape[0] >= self.output_blocksize:
-            new_block = self.last_buffer[:self.output_blocksize]
-            self.last_buffer = self.last_buffer[self.output_blocksize:]
-            #print('queueing', new_block.shape, 'remaining', self.last_buffer.shape)
-            self.queue.put([new_block, False])
+        if self.is_segment:
+            new_array = self._clip_segment(buf, new_array)
+            if not len(new_array):
+                return Gst.FlowReturn.OK
+        if self._blocks is None:
+            self._blocks = BlockAssembler(self.output_blocksize,
+                                          self.output_channels,
+                                          new_array.dtype)
+        for block in self._blocks.write(new_array):
+            self._queue_wait('put', self.queue.put, [block, False])
 
         return Gst.FlowReturn.OK
 
+    def _queue_wait(self, name, method, *args):
+        "Call a method of the queue, counting the calls that had to wait"
+        waits = self.queue.full() if name == 'put' else self.queue.empty()
+        if not waits:
+            return method(*args)
+        start = time.perf_counter()
+        result = method(*args)
+        self.queue_waits[name] += 1
+        self.queue_waits[name + '_time'] += time.perf_counter() - start
+        return result
+
+    def decode_stats(self):
+        """Return the throughput counters of the last decoding
+
+        Returns
+        -------
+        stats : dict
+            Samples, GStreamer buffers and blocks decoded, their rates,
+            and the number and duration of the waits on the block queue
+        """
+        # Nothing is decoded on a PCM cache hit
+        blocks = getattr(self, '_blocks', None) or BlockAssembler(1, 1)
+        stats = blocks.stats()
+        stats.update(('queue_' + name, value) for name, value
+                     in getattr(self, 'queue_waits', {}).items())
+        return stats
+
     @interfacedoc
     @stack
+    @pcm_cache_process
     def process(self):
-        buf = self.queue.get()
+        buf = self._queue_wait('get', self.queue.get)
         if buf == Gst.MessageType.EOS:
+            if self._blocks is not None:
+                self.last_buffer = self._blocks.flush()
             return self.last_buffer, True
         frames, eod = buf
         return frames, eod
@@ -376,6 +484,15 @@ class FileDecoder(Decoder):
         # TODO check
         return self.tags
 
+    @interfacedoc
+    def segment(self, start, duration=None):
+        sha1 = self._sha1
+        if isinstance(sha1, bytes):
+            sha1 = sha1.decode('utf8')
+        return FileDecoder(self.uri, start=self.uri_start + start,
+                           duration=duration, sha1=sha1)
+
+    @pcm_cache_stop
     def stop(self):
         self.src.send_event(Gst.Event.new_eos())
 
@@ -29,7 +29,7 @@
 from __future__ import division
 
 from timeside.core.decoder import Decoder, IDecoder, interfacedoc, implements
-from timeside.core.tools.gstutils import MainloopThread, GLib, Gst
+from timeside.core.tools.gstutils import gst_runtime, Gst
 #from timeside.plugins.decoder.file import FileDecoder
 try:
     import queue
@@ -159,17 +159,9 @@ class LiveDecoder:#(FileDecoder):
         self.sink.set_property('emit-signals', True)
         self.sink.connect("new-buffer", self._on_new_buffer_cb)
 
-        self.bus = self.pipeline.get_bus()
-        self.bus.add_signal_watch()
-        self.bus.connect('message', self._on_message_cb)
-
         self.queue = queue.Queue(QUEUE_SIZE)
 
-        self.mainloop = GLib.MainLoop()
-        self.mainloopthread = MainloopThread(self.mainloop)
-        self.mainloopthread.start()
-        #self.mainloopthread = get_loop_thread()
-        ##self.mainloop = self.mainloopthread.mainloop
+        self.bus = gst_runtime().register(self.pipeline, self._on_message_cb)
 
         # start pipeline
         self.pipeline.set_state(Gst.State.PLAYING)
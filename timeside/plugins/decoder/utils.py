@@ -123,8 +123,10 @@ def get_uri(source):
         raise IOError('Failed getting uri for path %s: no such file' % source)
 
 
-def get_media_uri_info(uri):
+GST_DISCOVER_TIMEOUT = 5000000000
 
+
+def _discoverer():
     import gi
     gi.require_version('Gst', '1.0')
     gi.require_version('GLib', '2.0')
@@ -133,12 +135,13 @@ def get_media_uri_info(uri):
     gi.require_version('GstPbutils', '1.0')
     from gi.repository.GstPbutils import Discoverer
 
-    GST_DISCOVER_TIMEOUT = 5000000000
-    uri_discoverer = Discoverer.new(GST_DISCOVER_TIMEOUT)
-    try:
-        uri_info = uri_discoverer.discover_uri(uri)
-    except GLib.GError as e:
-        raise IOError(e)
+    return Discoverer.new(GST_DISCOVER_TIMEOUT)
+
+
+def _media_info(uri_info):
+    "Return the duration and audio streams of a DiscovererInfo as a dict"
+    from gi.repository import Gst
+
     info = dict()
 
     # Duration in seconds
@@ -155,10 +158,98 @@ def get_media_uri_info(uri):
                        }
         info['streams'].append(stream_info)
 
-    #print('discovered', uri, info)
     return info
 
 
+def get_media_uri_info(uri, sha1=None):
+    """Return the duration and audio streams of a media
+
+    The result is read from the media info cache if any, see
+    timeside.core.tools.media_info_cache.
+    """
+    from timeside.core.tools.media_info_cache import get_media_info_cache
+
+    cache = get_media_info_cache()
+    key = cache.key(uri, sha1) if cache is not None else None
+    if key is not None:
+        info = cache.get(key)
+        if info is not None:
+            return info
+
+    uri_discoverer = _discoverer()
+    from gi.repository import GLib
+    try:
+        uri_info = uri_discoverer.discover_uri(uri)
+    except GLib.GError as e:
+        raise IOError(e)
+    info = _media_info(uri_info)
+
+    if key is not None:
+        cache.set(key, info)
+    return info
+
+
+def discover_many(uris, sha1s=None):
+    """Return the media info of several media, discovered concurrently
+
+    A single Discoverer probes the media missing from the media info cache
+    asynchronously.
+
+    Parameters
+    ----------
+    uris : list of str
+    sha1s : list of str, optional
+        sha1 of each media, used as the cache key
+
+    Returns
+    -------
+    infos : dict
+        Media info indexed by uri, None for the media that could not be
+        discovered
+    """
+    from timeside.core.tools.media_info_cache import get_media_info_cache
+
+    if sha1s is None:
+        sha1s = [None] * len(uris)
+    cache = get_media_info_cache()
+    infos = dict()
+    keys = dict()
+    for uri, sha1 in zip(uris, sha1s):
+        key = cache.key(uri, sha1) if cache is not None else None
+        infos[uri] = cache.get(key) if key is not None else None
+        if infos[uri] is None:
+            keys[uri] = key
+    if not keys:
+        return infos
+
+    uri_discoverer = _discoverer()
+    from gi.repository import GLib
+    from gi.repository.GstPbutils import DiscovererResult
+    context = GLib.MainContext()
+    mainloop = GLib.MainLoop(context)
+
+    def discovered(discoverer, uri_info, error):
+        uri = uri_info.get_uri()
+        if error is None and uri_info.get_result() == DiscovererResult.OK:
+            infos[uri] = _media_info(uri_info)
+            if keys.get(uri) is not None:
+                cache.set(keys[uri], infos[uri])
+
+    uri_discoverer.connect('discovered', discovered)
+    uri_discoverer.connect('finished', lambda discoverer: mainloop.quit())
+    # The discoverer runs in the thread-default context
+    context.push_thread_default()
+    try:
+        uri_discoverer.start()
+        for uri in keys:
+            uri_discoverer.discover_uri_async(uri)
+        mainloop.run()
+        uri_discoverer.stop()
+    finally:
+        context.pop_thread_default()
+    return infos
+
+
 def stack(process_func):
 
     import functools
@@ -177,11 +268,155 @@ def stack(process_func):
     return wrapper
 
 
+# Decoder attributes restored from the PCM cache
+PCM_CACHE_ATTRIBUTES = ('input_samplerate', 'input_channels',
+                        'input_totalframes', 'input_duration', 'input_width',
+                        'output_samplerate', 'output_channels', 'mimetype')
+
+
+def pcm_cache_source(decoder):
+    """Return the identity of the decoder and of its media in the PCM cache
+
+    The decoders may decode the same media differently, they are identified
+    by their id. Local files are identified by their path, size and
+    modification time, so that their sha1 is not computed before decoding
+    them, other media by their sha1.
+    """
+    from timeside.core.tools.media_info_cache import MediaInfoCache
+
+    uri = getattr(decoder, 'uri', None)
+    source = (uri and MediaInfoCache.key(uri)) or decoder.sha1
+    if isinstance(source, bytes):
+        source = source.decode('utf8')
+    return [decoder.id(), source]
+
+
+def pcm_cache_setup(setup_func):
+    """Setup decorator reading the decoded stream from the PCM cache
+
+    On a cache hit the decoder properties are restored from the cache and
+    the decoding is skipped, otherwise the decoded blocks are recorded.
+    """
+
+    import functools
+    from timeside.core.tools.pcm_cache import get_pcm_cache, PCMCache
+
+    @functools.wraps(setup_func)
+    def wrapper(decoder, channels=None, samplerate=None, blocksize=None):
+        pcm_cache_abort(decoder)
+        decoder._pcm_reader = None
+        cache = get_pcm_cache()
+        if cache is None or getattr(decoder, 'from_stack', False):
+            return setup_func(decoder, channels, samplerate, blocksize)
+
+        key = PCMCache.key(pcm_cache_source(decoder), samplerate, channels,
+                           *decoder._segment)
+        cached = cache.get(key)
+        if cached is None:
+            setup_func(decoder, channels, samplerate, blocksize)
+            decoder._pcm_writer = cache.writer(key)
+            return
+
+        frames, meta = cached
+        for attr in PCM_CACHE_ATTRIBUTES:
+            if attr in meta:
+                setattr(decoder, attr, meta[attr])
+        decoder.output_channels = meta['channels']
+        if blocksize:
+            decoder.output_blocksize = blocksize
+        if getattr(decoder, 'stack', False):
+            from timeside.core.tools.buffering import FramesStack
+            decoder.process_pipe.frames_stack = FramesStack()
+        decoder._pcm_reader = [frames, 0]
+
+    return wrapper
+
+
+def pcm_cache_process(process_func):
+    "Process decorator reading or recording the blocks in the PCM cache"
+
+    import functools
+
+    @functools.wraps(process_func)
+    def wrapper(decoder):
+        reader = getattr(decoder, '_pcm_reader', None)
+        if reader is not None:
+            frames, position = reader
+            block = frames[position:position + decoder.output_blocksize]
+            reader[1] = position + len(block)
+            # Full blocks, then a last partial (or empty) one like decoders
+            return block, len(block) < decoder.output_blocksize
+
+        try:
+            frames, eod = process_func(decoder)
+        except Exception:
+            pcm_cache_abort(decoder)
+            raise
+        writer = getattr(decoder, '_pcm_writer', None)
+        if writer is not None:
+            writer.append(frames)
+            if eod:
+                meta = dict((attr, getattr(decoder, attr))
+                            for attr in PCM_CACHE_ATTRIBUTES
+                            if getattr(decoder, attr, None) is not None)
+                meta['channels'] = decoder.output_channels
+                writer.commit(meta)
+                decoder._pcm_writer = None
+        return frames, eod
+
+    return wrapper
+
+
+def pcm_cache_stop(stop_func):
+    """Stop decorator ending the stream read from the PCM cache
+
+    On a cache hit the decoding pipeline does not exist: the next block
+    read from the cache is the last one. Otherwise the recorded stream is
+    discarded, as it is truncated, before stopping the decoding.
+    """
+
+    import functools
+
+    @functools.wraps(stop_func)
+    def wrapper(decoder):
+        reader = getattr(decoder, '_pcm_reader', None)
+        if reader is not None:
+            reader[1] = len(reader[0])
+            return
+        pcm_cache_abort(decoder)
+        return stop_func(decoder)
+
+    return wrapper
+
+
+def pcm_cache_abort(decoder):
+    "Discard the stream being recorded in the PCM cache, if any"
+    writer = getattr(decoder, '_pcm_writer', None)
+    if writer is not None:
+        writer.abort()
+        decoder._pcm_writer = None
+
+
 def get_sha1(source):
+    """Return the sha1 of a file or an url
+
+    The sha1 of the files are read from and stored in the Sha1Cache.
+    """
+    from timeside.core.tools.sha1_cache import get_sha1_cache, file_key
+
     src_info = source_info(source)
 
     if src_info['is_file']:  # Is this a file?
-        return sha1sum_file(src_info['pathname'])
+        pathname = src_info['pathname']
+        cache = get_sha1_cache()
+        if cache is None:
+            return sha1sum_file(pathname)
+        sha1 = cache.get(pathname)
+        if sha1 is None:
+            key = file_key(pathname)
+            sha1 = sha1sum_file(pathname)
+            cache.set(pathname, sha1, key)
+        return sha1
     else:  # Then it should be an url
         return sha1sum_url(source)
 
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of TimeSide.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" decoder plugin reading uncompressed WAV and AIFF files directly """
+
+import os
+import struct
+from collections import namedtuple
+from urllib.parse import urlparse, unquote
+
+import numpy as np
+
+from timeside.core import implements, interfacedoc
+from timeside.core.decoder import Decoder, IDecoder
+from timeside.plugins.decoder.utils import path2uri, get_sha1
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# AIFF-C compression types of uncompressed data: (byte order, float)
+AIFC_COMPRESSIONS = {b'NONE': ('>', False), b'twos': ('>', False),
+                     b'sowt': ('<', False), b'fl32': ('>', True),
+                     b'FL32': ('>', True), b'fl64': ('>', True),
+                     b'FL64': ('>', True)}
+
+PCMFormat = namedtuple('PCMFormat', ['mimetype', 'samplerate', 'channels',
+                                     'width', 'byteorder', 'is_float',
+                                     'offset', 'frames'])
+
+
+def _read_chunks(f, byteorder, end):
+    "Yield the id, data offset and size of the chunks of a RIFF/IFF file"
+    while f.tell() + 8 <= end:
+        chunk_id, size = struct.unpack(byteorder + '4sI', f.read(8))
+        offset = f.tell()
+        yield chunk_id, offset, size
+        # Chunks are padded to an even size
+        f.seek(offset + size + (size & 1))
+
+
+def _extended(data):
+    "Convert an 80 bit IEEE 754 extended float, the AIFF samplerate"
+    exponent, mantissa = struct.unpack('>HQ', data)
+    sign = -1 if exponent & 0x8000 else 1
+    exponent &= 0x7FFF
+    if exponent == 0 and mantissa == 0:
+        return 0.
+    return sign * mantissa * 2. ** (exponent - 16383 - 63)
+
+
+def _parse_wav(f, file_size):
+    fmt = None
+    for chunk_id, offset, size in _read_chunks(f, '<', file_size):
+        if chunk_id == b'fmt ':
+            fmt = f.read(size)
+            tag, channels, samplerate, _, block_align, bits = \
+                struct.unpack('<HHIIHH', fmt[:16])
+            if tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                # The format tag starts the sub-format GUID
+                tag, = struct.unpack('<H', fmt[24:26])
+            if tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+                raise IOError('unsupported WAV format tag 0x%04x' % tag)
+            if not channels or block_align % channels:
+                raise IOError('invalid WAV block alignment')
+            # Samples of less than 8 bits are stored in whole bytes and
+            # samples of e.g. 20 bits are stored left-justified in 24 bits
+            width = 8 * block_align // channels
+            fmt = (samplerate, channels, width, tag == WAVE_FORMAT_IEEE_FLOAT)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise IOError('WAV data chunk before its fmt chunk')
+            samplerate, channels, width, is_float = fmt
+            # Files written by a stream may have a wrong data size
+            size = min(size, file_size - offset)
+            return PCMFormat('audio/x-wav', samplerate, channels, width, '<',
+                             is_float, offset,
+                             size // (channels * width // 8))
+    raise IOError('no WAV data chunk found')
+
+
+def _parse_aiff(f, file_size, aifc):
+    comm = None
+    for chunk_id, offset, size in _read_chunks(f, '>', file_size):
+        if chunk_id == b'COMM':
+            data = f.read(size)
+            channels, frames, bits = struct.unpack('>hIh', data[:8])
+            samplerate = _extended(data[8:18])
+            byteorder, is_float = '>', False
+            if aifc:
+                compression = data[18:22]
+                if compression not in AIFC_COMPRESSIONS:
+                    raise IOError('unsupported AIFF-C compression %r' %
+                                  compression)
+                byteorder, is_float = AIFC_COMPRESSIONS[compression]
+                if is_float:
+                    bits = 64 if compression.lower() == b'fl64' else 32
+            if channels <= 0:
+                raise IOError('invalid AIFF channels')
+            comm = (samplerate, channels, 8 * ((bits + 7) // 8), byteorder,
+                    is_float, frames)
+        elif chunk_id == b'SSND':
+            if comm is None:
+                raise IOError('AIFF SSND chunk before its COMM chunk')
+            data_offset, = struct.unpack('>I', f.read(4))
+            samplerate, channels, width, byteorder, is_float, frames = comm
+            offset += 8 + data_offset
+            available = (file_size - offset) // (channels * width // 8)
+            return PCMFormat('audio/x-aiff', samplerate, channels, width,
+                             byteorder, is_float, offset,
+                             min(frames, available))
+    raise IOError('no AIFF SSND chunk found')
+
+
+def parse_header(path):
+    """Return the PCMFormat of an uncompressed WAV or AIFF file
+
+    Raises IOError if the file is not an uncompressed WAV or AIFF file.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        try:
+            if header[:4] == b'RIFF' and header[8:] == b'WAVE':
+                pcm_format = _parse_wav(f, file_size)
+            elif header[:4] == b'FORM' and header[8:] in (b'AIFF', b'AIFC'):
+                pcm_format = _parse_aiff(f, file_size, header[8:] == b'AIFC')
+            else:
+                raise IOError('not a WAV or AIFF file')
+        except struct.error:
+            raise IOError('truncated WAV or AIFF header')
+    if pcm_format.samplerate <= 0:
+        raise IOError('invalid samplerate')
+    if pcm_format.is_float and pcm_format.width not in (32, 64):
+        raise IOError('unsupported float width %d' % pcm_format.width)
+    if not pcm_format.is_float and pcm_format.width not in (8, 16, 24, 32):
+        raise IOError('unsupported sample width %d' % pcm_format.width)
+    return pcm_format
+
+
+class WavMmapDecoder(Decoder):
+
+    """Decoder of uncompressed WAV and AIFF files
+
+    The audio data is memory-mapped and the blocks are converted to float32
+    from views of the mapped samples, without GStreamer. The decoder does
+    not resample: the samplerate of the file is the only one supported.
+
+    Parameters
+    ----------
+    uri : str
+        path or file uri of the media
+    start : float, optional
+        start time of the segment in seconds
+    duration : float, optional
+        duration of the segment in seconds
+    sha1 : str, optional
+        sha1 hash of the media, computed when needed if not given
+    """
+
+    implements(IDecoder)
+
+    output_blocksize = 8 * 1024
+
+    @staticmethod
+    @interfacedoc
+    def id():
+        return "wav_mmap_decoder"
+
+    def __init__(self, uri, start=0, duration=None, sha1=None):
+        super(WavMmapDecoder, self).__init__(start=start, duration=duration)
+
+        if uri.startswith('file://'):
+            self.path = unquote(urlparse(uri).path)
+        else:
+            self.path = os.path.abspath(uri)
+        self.uri = path2uri(self.path)
+        self._sha1 = sha1 or None
+
+        self.pcm_format = parse_header(self.path)
+        self.mimetype = self.pcm_format.mimetype
+        self.input_samplerate = int(round(self.pcm_format.samplerate))
+        self.input_channels = self.pcm_format.channels
+        self.input_width = self.pcm_format.width
+        self.uri_total_duration = (self.pcm_format.frames /
+                                   self.input_samplerate)
+        if self.uri_duration is None:
+            self.uri_duration = self.uri_total_duration - self.uri_start
+        self._set_segment()
+        self._samples = None
+
+    def _set_segment(self):
+        # Round first so that float errors do not shift the bounds
+        self.start_frame = int(np.floor(np.round(
+            self.uri_start * self.input_samplerate, 6)))
+        stop_frame = self.start_frame + int(np.ceil(np.round(
+            self.uri_duration * self.input_samplerate, 6)))
+        self.stop_frame = min(stop_frame, self.pcm_format.frames)
+        self.input_totalframes = max(self.stop_frame - self.start_frame, 0)
+        self.input_duration = self.input_totalframes / self.input_samplerate
+
+    def _map(self):
+        "Memory-map the samples of the file as a (frames, channels) array"
+        pcm_format = self.pcm_format
+        shape = (pcm_format.frames, pcm_format.channels)
+        if pcm_format.width == 24:
+            dtype = np.dtype('u1')
+            shape += (3,)
+        elif pcm_format.width == 8:
+            # 8 bit WAV samples are unsigned, 8 bit AIFF samples signed
+            dtype = np.dtype('u1' if pcm_format.mimetype == 'audio/x-wav'
+                             else 'i1')
+        else:
+            dtype = np.dtype('%s%s%d' % (
+                pcm_format.byteorder, 'f' if pcm_format.is_float else 'i',
+                pcm_format.width // 8))
+        if not pcm_format.frames:
+            return np.zeros(shape, dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r',
+                         offset=pcm_format.offset, shape=shape)
+
+    def _to_float32(self, samples):
+        "Convert a view of the mapped samples to float32"
+        pcm_format = self.pcm_format
+        if pcm_format.width == 24:
+            if pcm_format.byteorder == '<':
+                low, mid, high = samples[..., 0], samples[..., 1], \
+                    samples[..., 2]
+            else:
+                high, mid, low = samples[..., 0], samples[..., 1], \
+                    samples[..., 2]
+            frames = high.astype(np.int8).astype(np.int32) << 16
+            frames |= mid.astype(np.int32) << 8
+            frames |= low
+            samples = frames
+        frames = samples.astype(np.float32)
+        if samples.dtype == np.uint8:
+            frames -= 128
+        if not pcm_format.is_float:
+            frames *= 1. / 2 ** (pcm_format.width - 1)
+        if self.output_channels != self.input_channels:
+            # Downmix
+            frames = frames.mean(axis=1, keepdims=True)
+        return frames
+
+    @interfacedoc
+    def setup(self, channels=None, samplerate=None, blocksize=None):
+        if samplerate and int(samplerate) != self.input_samplerate:
+            raise ValueError('%s does not resample %s from %d Hz to %d Hz' %
+                             (self.id(), self.uri, self.input_samplerate,
+                              samplerate))
+        if channels and int(channels) not in (1, self.input_channels):
+            raise ValueError('%s can not convert %d channels to %d' %
+                             (self.id(), self.input_channels, channels))
+
+        if self.is_segment:
+            # Check start and duration value
+            if self.uri_start > self.uri_total_duration:
+                raise ValueError('Segment start time value exceed media '
+                                 'duration')
+            if self.uri_start + self.uri_duration > self.uri_total_duration:
+                raise ValueError('Segment duration value is too large given '
+                                 'the media duration')
+
+        if blocksize:
+            self.output_blocksize = blocksize
+        self.output_samplerate = self.input_samplerate
+        self.output_channels = int(channels or self.input_channels)
+
+        self._set_segment()
+        self._samples = self._map()
+        self.position = self.start_frame
+
+    @interfacedoc
+    def process(self):
+        stop = min(self.position + self.output_blocksize, self.stop_frame)
+        frames = self._to_float32(self._samples[self.position:stop])
+        self.position = stop
+        # A last block of the full size also ends the data
+        return frames, self.position >= self.stop_frame
+
+    @interfacedoc
+    def totalframes(self):
+        return self.input_totalframes
+
+    @property
+    def sha1(self):
+        if self._sha1 is None:
+            self._sha1 = get_sha1(self.path)
+        return self._sha1
+
+    @interfacedoc
+    def release(self):
+        # Unmap the file
+        self._samples = None
+
+    # IDecoder methods
+
+    @interfacedoc
+    def format(self):
+        return self.mime_type()
+
+    @staticmethod
+    @interfacedoc
+    def version():
+        return "1.0"
+
+    @interfacedoc
+    def mime_type(self):
+        return self.mimetype
+
+    @interfacedoc
+    def encoding(self):
+        if self.pcm_format.is_float:
+            return 'float'
+        return 'pcm'
+
+    @interfacedoc
+    def resolution(self):
+        return self.input_width
+
+    @interfacedoc
+    def metadata(self):
+        return {}
+
+    @interfacedoc
+    def segment(self, start, duration=None):
+        return WavMmapDecoder(self.path, start=self.uri_start + start,
+                              duration=duration, sha1=self._sha1)
@@ -25,6 +25,7 @@ from timeside.core.grapher import Grapher, Image
 from timeside.plugins.grapher.color_schemes import default_color_schemes
 from . utils import interpolate_colors
 import math
+import numpy
 
 
 class SpectrogramLog(Grapher):
@@ -71,6 +72,11 @@ class SpectrogramLog(Grapher):
         self.image.putpalette(interpolate_colors(self.colors, True))
         self.set_scale()
 
+    def reset(self):
+        super(SpectrogramLog, self).reset()
+        self.pixels = []
+        self.y_to_bin = []
+
     def set_scale(self):
         """generate the lookup which translates y-coordinate to fft-bin"""
 
@@ -93,17 +99,35 @@ class SpectrogramLog(Grapher):
         for y in range(len(self.y_to_bin), self.image_height):
             self.pixels.append(0)
 
+    def draw_spectra(self, x, spectra):
+        """draw the spectra of consecutive pixels starting at x"""
+        if not len(spectra):
+            return
+        index, alpha = numpy.array(self.y_to_bin).reshape(-1, 2).T
+        index = index.astype(int)
+        values = ((255.0 - alpha) * spectra[:, index] +
+                  alpha * spectra[:, index + 1]).astype(int)
+        pixels = numpy.zeros((len(spectra), self.image_height), dtype=int)
+        pixels[:, :len(self.y_to_bin)] = values
+        self.pixels.extend(pixels.ravel().tolist())
+
     @interfacedoc
     def process(self, frames, eod=False):
         if len(frames) != 1:
             chunk = frames[:, 0].copy()
             chunk.shape = (len(chunk), 1)
-            for samples, end in self.pixels_adapter.process(chunk, eod):
-                if self.pixel_cursor < self.image_width:
-                    (spectral_centroid, db_spectrum) = self.spectrum.process(
-                        samples, True)
-                    self.draw_spectrum(self.pixel_cursor, db_spectrum)
-                    self.pixel_cursor += 1
+            runs, last = self.pixels_adapter.process_runs(chunk, eod)
+            for blocks in runs:
+                blocks = blocks[:self.image_width - self.pixel_cursor]
+                (spectral_centroids, db_spectra) = \
+                    self.spectrum.process_blocks(blocks, True)
+                self.draw_spectra(self.pixel_cursor, db_spectra)
+                self.pixel_cursor += len(blocks)
+            if last is not None and self.pixel_cursor < self.image_width:
+                (spectral_centroid, db_spectrum) = self.spectrum.process(
+                    last, True)
+                self.draw_spectrum(self.pixel_cursor, db_spectrum)
+                self.pixel_cursor += 1
         return frames, eod
 
     @interfacedoc
@@ -195,6 +195,24 @@ def peaks(samples):
         return (max_value, min_value)
 
 
+def blocks_peaks(blocks):
+    """ Find the minimum and maximum peaks of each row of a block matrix.
+    Returns an array of (min, max) or (max, min) pairs, in the order
+    they were found and as one sample arrays as for peaks. """
+    samples = blocks.reshape(len(blocks), int(numpy.prod(blocks.shape[1:])))
+    rows = numpy.arange(len(samples))
+    max_index = numpy.argmax(samples, axis=1)
+    max_value = samples[rows, max_index]
+
+    min_index = numpy.argmin(samples, axis=1)
+    min_value = samples[rows, min_index]
+
+    min_first = min_index < max_index
+    pairs = numpy.column_stack((numpy.where(min_first, min_value, max_value),
+                                numpy.where(min_first, max_value, min_value)))
+    return pairs[:, :, numpy.newaxis]
+
+
 def color_from_value(self, value):
     """ given a value between 0 and 1, return an (r,g,b) tuple """
     return ImageColor.getrgb("hsl(%d,%d%%,%d%%)" % (int((1.0 - value) * 360), 80, 50))
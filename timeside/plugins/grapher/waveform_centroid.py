@@ -21,7 +21,7 @@
 
 from timeside.core import implements, interfacedoc
 from timeside.core.api import IGrapher
-from . utils import peaks, interpolate_colors
+from . utils import peaks, blocks_peaks, interpolate_colors
 from timeside.plugins.grapher.waveform_simple import Waveform
 from timeside.plugins.grapher.color_schemes import default_color_schemes
 
@@ -66,13 +66,22 @@ class WaveformCentroid(Waveform):
         if len(frames) != 1:
             buffer = frames[:, 0].copy()
             buffer.shape = (len(buffer), 1)
-            for samples, end in self.pixels_adapter.process(buffer, eod):
-                if self.pixel_cursor < self.image_width:
-                    (spectral_centroid, db_spectrum) = self.spectrum.process(
-                        samples, True)
-                    line_color = self.color_lookup[
-                        int(spectral_centroid * 255.0)]
-                    self.draw_peaks(
-                        self.pixel_cursor, peaks(samples), line_color)
-                    self.pixel_cursor += 1
+            runs, last = self.pixels_adapter.process_runs(buffer, eod)
+            pixels = []
+            for blocks in runs:
+                blocks = blocks[:self.image_width - self.pixel_cursor -
+                                len(pixels)]
+                # The peaks are found on the windowed samples
+                (centroids, db_spectra) = self.spectrum.process_blocks(
+                    blocks, True)
+                pixels.extend(zip(centroids, blocks_peaks(blocks)))
+            if last is not None and \
+                    self.pixel_cursor + len(pixels) < self.image_width:
+                (spectral_centroid, db_spectrum) = self.spectrum.process(
+                    last, True)
+                pixels.append((spectral_centroid, peaks(last)))
+            for spectral_centroid, pixel_peaks in pixels:
+                line_color = self.color_lookup[int(spectral_centroid * 255.0)]
+                self.draw_peaks(self.pixel_cursor, pixel_peaks, line_color)
+                self.pixel_cursor += 1
         return frames, eod
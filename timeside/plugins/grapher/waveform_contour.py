@@ -22,7 +22,6 @@
 from timeside.core import implements, interfacedoc
 from timeside.core.api import IGrapher
 from . waveform_simple import Waveform
-from . utils import peaks
 
 import numpy
 
@@ -64,15 +63,22 @@ class WaveformContourBlack(Waveform):
         super(WaveformContourBlack, self).setup(
             channels, samplerate, blocksize, totalframes)
 
+    def reset(self):
+        super(WaveformContourBlack, self).reset()
+        self.contour = numpy.zeros(self.image_width)
+
     @interfacedoc
     def process(self, frames, eod=False):
         if len(frames) != 1:
             buffer = frames[:, 0].copy()
             buffer.shape = (len(buffer), 1)
-            for samples, end in self.pixels_adapter.process(buffer, eod):
-                if self.pixel_cursor < self.image_width:
-                    self.contour[self.pixel_cursor] = numpy.max(peaks(samples))
-                    self.pixel_cursor += 1
+            pixels = self.pixels_peaks(buffer, eod)
+            pixels = pixels[:self.image_width - self.pixel_cursor]
+            if pixels:
+                self.contour[self.pixel_cursor:
+                             self.pixel_cursor + len(pixels)] = \
+                    numpy.max(pixels, axis=(1, 2))
+            self.pixel_cursor += len(pixels)
         if eod:
             self.draw_peaks_contour()
         return frames, eod
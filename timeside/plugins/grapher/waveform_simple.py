@@ -22,7 +22,8 @@
 from timeside.core import implements, interfacedoc
 from timeside.core.api import IGrapher
 from timeside.core.grapher import Grapher
-from . utils import peaks
+from . utils import blocks_peaks
+import numpy
 
 
 class Waveform(Grapher):
@@ -57,6 +58,14 @@ class Waveform(Grapher):
         super(Waveform, self).setup(
             channels, samplerate, blocksize, totalframes)
 
+    def pixels_peaks(self, buffer, eod):
+        """Return the peaks of the pixels completed by buffer"""
+        runs, last = self.pixels_adapter.process_runs(buffer, eod)
+        if last is not None:
+            runs.append(last[numpy.newaxis])
+        return [pixel_peaks for blocks in runs
+                for pixel_peaks in blocks_peaks(blocks)]
+
     @interfacedoc
     def process(self, frames, eod=False):
         if len(frames) != 1:
@@ -65,14 +74,14 @@ class Waveform(Grapher):
             else:
                 buffer = frames
             buffer.shape = (len(buffer), 1)
-            for samples, end in self.pixels_adapter.process(buffer, eod):
+            for pixel_peaks in self.pixels_peaks(buffer, eod):
                 if self.pixel_cursor < self.image_width - 1:
                     self.draw_peaks(
-                        self.pixel_cursor, peaks(samples), self.line_color)
+                        self.pixel_cursor, pixel_peaks, self.line_color)
                     self.pixel_cursor += 1
             if self.pixel_cursor == self.image_width - 1:
                 self.draw_peaks(
-                    self.pixel_cursor, peaks(samples), self.line_color)
+                    self.pixel_cursor, pixel_peaks, self.line_color)
                 self.pixel_cursor += 1
         return frames, eod
 
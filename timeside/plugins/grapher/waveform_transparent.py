@@ -22,7 +22,6 @@
 from timeside.core import implements, interfacedoc
 from timeside.core.api import IGrapher
 from timeside.plugins.grapher.waveform_simple import Waveform
-from . utils import peaks
 
 
 class WaveformTransparent(Waveform):
@@ -65,13 +64,13 @@ class WaveformTransparent(Waveform):
         if len(frames) != 1:
             buffer = frames[:, 0]
             buffer.shape = (len(buffer), 1)
-            for samples, end in self.pixels_adapter.process(buffer, eod):
+            for pixel_peaks in self.pixels_peaks(buffer, eod):
                 if self.pixel_cursor < self.image_width - 1:
                     self.draw_peaks_inverted(
-                        self.pixel_cursor, peaks(samples), self.line_color)
+                        self.pixel_cursor, pixel_peaks, self.line_color)
                     self.pixel_cursor += 1
             if self.pixel_cursor == self.image_width - 1:
                 self.draw_peaks_inverted(
-                    self.pixel_cursor, peaks(samples), self.line_color)
+                    self.pixel_cursor, pixel_peaks, self.line_color)
                 self.pixel_cursor += 1
         return frames, eod
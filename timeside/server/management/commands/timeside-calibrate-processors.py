@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+import timeside.core
+from timeside.core.tools.cost import (calibrate, save_models,
+                                      CALIBRATION_DURATIONS)
+
+
+class Command(BaseCommand):
+    help = """Fit the cost models of the processors from profiled runs
+            on white noise and save them for the admission control
+            of the experiences"""
+
+    processor_types = ['analyzer', 'grapher']
+
+    def add_arguments(self, parser):
+        parser.add_argument('-p', '--pid',
+                            nargs='+',
+                            type=str,
+                            help='Processor ID, default to all analyzers '
+                                 'and graphers')
+
+        parser.add_argument('-d', '--durations',
+                            nargs='+',
+                            type=float,
+                            default=CALIBRATION_DURATIONS,
+                            help='durations (in s) of the calibration signals')
+
+        parser.add_argument('-o', '--output',
+                            dest='output',
+                            default=getattr(settings, 'TIMESIDE_COST_MODELS',
+                                            None),
+                            help='define the calibration file')
+
+    def handle(self, *args, **options):
+        pids = options.get('pid')
+        if not pids:
+            pids = [proc.id() for proc in timeside.core.processor.processors(
+                    timeside.core.api.IProcessor)
+                    if proc.type in self.processor_types]
+        models = {}
+        for pid in sorted(set(pids)):
+            try:
+                models.update(calibrate([pid], options.get('durations')))
+            except Exception as e:
+                self.stderr.write(f'{pid} can not be calibrated: {e}')
+                continue
+            self.stdout.write(f'{pid}: {models[pid]}')
+        save_models(options.get('output'), models)
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.core.files.base import ContentFile
 from timeside.server.models import *
+from timeside.plugins.decoder.utils import get_uri, discover_many
 import os, sys
 
 try:
@@ -33,6 +34,13 @@ class Command(BaseCommand):
         if c:
             print('Selection "' + selection_title + '" created')
 
+        # Probe all the media at once, the items reading their audio info
+        # from the media info cache when saved
+        paths = [os.path.join(root, filename)
+                 for root, dirs, files in os.walk(import_dir)
+                 for filename in files]
+        discover_many([get_uri(path) for path in paths])
+
         for root, dirs, files in os.walk(import_dir):
             for filename in files:
                 path = os.path.join(root, filename)
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeside_server', '0011_analysis_render_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experience',
+            name='preview',
+            field=models.IntegerField(default=0, help_text='If set, a fast approximate run of the analyzers at the\nsamplerate divided by this factor precedes the full resolution\nrun, whose results replace the preview ones.', verbose_name='preview'),
+        ),
+    ]
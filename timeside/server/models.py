@@ -36,8 +36,12 @@ from shutil import copyfile
 from builtins import str
 
 import timeside.core
-from timeside.plugins.decoder.utils import sha1sum_file, sha1sum_url
+from timeside.plugins.decoder.utils import get_sha1, sha1sum_url
+from timeside.plugins.decoder.utils import get_uri, get_media_uri_info
 from timeside.core.tools.parameters import DEFAULT_SCHEMA
+from timeside.core.tools.cost import admit, load_models
+from timeside.core.tools.media_info_cache import (MediaInfoCache,
+                                                  set_media_info_cache)
 from django.db import models
 from django.utils.functional import lazy
 from django.utils.text import slugify
@@ -136,6 +140,21 @@ if not os.path.exists(DOWNLOAD_ROOT):
 
 
 DEFAULT_DECODER = getattr(settings, 'TIMESIDE_DEFAULT_DECODER', 'file_decoder')
+# Decode the PCM WAV and AIFF files with the wav_mmap_decoder when no
+# resampling is needed
+WAV_MMAP_DECODER = getattr(settings, 'TIMESIDE_WAV_MMAP_DECODER', True)
+
+# Admission control of the experiences, see timeside.core.tools.cost
+COST_MODELS = getattr(settings, 'TIMESIDE_COST_MODELS', None)
+MAX_CPU_SECONDS = getattr(settings, 'TIMESIDE_MAX_CPU_SECONDS', None)
+MAX_PEAK_BYTES = getattr(settings, 'TIMESIDE_MAX_PEAK_BYTES', None)
+if COST_MODELS and os.path.exists(COST_MODELS):
+    load_models(COST_MODELS)
+
+# Discovery results of the media, see timeside.core.tools.media_info_cache
+MEDIA_INFO_CACHE_DIR = getattr(settings, 'TIMESIDE_MEDIA_INFO_CACHE_DIR', None)
+if MEDIA_INFO_CACHE_DIR:
+    set_media_info_cache(MediaInfoCache(MEDIA_INFO_CACHE_DIR))
 
 
 class UUIDEncoder(json.JSONEncoder):
@@ -446,17 +465,24 @@ class Item(Titled, UUID, Dated, Shareable):
             (force or not (self.audio_duration and self.samplerate))
             and self.source_file
            ):
-            decoder = timeside.core.get_processor(DEFAULT_DECODER)(
-                uri=self.get_uri())
-            self.audio_duration = decoder.uri_duration
-            self.samplerate = decoder.input_samplerate
+            try:
+                # Probe the media instead of building a whole decoder
+                info = get_media_uri_info(get_uri(self.get_uri()))
+                self.audio_duration = info['duration']
+                self.samplerate = info['streams'][0]['samplerate']
+            except (ImportError, ValueError, IndexError):
+                # GStreamer is not available or found no audio stream
+                decoder = timeside.core.get_processor(DEFAULT_DECODER)(
+                    uri=self.get_uri())
+                self.audio_duration = decoder.uri_duration
+                self.samplerate = decoder.input_samplerate
             super(Item, self).save()
 
     def get_hash(self, force=False):
         "Set SHA1 hash from file binary content"
         if force or (self.sha1 is None):
             if self.source_file:
-                sha1 = sha1sum_file(self.source_file.path)
+                sha1 = get_sha1(self.source_file.path)
             elif self.source_url:
                 sha1 = sha1sum_url(self.source_url)
             else:
@@ -474,29 +500,77 @@ class Item(Titled, UUID, Dated, Shareable):
                 self.mime_type = get_mime_type(path)
             super(Item, self).save()
 
-    def run(self, experience):
-        result_path = self.get_results_path()
-        # get audio source
-        uri = self.get_uri()
+    def get_decoder(self, uri, resample=False):
+        """Return the decoder of the item source
 
-        if not uri:
-            raise ValueError('Item does not have any source URI, nothing can be run.')
+        Uncompressed WAV and AIFF files are memory-mapped unless they have
+        to be resampled.
+        """
+        if WAV_MMAP_DECODER and not resample and self.source_file:
+            try:
+                return timeside.plugins.decoder.wav.WavMmapDecoder(
+                    uri=uri,
+                    sha1=self.sha1
+                    )
+            except (IOError, OSError):
+                # Not an uncompressed WAV or AIFF file
+                pass
 
-        # decode audio source
         # TODO: use get_processor
         if DEFAULT_DECODER == 'aubio_decoder':
-            decoder = timeside.plugins.decoder.aubio.AubioDecoder(
+            return timeside.plugins.decoder.aubio.AubioDecoder(
                 uri=uri,
                 sha1=self.sha1
                 )
         else:
-            decoder = timeside.plugins.decoder.file.FileDecoder(
+            return timeside.plugins.decoder.file.FileDecoder(
                 uri=uri,
                 sha1=self.sha1
                 )
 
+    def get_channels(self):
+        "Return the number of channels of the item source or None"
+        try:
+            info = get_media_uri_info(get_uri(self.get_uri()))
+            return info['streams'][0]['channels']
+        except (ImportError, ValueError, IndexError, KeyError):
+            return None
+
+    def admit(self, pipe, preview=None):
+        """Reject the experiences too long or too large for a worker
+
+        Return the estimated total cost of the pipe or None if it can not
+        be estimated.
+        """
+        if not (self.audio_duration and hasattr(pipe, 'processors')):
+            return None
+        source = pipe.processors[0]
+        samplerate = self.samplerate or source.input_samplerate
+        if samplerate and preview:
+            samplerate //= preview
+        channels = source.input_channels or self.get_channels()
+        if not (samplerate and channels):
+            worker_logger.warning(f'Unknown audio format of {self}, '
+                                  'the run is not estimated')
+            return None
+        estimate = pipe.estimate(self.audio_duration, samplerate, channels)
+        if estimate.uncalibrated:
+            worker_logger.warning(
+                f'No cost model for {", ".join(estimate.uncalibrated)}, '
+                f'the run on {self} is not checked')
+            return None
+        worker_logger.info(f'Estimated {estimate.total} on {self}')
+        return admit(estimate, MAX_CPU_SECONDS, MAX_PEAK_BYTES)
+
+    def run(self, experience, preview=None):
+        result_path = self.get_results_path()
+        # get audio source
+        uri = self.get_uri()
+
+        if not uri:
+            raise ValueError('Item does not have any source URI, nothing can be run.')
+
         presets = {}
-        pipe = decoder
         parent_analyzers = []
 
         # search for parent analyzer presets
@@ -512,6 +586,9 @@ class Item(Titled, UUID, Dated, Shareable):
             # get core audio metaProcessor
             # corresponding to preset.processor.pid
             proc = preset.processor.get_processor()
+            if preview and (proc.type != 'analyzer' or not proc.previewable):
+                # Only computed by the full resolution run
+                continue
             if proc.type == 'encoder':
                 result, c = Result.objects.get_or_create(preset=preset,
                                                          item=self)
@@ -528,13 +605,22 @@ class Item(Titled, UUID, Dated, Shareable):
             elif proc.type in ['analyzer', 'grapher']:
                 # instantiate a core processor of an analyzer or a grapher
                 proc = proc(**json.loads(preset.parameters))
+                if preview and proc.force_samplerate:
+                    # Can not be run at the preview samplerate
+                    continue
                 worker_logger.info(
                     f'Run {proc} on {self} with {preset.parameters}'
                     )
 
             if proc not in parent_analyzers:
                 presets[preset] = proc
-                pipe |= proc
+
+        # decode audio source
+        resample = preview or any(getattr(proc, 'force_samplerate', None)
+                                  for proc in presets.values())
+        pipe = self.get_decoder(uri, resample=bool(resample))
+        for proc in presets.values():
+            pipe |= proc
 
         # item.lock_setter(True)
 
@@ -545,7 +631,9 @@ class Item(Titled, UUID, Dated, Shareable):
                 ).replace(settings.MEDIA_ROOT, '')
             self.save()
 
-        pipe.run()
+        self.admit(pipe, preview)
+
+        pipe.run(preview=preview)
 
         def set_results_from_processor(proc, preset=None):
             if preset:
@@ -665,6 +753,15 @@ class Experience(Titled, UUID, Dated, Shareable):
         blank=True,
         help_text=_("Include other experiences in an experience.")
         )
+    preview = models.IntegerField(
+        _('preview'),
+        default=0,
+        help_text=_(cleandoc("""
+            If set, a fast approximate run of the analyzers at the
+            samplerate divided by this factor precedes the full resolution
+            run, whose results replace the preview ones.
+            """))
+        )
 
     class Meta:
         verbose_name = _('Experience')
@@ -395,7 +395,8 @@ class ExperienceSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = ts.models.Experience
-        fields = ('title', 'uuid', 'url', 'presets', 'is_public', 'author')
+        fields = ('title', 'uuid', 'url', 'presets', 'is_public', 'author',
+                  'preview')
         extra_kwargs = {
             'url': {'lookup_field': 'uuid'},
             'presets': {'lookup_field': 'uuid'},
@@ -11,6 +11,7 @@ from .models import Item, Selection, Preset, Experience, Task
 from .models import _DONE
 
 from celery.task import chord
+from celery.utils import uuid
 from celery.utils.log import get_task_logger
 
 logger = get_task_logger(__name__)
@@ -22,21 +23,40 @@ def task_run(task_id):
     if task.selection:
         logger.info(f'Apply {str(task.experience)} on {str(task.selection)} in task {str(task)}')
         for item in task.selection.get_all_items():
-            results.append(experience_run.delay(str(task.experience.uuid), str(item.uuid)))    
+            results.append(experience_delay(task.experience, item))
         results_id = [res.id for res in results]
     elif task.item:
         logger.info(f'Apply {str(task.experience)} on {str(task.item)} in task {str(task)}')
-        results.append(experience_run.delay(str(task.experience.uuid), str(task.item.uuid)))
+        results.append(experience_delay(task.experience, task.item))
         results_id = [res.id for res in results]
     task_monitor.delay(task_id, results_id)
 
 
+def experience_delay(experience, item):
+    """Queue the run of an experience on an item, preceded by its preview
+    run if any so that the full resolution results replace the preview ones
+
+    The full run follows the preview run whether it succeeded or not and
+    its result is returned.
+    """
+    exp_id, item_id = str(experience.uuid), str(item.uuid)
+    if not experience.preview:
+        return experience_run.delay(exp_id, item_id)
+    run = experience_run.si(exp_id, item_id).set(task_id=uuid())
+    experience_run.si(exp_id, item_id, experience.preview).apply_async(
+        link=run, link_error=run)
+    return AsyncResult(run.id)
+
+
 @shared_task
-def experience_run(exp_id, item_id):
+def experience_run(exp_id, item_id, preview=None):
     item = Item.objects.get(uuid=item_id)
     experience = Experience.objects.get(uuid=exp_id)
-    logger.info(f'Run {str(experience)} on {str(item)}')
-    item.run(experience)
+    if preview:
+        logger.info(f'Preview {str(experience)} on {str(item)}')
+    else:
+        logger.info(f'Run {str(experience)} on {str(item)}')
+    item.run(experience, preview=preview)
     gc.collect()
 
 @shared_task
@@ -11,6 +11,13 @@ from timeside.server.models import Item
 
 import tempfile
 import shutil
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from timeside.core import get_processor
+from timeside.core.tools.cost import CostModel
 
 from timeside.server.tests.timeside_test_server import TimeSideTestServer
 
@@ -21,4 +28,31 @@ from timeside.server.tests.timeside_test_server import TimeSideTestServer
 
 # class ProviderTests(APITestCase):
 
-# class ResultTests(APITestCase):
\ No newline at end of file
+# class ResultTests(APITestCase):
+
+class ItemAdmissionTests(SimpleTestCase):
+    """Estimate of the runs whose source channels are only known from the
+    media discovery, as for the FileDecoder"""
+
+    def setUp(self):
+        self.item = Item(title='sweep', audio_duration=10., samplerate=44100)
+        decoder = get_processor('array_decoder')(np.zeros((441000, 2)))
+        decoder.input_channels = 0
+        self.pipe = decoder | get_processor('level')()
+
+    def test_channels_from_media_info(self):
+        info = {'duration': 10.,
+                'streams': [{'samplerate': 44100, 'channels': 2}]}
+        with mock.patch('timeside.server.models.get_uri'), \
+                mock.patch('timeside.server.models.get_media_uri_info',
+                           return_value=info), \
+                mock.patch.dict('timeside.core.tools.cost.COST_MODELS',
+                                {'level': CostModel((0., 1e-8))}):
+            total = self.item.admit(self.pipe)
+        self.assertIsNotNone(total)
+
+    def test_unknown_channels(self):
+        "The run is not rejected when it can not be estimated"
+        with mock.patch('timeside.server.models.get_uri',
+                        side_effect=ImportError):
+            self.assertIsNone(self.item.admit(self.pipe))